@@ -0,0 +1,5 @@
+import sys
+
+from src.benchmark.executor import main
+
+sys.exit(main())
@@ -0,0 +1,149 @@
+# cargas.py
+# Cargas de trabalho geradas para o benchmark do simulador.
+# Cada gerador recebe o tamanho n (iterações) e devolve o código assembly (texto),
+# com rótulos e constantes resolvidos pelo montador (ver src/interpretador/montador.py).
+# r0 nunca é escrito pelos programas e serve de zero nas comparações.
+
+
+def laco(n):
+    """Contador: laço mínimo beq/dec/j."""
+    return f"""\
+.equ N, {n}
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+laco:   beq r1, r0, fim
+        dec r1
+        j laco
+fim:    halt
+"""
+
+
+def laco_bne(n):
+    """Laço com o teste no fim: dec + bne de volta ao início (par fundido por run_fused)."""
+    return f"""\
+.equ N, {n}
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+laco:   add r2, r2, r1
+        dec r1
+        bne r1, r0, laco
+        halt
+"""
+
+
+def copia_memoria(n):
+    """Preenche n palavras e copia para outra região com load/store."""
+    n = min(n, 0x4000)
+    return f"""\
+.equ N, {n}
+.equ ORIGEM, 0x4000
+.equ DESTINO, 0x8000
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+        lcl_msb r3, hi(ORIGEM)
+        lcl_lsb r3, lo(ORIGEM)
+preenche:
+        beq r1, r0, copia_ini
+        store r1, r3
+        inc r3
+        dec r1
+        j preenche
+copia_ini:
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+        lcl_msb r3, hi(ORIGEM)
+        lcl_lsb r3, lo(ORIGEM)
+        lcl_msb r4, hi(DESTINO)
+        lcl_lsb r4, lo(DESTINO)
+copia:  beq r1, r0, fim
+        load r5, r3
+        store r5, r4
+        inc r3
+        inc r4
+        dec r1
+        j copia
+fim:    halt
+"""
+
+
+def aritmetica(n):
+    """Laço dominado por mul/div/mod."""
+    return f"""\
+.equ N, {n}
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+        lcl_msb r5, hi(12345)
+        lcl_lsb r5, lo(12345)
+        lcl_msb r6, hi(1103515245)
+        lcl_lsb r6, lo(1103515245)
+        lcl_msb r7, 0
+        lcl_lsb r7, 7
+laco:   beq r1, r0, fim
+        mul r5, r5, r6
+        inc r5
+        div r8, r5, r7
+        mod r9, r5, r7
+        mul r10, r8, r9
+        add r11, r11, r10
+        dec r1
+        j laco
+fim:    halt
+"""
+
+
+def desvios(n):
+    """Laço com desvios condicionais dependentes de dados (par/ímpar, múltiplo de 4)."""
+    return f"""\
+.equ N, {n}
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+        lcl_msb r7, 0
+        lcl_lsb r7, 1
+        lcl_msb r12, 0
+        lcl_lsb r12, 3
+laco:   beq r1, r0, fim
+        and r6, r1, r7
+        beq r6, r0, par
+        inc r8
+par:    bne r6, r0, impar
+        inc r9
+impar:  and r13, r1, r12
+        bne r13, r0, proximo
+        inc r10
+proximo:
+        dec r1
+        j laco
+fim:    halt
+"""
+
+
+def chamadas(n):
+    """Cadeia de chamadas jal/jr: principal -> f1 -> f2 a cada iteração."""
+    return f"""\
+.equ N, {n}
+        lcl_msb r1, hi(N)
+        lcl_lsb r1, lo(N)
+laco:   beq r1, r0, fim
+        jal f1
+        dec r1
+        j laco
+fim:    halt
+f1:     passa r31, r20      # salva o endereço de retorno
+        inc r8
+        jal f2
+        jr r20
+f2:     inc r9
+        add r10, r10, r9
+        jr r31
+"""
+
+
+# nome -> (gerador, n padrão)
+CARGAS = {
+    "laco": (laco, 100000),
+    "laco_bne": (laco_bne, 100000),
+    "copia_memoria": (copia_memoria, 0x4000),
+    "aritmetica": (aritmetica, 30000),
+    "desvios": (desvios, 30000),
+    "chamadas": (chamadas, 30000),
+}
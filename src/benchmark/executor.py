@@ -0,0 +1,192 @@
+# executor.py
+# Executa as cargas de cargas.py em cada motor da CPU e mede:
+#   - tempo de montagem (montador.montar do fonte gerado)
+#   - tempo de carga (CPU(...) com a imagem já no cache de montagem)
+#   - instruções por segundo (melhor de N repetições)
+#   - pico de memória alocada (tracemalloc, numa execução separada)
+# Os resultados são gravados em JSON; com --baseline, compara com uma execução
+# anterior e sinaliza regressões acima do limite.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.benchmark.cargas import CARGAS
+from src.interpretador.cache_de_montagem import CacheDeMontagem
+from src.interpretador.montador import montar
+from src.simulador.unidade_de_controle import CPU
+
+ENGINES = ("run", "run_fast", "run_fused", "run_blocks")
+
+FORMATO_VERSAO = 1
+
+# Limite de instruções por execução (as cargas terminam bem antes)
+MAX_INSTRUCOES = 50000000
+
+
+def _executar(cpu, engine):
+    if engine == "run":
+        cpu.run(max_cycles=4 * MAX_INSTRUCOES, verbose=False)
+    else:
+        getattr(cpu, engine)(MAX_INSTRUCOES)
+    return cpu.cycle // 4
+
+
+def medir(caminho, fonte, engine, cache, repeticoes=3, memoria=True):
+    """Mede uma carga (já gravada em caminho) num motor. Retorna dict de métricas."""
+    inicio = time.perf_counter()
+    montar(fonte)
+    t_montagem = time.perf_counter() - inicio
+
+    cache.carregar(caminho)  # aquece o cache de montagem
+    melhor_carga = melhor_execucao = None
+    instrucoes = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        cpu = CPU(caminho, cache_de_montagem=cache)
+        t_carga = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        instrucoes = _executar(cpu, engine)
+        t_execucao = time.perf_counter() - inicio
+        if not cpu.halted:
+            raise RuntimeError(f"{caminho}: programa não terminou em {MAX_INSTRUCOES} instruções")
+        melhor_carga = t_carga if melhor_carga is None else min(melhor_carga, t_carga)
+        melhor_execucao = t_execucao if melhor_execucao is None else min(melhor_execucao, t_execucao)
+
+    resultado = {
+        "instructions": instrucoes,
+        "instructions_per_second": instrucoes / melhor_execucao,
+        "run_time": melhor_execucao,
+        "assemble_time": t_montagem,
+        "load_time": melhor_carga,
+    }
+    if memoria:
+        tracemalloc.start()
+        try:
+            _executar(CPU(caminho, cache_de_montagem=cache), engine)
+            resultado["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultado
+
+
+def executar(cargas=None, engines=ENGINES, escala=1.0, repeticoes=3, memoria=True, saida=sys.stdout):
+    """Executa as cargas em cada motor; retorna o documento de resultados."""
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="ufla-risc-bench-") as tmp:
+        cache = CacheDeMontagem(os.path.join(tmp, "cache"))
+        for nome in cargas or CARGAS:
+            gerador, n = CARGAS[nome]
+            fonte = gerador(max(1, int(n * escala)))
+            caminho = os.path.join(tmp, nome + ".txt")
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(fonte)
+            for engine in engines:
+                r = medir(caminho, fonte, engine, cache, repeticoes, memoria)
+                resultados[f"{nome}/{engine}"] = r
+                if saida is not None:
+                    saida.write(_linha(f"{nome}/{engine}", r) + "\n")
+                    saida.flush()
+    return {
+        "format": FORMATO_VERSAO,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": escala,
+        "results": resultados,
+    }
+
+
+def _linha(chave, r):
+    memoria = f"{r['peak_memory'] / 1024:9.0f} KiB" if "peak_memory" in r else ""
+    return (f"{chave:28s} {r['instructions_per_second'] / 1e6:8.3f} Minstr/s"
+            f"  montagem {r['assemble_time'] * 1e3:7.2f} ms"
+            f"  carga {r['load_time'] * 1e3:7.2f} ms  {memoria}")
+
+
+# Métricas comparadas: nome -> True se maior é melhor
+METRICAS = {
+    "instructions_per_second": True,
+    "assemble_time": False,
+    "load_time": False,
+    "peak_memory": False,
+}
+
+
+# Diferença absoluta mínima para contar como regressão (evita ruído de medição
+# em tempos de microssegundos)
+DIFERENCA_MINIMA = {
+    "assemble_time": 1e-3,
+    "load_time": 1e-3,
+    "peak_memory": 16 * 1024,
+}
+
+
+def comparar(atual, anterior, limite=0.10):
+    """
+    Lista as regressões de atual em relação a anterior acima de limite
+    (fração: 0.10 = 10%). Cada item: (chave, métrica, valor anterior, valor atual).
+    """
+    regressoes = []
+    for chave, r in atual["results"].items():
+        base = anterior.get("results", {}).get(chave)
+        if base is None:
+            continue
+        for metrica, maior_melhor in METRICAS.items():
+            if metrica not in r or metrica not in base or not base[metrica]:
+                continue
+            if abs(r[metrica] - base[metrica]) < DIFERENCA_MINIMA.get(metrica, 0):
+                continue
+            variacao = (r[metrica] - base[metrica]) / base[metrica]
+            if (maior_melhor and variacao < -limite) or (not maior_melhor and variacao > limite):
+                regressoes.append((chave, metrica, base[metrica], r[metrica]))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.benchmark",
+                                     description="Benchmark do simulador UFLA-RISC.")
+    parser.add_argument("--cargas", default=",".join(CARGAS),
+                        help=f"cargas separadas por vírgula (padrão: {','.join(CARGAS)})")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help=f"motores separados por vírgula (padrão: {','.join(ENGINES)})")
+    parser.add_argument("--escala", type=float, default=1.0,
+                        help="multiplica o tamanho padrão de cada carga")
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="repetições por medição (vale a melhor)")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="não mede o pico de memória (evita a execução extra com tracemalloc)")
+    parser.add_argument("--output", default=None, help="grava os resultados em JSON")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--limite", type=float, default=0.10,
+                        help="variação que conta como regressão (padrão: 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    cargas = [c for c in args.cargas.split(",") if c]
+    engines = [e for e in args.engines.split(",") if e]
+    for nome in cargas:
+        if nome not in CARGAS:
+            parser.error(f"carga desconhecida: '{nome}'")
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"motor desconhecido: '{engine}'")
+
+    atual = executar(cargas, engines, args.escala, args.repeticoes, not args.sem_memoria)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(atual, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+        regressoes = comparar(atual, anterior, args.limite)
+        for chave, metrica, antes, depois in regressoes:
+            print(f"REGRESSÃO {chave} {metrica}: {antes:.6g} -> {depois:.6g}")
+        if regressoes:
+            return 1
+        print(f"Sem regressões acima de {args.limite:.0%}.")
+    return 0
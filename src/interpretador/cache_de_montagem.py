@@ -0,0 +1,133 @@
+# cache_de_montagem.py
+# Cache de programas montados: evita remontar o mesmo assembly a cada CPU criada.
+#
+# Chave: sha256 do conteúdo do fonte + versão do montador + tabela de instruções.
+# Valor: imagem empacotada (ver imagem.py) em <diretório>/<chave>.bin.
+# Escritas são atômicas (arquivo temporário + os.replace), então execuções
+# concorrentes nunca leem uma imagem pela metade; o diretório tem tamanho
+# limitado e as imagens usadas há mais tempo são removidas primeiro.
+
+import hashlib
+import os
+import tempfile
+
+from src.interpretador.interpretador_de_instrucoes import ASSEMBLER_VERSION, INSTRUCOES
+from src.interpretador.montador import montar
+from src.interpretador.imagem import load_image, segments_from_map, write_image
+
+# Diretório padrão (sobrescrito pela variável de ambiente UFLA_RISC_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ufla-risc")
+
+# Tamanho máximo padrão do cache em bytes (variável UFLA_RISC_CACHE_MAX_BYTES)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_EXTENSAO = ".bin"
+
+
+class CacheDeMontagem:
+    def __init__(self, diretorio=None, max_bytes=None):
+        self.diretorio = diretorio or os.environ.get("UFLA_RISC_CACHE_DIR") or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("UFLA_RISC_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def chave(self, source: bytes) -> str:
+        """Hash do fonte, da versão do montador e da tabela de instruções atual."""
+        h = hashlib.sha256()
+        h.update(f"v{ASSEMBLER_VERSION}\n".encode())
+        for opcode, mnemonic in sorted(INSTRUCOES.items()):
+            h.update(f"{opcode}={mnemonic}\n".encode())
+        h.update(source)
+        return h.hexdigest()
+
+    def caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave + _EXTENSAO)
+
+    def carregar(self, asm_path: str):
+        """
+        Retorna os segmentos [(base, palavras)] do programa asm_path,
+        montando e guardando a imagem apenas se ela ainda não estiver no cache.
+        """
+        with open(asm_path, "rb") as f:
+            source = f.read()
+        caminho = self.caminho(self.chave(source))
+        try:
+            segmentos = load_image(caminho)
+        except (OSError, ValueError):
+            # Ausente, removido por outra execução ou corrompido: remonta
+            segmentos = None
+        if segmentos is not None:
+            self.hits += 1
+            try:
+                os.utime(caminho)  # marca como usado recentemente (LRU por mtime)
+            except OSError:
+                pass
+            return segmentos
+
+        self.misses += 1
+        segmentos = segments_from_map(montar(source.decode("utf-8")).palavras)
+        self._gravar(caminho, segmentos)
+        self._evict()
+        return segmentos
+
+    def _gravar(self, caminho, segmentos):
+        os.makedirs(self.diretorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, prefix=".tmp-", suffix=_EXTENSAO)
+        os.close(fd)
+        try:
+            write_image(tmp, segmentos)
+            os.replace(tmp, caminho)  # atômico: leitores veem a imagem inteira ou nada
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _evict(self):
+        """Remove as imagens menos usadas até o cache caber em max_bytes."""
+        entradas = []
+        total = 0
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return
+        for nome in nomes:
+            if not nome.endswith(_EXTENSAO) or nome.startswith(".tmp-"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                continue  # removido por outra execução
+            entradas.append((st.st_mtime, st.st_size, caminho))
+            total += st.st_size
+        entradas.sort()
+        for _, tamanho, caminho in entradas:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+
+    def limpar(self):
+        """Remove todas as imagens do cache."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self._evict()
+        finally:
+            self.max_bytes = max_bytes
+
+
+_cache_padrao = None
+
+def cache_padrao() -> CacheDeMontagem:
+    """Cache compartilhado pelo processo, configurado pelas variáveis de ambiente."""
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheDeMontagem()
+    return _cache_padrao
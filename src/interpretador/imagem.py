@@ -0,0 +1,98 @@
+# imagem.py
+# Formato binário empacotado de imagem de programa (.bin)
+#
+#   cabeçalho:  magic "URIM" (4 bytes) | versão (u16) | n_segmentos (u16)
+#   tabela:     n_segmentos x (endereço base (u32) | n_palavras (u32))
+#   dados:      palavras de 32 bits little-endian de cada segmento, na ordem da tabela
+#
+# Arquivos .bin antigos (texto com 32 caracteres '0'/'1' por linha) continuam
+# sendo lidos por parse_program; is_image() distingue os dois formatos.
+
+from array import array
+from typing import Dict, List, Tuple
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"URIM"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHH")
+_SEGMENT = struct.Struct("<II")
+
+# Typecode de 32 bits sem sinal (mesmo critério de memoria.WORD_TYPECODE)
+_WORD = "I" if array("I").itemsize == 4 else "L"
+
+Segmento = Tuple[int, array]
+
+
+def is_image(path: str) -> bool:
+    """True se o arquivo começa com o magic do formato empacotado."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def segments_from_map(mem_map: Dict[int, int]) -> List[Segmento]:
+    """Agrupa um dict endereco->palavra em segmentos de endereços consecutivos."""
+    segmentos = []
+    base = None
+    words = None
+    anterior = None
+    for addr in sorted(mem_map):
+        if words is None or addr != anterior + 1:
+            base = addr
+            words = array(_WORD)
+            segmentos.append((base, words))
+        words.append(mem_map[addr] & 0xFFFFFFFF)
+        anterior = addr
+    return segmentos
+
+
+def write_image(path: str, segmentos: List[Segmento]) -> None:
+    """Grava os segmentos (base, palavras) no formato empacotado."""
+    if len(segmentos) > 0xFFFF:
+        raise ValueError("Número de segmentos excede o limite do formato (65535)")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(segmentos)))
+        for base, words in segmentos:
+            f.write(_SEGMENT.pack(base, len(words)))
+        for _, words in segmentos:
+            words = array(_WORD, words)
+            if sys.byteorder == "big":
+                words.byteswap()
+            f.write(words.tobytes())
+
+
+def load_image(path: str) -> List[Segmento]:
+    """
+    Lê uma imagem empacotada via mmap e devolve [(base, array de palavras)].
+    Cada segmento é copiado de uma vez para um array, sem parse por palavra.
+    """
+    with open(path, "rb") as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho < _HEADER.size:
+            raise ValueError(f"Imagem truncada: '{path}'")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            magic, versao, n = _HEADER.unpack_from(m, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Arquivo não é uma imagem UFLA-RISC: '{path}'")
+            if versao != VERSION:
+                raise ValueError(f"Versão de imagem não suportada: {versao}")
+            if _HEADER.size + n * _SEGMENT.size > tamanho:
+                raise ValueError(f"Imagem truncada: '{path}'")
+            tabela = [_SEGMENT.unpack_from(m, _HEADER.size + i * _SEGMENT.size) for i in range(n)]
+            offset = _HEADER.size + n * _SEGMENT.size
+            segmentos = []
+            with memoryview(m) as view:
+                for base, count in tabela:
+                    fim = offset + 4 * count
+                    if fim > tamanho:
+                        raise ValueError(f"Imagem truncada: '{path}'")
+                    words = array(_WORD)
+                    words.frombytes(view[offset:fim])
+                    if sys.byteorder == "big":
+                        words.byteswap()
+                    segmentos.append((base, words))
+                    offset = fim
+    return segmentos
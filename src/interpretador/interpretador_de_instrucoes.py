@@ -1,7 +1,14 @@
 # interpretador_de_instrucoes.py
 from typing import Tuple, Dict
+from collections import namedtuple
 import os
 
+from src.interpretador.imagem import segments_from_map, write_image
+
+# Versão do montador: incrementar sempre que a codificação gerada mudar
+# (invalida as imagens guardadas no cache de montagem)
+ASSEMBLER_VERSION = 2
+
 # Map opcoded -> mnemonic
 INSTRUCOES = {
     "00000001": "add",
@@ -33,9 +40,19 @@ INSTRUCOES = {
     "00011100": "neg",
     "00011101": "inc",
     "00011110": "dec",
+    "00011111": "faa",       # fetch-and-add atômico (multinúcleo)
     "11111111": "halt"
 }
 
+# Map opcode inteiro -> mnemonic (evita formatar a palavra em string para decodificar)
+OPCODES = {int(k, 2): v for k, v in INSTRUCOES.items()}
+
+# Registro compacto de uma instrução decodificada (imutável, pode ser guardado em cache)
+InstrucaoDecodificada = namedtuple(
+    "InstrucaoDecodificada",
+    ["opcode", "mnemonic", "ra", "rb", "rc", "end24", "const16", "const8"],
+)
+
 def parse_program(path: str) -> Dict[int, str]:
     mem = {}
     pc = 0
@@ -83,144 +100,56 @@ def decode_instruction(instr_bits: str) -> dict:
         "const8": int(const8, 2)
     }
 
-def asm_to_binary(asm_path: str, bin_path: str) -> None:
+def decode_word(word: int) -> InstrucaoDecodificada:
+    """
+    Decodifica uma palavra de 32 bits (int) direto dos campos de bits,
+    sem passar por string. Mesmos campos de decode_instruction.
+    """
+    opcode = (word >> 24) & 0xFF
+    return InstrucaoDecodificada(
+        opcode,
+        OPCODES.get(opcode, "unknown"),
+        (word >> 16) & 0xFF,
+        (word >> 8) & 0xFF,
+        word & 0xFF,
+        word & 0xFFFFFF,
+        (word >> 8) & 0xFFFF,
+        word & 0xFF,
+    )
+
+def assemble_source(source: str) -> Dict[int, str]:
+    """
+    Monta o texto assembly e retorna dict endereco -> instrução binária (string de 32 bits).
+    Mantida por compatibilidade; montador.montar devolve as palavras como inteiros.
+    """
+    from src.interpretador.montador import montar
+    return {addr: format(word, '032b') for addr, word in montar(source).palavras.items()}
+
+def asm_to_binary(asm_path: str, bin_path: str, formato: str = "texto") -> None:
     """
     Converte arquivo assembly (.asm ou .txt) para binário (.bin).
-    Salva em formato texto: address + instruções em binário contínuo (sem espaços)
+    formato="texto": address + instruções em binário contínuo (sem espaços)
+    formato="imagem": imagem empacotada com segmentos e palavras little-endian (ver imagem.py)
     """
-    REVERSE_INST = {v: k for k, v in INSTRUCOES.items()}
-    
-    binary_code = {}
-    pc = 0
-    
+    from src.interpretador.montador import montar
+    if formato not in ("texto", "imagem"):
+        raise ValueError(f"Formato de saída desconhecido: '{formato}'")
     with open(asm_path, "r", encoding='utf-8') as f:
-        for line_num, raw in enumerate(f, 1):
-            line = raw.strip()
-            
-            if not line or line.startswith("#"):
-                continue
-            
-            if line.startswith("address"):
-                parts = line.split()
-                pc = int(parts[1])
-                continue
-            
-            # Remove vírgulas e split
-            line_clean = line.replace(',', ' ')
-            parts = line_clean.split()
-            mnem = parts[0]
-            
-            if mnem not in REVERSE_INST:
-                raise ValueError(f"Linha {line_num}: Instrução desconhecida '{mnem}'")
-            
-            opcode = REVERSE_INST[mnem]
-            instr_bits = opcode
-            
-            # Parse operands based on instruction type
-            if mnem == "halt":
-                instr_bits += "00000000" + "00000000" + "00000000"
-            
-            elif mnem in ["lcl_lsb", "lcl_msb"]:
-                # Format: lcl_lsb r1, 10
-                rc = int(parts[1].replace('r', ''))
-                const16 = int(parts[2])
-                instr_bits += format(const16, '016b') + format(rc, '08b')
-            
-            elif mnem in ["add", "sub", "xor", "or", "and", "mul", "div", "mod", "asl", "asr", "lsl", "lsr"]:
-                # Format: add r1, r2, r3 (or lsl r1, r2, r3)
-                ra = int(parts[1].replace('r', ''))
-                rb = int(parts[2].replace('r', ''))
-                rc = int(parts[3].replace('r', ''))
-                instr_bits += format(ra, '08b') + format(rb, '08b') + format(rc, '08b')
-            
-            elif mnem in ["inc", "dec"]:
-                # Format: inc r1
-                ra = int(parts[1].replace('r', ''))
-                instr_bits += format(ra, '08b') + "00000000" + "00000000"
-            
-            elif mnem in ["passa", "passnota", "neg"]:
-                # Format: passa ra, rc
-                ra = int(parts[1].replace('r', ''))
-                rc = int(parts[2].replace('r', ''))
-                instr_bits += format(ra, '08b') + "00000000" + format(rc, '08b')
-            
-            elif mnem == "load":
-                # load rc, ra  → rc = mem[ra]
-                rc = int(parts[1].replace('r', ''))
-                ra = int(parts[2].replace('r', ''))
-                instr_bits += format(ra, '08b') + "00000000" + format(rc, '08b')
-
-            elif mnem == "store":
-                # store ra, rc → mem[rc] = ra
-                ra = int(parts[1].replace('r', ''))
-                rc = int(parts[2].replace('r', ''))
-                instr_bits += format(ra, '08b') + "00000000" + format(rc, '08b')
-
-            elif mnem == "loadi":
-                rd = int(parts[1].replace('r', ''))
-                imm = int(parts[2])                 
-                
-                instr_bits += format(rd, '08b') + format(imm, '016b') 
-
-
-
-            elif mnem == "storei":
-                ra = int(parts[1].replace('r', ''))
-                imm = int(parts[2])
-                instr_bits += format(ra, '08b') + format(imm, '016b')
-
-            elif mnem == "jal":
-                imm = int(parts[1])        # apenas IMM24
-                instr_bits += format(imm, '024b')
-
-            elif mnem == "jr":
-                ra = int(parts[1].replace('r', ''))
-                instr_bits += format(ra, '08b') + "00000000" + "00000000"
-
-            
-
-            elif mnem == "j":
-                imm = int(parts[1])
-                instr_bits += format(imm, '024b')
-
-            elif mnem == "beq":
-                ra = int(parts[1].replace("r", ""))
-                rb = int(parts[2].replace("r", ""))
-                imm = int(parts[3]) & 0xFF
-                instr_bits += (
-                    format(ra, "08b") +
-                    format(rb, "08b") +
-                    format(imm, "08b")
-            )    
-
-            elif mnem == "bne":
-                ra = int(parts[1].replace("r", ""))
-                rb = int(parts[2].replace("r", ""))
-                imm = int(parts[3]) & 0xFF
-                instr_bits += (
-                    format(ra, "08b") +
-                    format(rb, "08b") +
-                    format(imm, "08b")
-                )
-
-
-
-
-            else:
-                # Para outras instruções, preencher com zeros
-                instr_bits += "00000000" + "00000000" + "00000000"
-            
-            if len(instr_bits) != 32:
-                raise ValueError(f"Linha {line_num}: Instrução com tamanho inválido: {len(instr_bits)} bits")
-            
-            binary_code[pc] = instr_bits
-            pc += 1
+        words = montar(f.read()).palavras
     
     os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+    if formato == "imagem":
+        write_image(bin_path, segments_from_map(words))
+        print(f"✓ Convertido: {asm_path} -> {bin_path}")
+        return
     with open(bin_path, "w", encoding='utf-8') as f:
-        f.write(f"address {format(0, '032b')}\n")
-        for addr in sorted(binary_code.keys()):
-            f.write(binary_code[addr] + "\n")
+        # Uma linha address no início de cada trecho contíguo (.org / .space)
+        anterior = None
+        for addr in sorted(words):
+            if anterior is None or addr != anterior + 1:
+                f.write(f"address {format(addr, '032b')}\n")
+            f.write(format(words[addr], '032b') + "\n")
+            anterior = addr
     
     print(f"✓ Convertido: {asm_path} -> {bin_path}")
 
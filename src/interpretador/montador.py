@@ -0,0 +1,398 @@
+# montador.py
+# Montador de duas passagens para o assembly do UFLA-RISC.
+#
+#   1ª passagem: percorre as linhas, calcula o endereço de cada instrução e
+#                diretiva e define os rótulos e constantes.
+#   2ª passagem: avalia os operandos (agora com todos os símbolos conhecidos) e
+#                gera as palavras de 32 bits como inteiros, sem passar por texto.
+#
+# Sintaxe (compatível com os programas existentes):
+#   # comentário                  (em qualquer ponto da linha)
+#   rotulo:                       (pode vir antes de uma instrução na mesma linha)
+#   address N  /  .org expr       endereço das próximas palavras
+#   .word expr[, expr...]         palavras de dados
+#   .space expr                   reserva expr palavras (ficam zeradas)
+#   .equ nome, expr               constante simbólica
+#
+# Expressões: inteiros (decimal, 0x, 0b, 0o), rótulos e constantes, + - * / %
+# << >> & | ^ ~, parênteses e hi(x) / lo(x) (16 bits altos / baixos, para
+# lcl_msb / lcl_lsb). Em beq/bne, um operando que usa um rótulo é o endereço
+# de destino (o montador calcula o deslocamento); um número puro é o próprio
+# deslocamento, como antes.
+
+import ast
+from collections import namedtuple
+import re
+from typing import Dict
+
+from src.interpretador.interpretador_de_instrucoes import INSTRUCOES
+
+
+class ErroDeMontagem(ValueError):
+    """Erro no fonte assembly, com o número da linha."""
+
+    def __init__(self, linha, mensagem):
+        super().__init__(f"Linha {linha}: {mensagem}")
+        self.linha = linha
+        self.mensagem = mensagem
+
+
+# Formatos de operandos -> campos da palavra
+#   abc: ra, rb, rc        ac: ra, rc          ca: rc, ra (load)
+#   a:   ra                c:  rc              ci: rc, const16 (lcl_*)
+#   ai:  ra, imm16         i:  end24           abd: ra, rb, destino (beq/bne)
+#   "":  sem operandos
+FORMATOS = {
+    "add": "abc", "sub": "abc", "xor": "abc", "or": "abc", "and": "abc",
+    "asl": "abc", "asr": "abc", "lsl": "abc", "lsr": "abc",
+    "mul": "abc", "div": "abc", "mod": "abc", "faa": "abc",
+    "zeros": "c",
+    "passa": "ac", "passnota": "ac", "neg": "ac",
+    "inc": "a", "dec": "a", "jr": "a",
+    "lcl_msb": "ci", "lcl_lsb": "ci",
+    "load": "ca", "store": "ac",
+    "loadi": "ai", "storei": "ai",
+    "jal": "i", "j": "i",
+    "beq": "abd", "bne": "abd",
+    "halt": "",
+}
+
+_N_OPERANDOS = {"abc": 3, "ac": 2, "ca": 2, "a": 1, "c": 1, "ci": 2,
+                "ai": 2, "i": 1, "abd": 3, "": 0}
+
+Programa = namedtuple("Programa", ["palavras", "simbolos", "linhas"])
+# palavras: endereço -> palavra de 32 bits (int)
+# simbolos: nome -> valor (rótulos e constantes .equ)
+# linhas:   endereço -> número da linha do fonte que gerou a palavra
+
+
+_ROTULO = re.compile(r"^([A-Za-z_]\w*)\s*:")
+_NOME = re.compile(r"^[A-Za-z_]\w*$")
+_REGISTRADORES = {f"r{i}": i for i in range(32)}
+_ZEROS_A_ESQUERDA = re.compile(r"\b0+(\d)")
+_SIMPLES = re.compile(r"^-?\w+$")
+
+
+# ---- expressões -------------------------------------------------------------
+
+_BINARIOS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a // b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+    ast.LShift: lambda a, b: a << b,
+    ast.RShift: lambda a, b: a >> b,
+    ast.BitAnd: lambda a, b: a & b,
+    ast.BitOr: lambda a, b: a | b,
+    ast.BitXor: lambda a, b: a ^ b,
+}
+
+_UNARIOS = {
+    ast.USub: lambda a: -a,
+    ast.UAdd: lambda a: a,
+    ast.Invert: lambda a: ~a,
+}
+
+_FUNCOES = {
+    "hi": lambda a: (a >> 16) & 0xFFFF,
+    "lo": lambda a: a & 0xFFFF,
+}
+
+
+def _expressao(texto, simbolos, rotulos, linha):
+    """Avalia o texto de uma expressão: (valor, usa rótulo)."""
+    # Caminhos rápidos para os casos comuns: número e nome simples
+    try:
+        return int(texto, 0), False
+    except ValueError:
+        pass
+    if _NOME.match(texto) and texto not in _FUNCOES:
+        valor = simbolos.get(texto)
+        if valor is None:
+            raise ErroDeMontagem(linha, f"símbolo indefinido '{texto}'")
+        return valor, texto in rotulos
+    no = _ARVORES.get(texto)
+    if no is None:
+        if len(_ARVORES) >= _MAX_ARVORES:
+            _ARVORES.clear()
+        no = _ARVORES[texto] = _analisar(texto, linha)
+    return _avaliar(no, simbolos, rotulos, linha)
+
+
+# Árvores já analisadas por texto de expressão (as mesmas se repetem muito)
+_ARVORES = {}
+_MAX_ARVORES = 4096
+
+
+def _analisar(texto, linha):
+    # Decimais com zeros à esquerda ("address 0100") valiam no montador antigo
+    texto = _ZEROS_A_ESQUERDA.sub(r"\1", texto.strip())
+    try:
+        return ast.parse(texto, mode="eval").body
+    except SyntaxError:
+        raise ErroDeMontagem(linha, f"expressão inválida '{texto.strip()}'") from None
+
+
+def _avaliar(no, simbolos, rotulos, linha):
+    """Valor da expressão e se ela usa algum rótulo."""
+    if isinstance(no, ast.Constant) and isinstance(no.value, int) and not isinstance(no.value, bool):
+        return no.value, False
+    if isinstance(no, ast.Name):
+        if simbolos.get(no.id) is None:
+            raise ErroDeMontagem(linha, f"símbolo indefinido '{no.id}'")
+        return simbolos[no.id], no.id in rotulos
+    if isinstance(no, ast.BinOp) and type(no.op) in _BINARIOS:
+        a, ra = _avaliar(no.left, simbolos, rotulos, linha)
+        b, rb = _avaliar(no.right, simbolos, rotulos, linha)
+        try:
+            return _BINARIOS[type(no.op)](a, b), ra or rb
+        except (ZeroDivisionError, ValueError) as e:
+            raise ErroDeMontagem(linha, f"erro na expressão: {e}") from None
+    if isinstance(no, ast.UnaryOp) and type(no.op) in _UNARIOS:
+        a, r = _avaliar(no.operand, simbolos, rotulos, linha)
+        return _UNARIOS[type(no.op)](a), r
+    if (isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and no.func.id in _FUNCOES
+            and len(no.args) == 1 and not no.keywords):
+        a, r = _avaliar(no.args[0], simbolos, rotulos, linha)
+        return _FUNCOES[no.func.id](a), r
+    raise ErroDeMontagem(linha, "expressão não suportada")
+
+
+def _separar_operandos(texto):
+    # Vírgulas separam operandos, exceto dentro de parênteses (hi(a), lo(b)).
+    # Sem vírgulas, operandos simples separados por espaço ("add r1 r2 r3")
+    # também valem, como no montador antigo.
+    if "," not in texto:
+        tokens = texto.split()
+        if len(tokens) > 1 and all(_SIMPLES.match(t) for t in tokens):
+            return tokens
+    if "(" not in texto:
+        operandos = [o.strip() for o in texto.split(",")]
+        if operandos == [""]:
+            return []
+        if not all(operandos):
+            raise ValueError("operando vazio")
+        return operandos
+    operandos = []
+    nivel = 0
+    atual = []
+    for ch in texto:
+        if ch == "," and nivel == 0:
+            operandos.append("".join(atual))
+            atual = []
+            continue
+        if ch == "(":
+            nivel += 1
+        elif ch == ")":
+            nivel -= 1
+        atual.append(ch)
+    operandos.append("".join(atual))
+    operandos = [o.strip() for o in operandos]
+    if operandos == [""]:
+        return []
+    if any(not o for o in operandos):
+        raise ValueError("operando vazio")
+    return operandos
+
+
+# ---- montagem ---------------------------------------------------------------
+
+# Itens da 1ª passagem são tuplas (linha, endereço, mnemônico ou .word, operandos)
+
+def _opcodes():
+    # Opcode inteiro por mnemônico, refeito a cada montagem: despacho.registrar_instrucao
+    # pode acrescentar instruções ou renomear um opcode existente
+    return {mnem: int(bits, 2) for bits, mnem in INSTRUCOES.items()}
+
+
+def _primeira_passagem(source, opcodes):
+    itens = []
+    simbolos: Dict[str, int] = {}
+    rotulos = set()
+    equs = []
+    pc = 0
+    for num, raw in enumerate(source.splitlines(), 1):
+        line = raw.split("#", 1)[0].strip()
+        while ":" in line:
+            m = _ROTULO.match(line)
+            if not m:
+                break
+            nome = m.group(1)
+            if nome in simbolos:
+                raise ErroDeMontagem(num, f"símbolo redefinido '{nome}'")
+            simbolos[nome] = pc
+            rotulos.add(nome)
+            line = line[m.end():].strip()
+        if not line:
+            continue
+        partes = line.split(None, 1)
+        nome = partes[0]
+        try:
+            operandos = _separar_operandos(partes[1] if len(partes) > 1 else "")
+        except ValueError as e:
+            raise ErroDeMontagem(num, str(e)) from None
+
+        if nome in ("address", ".org"):
+            if len(operandos) != 1:
+                raise ErroDeMontagem(num, f"{nome} espera um endereço")
+            # Sem rótulos à frente: o endereço precisa ser conhecido já na 1ª passagem
+            pc, _ = _expressao(operandos[0], simbolos, rotulos, num)
+            if pc < 0:
+                raise ErroDeMontagem(num, f"endereço negativo: {pc}")
+        elif nome == ".equ":
+            if len(operandos) != 2 or not _NOME.match(operandos[0]):
+                raise ErroDeMontagem(num, ".equ espera 'nome, expressão'")
+            if operandos[0] in simbolos:
+                raise ErroDeMontagem(num, f"símbolo redefinido '{operandos[0]}'")
+            simbolos[operandos[0]] = None
+            try:
+                _definir_equ(num, operandos[0], operandos[1], simbolos, rotulos)
+            except ErroDeMontagem:
+                # Usa um rótulo definido mais à frente: resolve após a 1ª passagem
+                equs.append((num, operandos[0], operandos[1]))
+        elif nome == ".word":
+            if not operandos:
+                raise ErroDeMontagem(num, ".word espera ao menos um valor")
+            itens.append((num, pc, nome, operandos))
+            pc += len(operandos)
+        elif nome == ".space":
+            if len(operandos) != 1:
+                raise ErroDeMontagem(num, ".space espera o número de palavras")
+            n, _ = _expressao(operandos[0], simbolos, rotulos, num)
+            if n < 0:
+                raise ErroDeMontagem(num, f".space negativo: {n}")
+            pc += n
+        elif nome in opcodes:
+            itens.append((num, pc, nome, operandos))
+            pc += 1
+        else:
+            raise ErroDeMontagem(num, f"Instrução desconhecida '{nome}'")
+    return itens, simbolos, rotulos, equs
+
+
+def _definir_equ(num, nome, texto, simbolos, rotulos):
+    valor, usa_rotulo = _expressao(texto, simbolos, rotulos, num)
+    simbolos[nome] = valor
+    if usa_rotulo:
+        # Uma constante derivada de rótulo também é um endereço (ver beq/bne)
+        rotulos.add(nome)
+
+
+def _registrador(texto, linha):
+    reg = _REGISTRADORES.get(texto)
+    if reg is None:
+        raise ErroDeMontagem(linha, f"registrador inválido '{texto}'")
+    return reg
+
+
+def _valor(texto, bits, linha, simbolos, rotulos, com_sinal=True):
+    """Avalia um operando imediato e confere se cabe em bits (aceita negativos em complemento de 2)."""
+    valor, _ = _expressao(texto, simbolos, rotulos, linha)
+    minimo = -(1 << (bits - 1)) if com_sinal else 0
+    if not minimo <= valor < (1 << bits):
+        raise ErroDeMontagem(linha, f"valor {valor} não cabe em {bits} bits")
+    return valor & ((1 << bits) - 1)
+
+
+def _codificar(item, opcode, simbolos, rotulos):
+    num, pc, mnem, ops = item
+    formato = FORMATOS.get(mnem, "")
+    esperados = _N_OPERANDOS[formato]
+    if len(ops) != esperados:
+        raise ErroDeMontagem(num, f"'{mnem}' espera {esperados} operando(s), recebeu {len(ops)}")
+    ra = rb = rc = 0
+    if formato == "abc":
+        ra, rb, rc = _registrador(ops[0], num), _registrador(ops[1], num), _registrador(ops[2], num)
+    elif formato == "ac":
+        ra, rc = _registrador(ops[0], num), _registrador(ops[1], num)
+    elif formato == "ca":
+        rc, ra = _registrador(ops[0], num), _registrador(ops[1], num)
+    elif formato == "a":
+        ra = _registrador(ops[0], num)
+    elif formato == "c":
+        rc = _registrador(ops[0], num)
+    elif formato == "ci":
+        rc = _registrador(ops[0], num)
+        return (opcode << 24) | (_valor(ops[1], 16, num, simbolos, rotulos) << 8) | rc
+    elif formato == "ai":
+        ra = _registrador(ops[0], num)
+        imediato = _valor(ops[1], 16, num, simbolos, rotulos, False)
+        if mnem == "storei" and imediato > 0xFF:
+            # storei usa só os 8 bits baixos do imediato como endereço (campo rc)
+            raise ErroDeMontagem(num, f"endereço de storei fora de 0..255: {imediato}")
+        return (opcode << 24) | (ra << 16) | imediato
+    elif formato == "i":
+        return (opcode << 24) | _valor(ops[0], 24, num, simbolos, rotulos, False)
+    elif formato == "abd":
+        ra, rb = _registrador(ops[0], num), _registrador(ops[1], num)
+        valor, usa_rotulo = _expressao(ops[2], simbolos, rotulos, num)
+        if usa_rotulo:
+            deslocamento = valor - (pc + 1)
+            if not -128 <= deslocamento <= 127:
+                raise ErroDeMontagem(num, f"destino de '{mnem}' fora do alcance ({deslocamento})")
+        else:
+            deslocamento = valor
+            if not -128 <= deslocamento <= 255:
+                raise ErroDeMontagem(num, f"deslocamento {deslocamento} não cabe em 8 bits")
+        rc = deslocamento & 0xFF
+    return (opcode << 24) | (ra << 16) | (rb << 8) | rc
+
+
+def montar(source: str) -> Programa:
+    """Monta o fonte assembly em duas passagens e retorna o Programa (palavras inteiras)."""
+    opcodes = _opcodes()
+    itens, simbolos, rotulos, equs = _primeira_passagem(source, opcodes)
+    for num, nome, texto in equs:
+        _definir_equ(num, nome, texto, simbolos, rotulos)
+
+    palavras: Dict[int, int] = {}
+    linhas: Dict[int, int] = {}
+    for item in itens:
+        num, addr, nome, ops = item
+        if nome == ".word":
+            valores = [_valor(o, 32, num, simbolos, rotulos) for o in ops]
+        else:
+            valores = (_codificar(item, opcodes[nome], simbolos, rotulos),)
+        if addr + len(valores) - 1 > 0xFFFFFF:
+            raise ErroDeMontagem(num, f"endereço {addr + len(valores) - 1} fora do alcance")
+        for valor in valores:
+            palavras[addr] = valor
+            linhas[addr] = num
+            addr += 1
+    return Programa(palavras, simbolos, linhas)
+
+
+def desmontar(palavra: int) -> str:
+    """
+    Linha assembly que monta exatamente a palavra dada. Palavras sem forma
+    equivalente (opcode desconhecido, registrador >= 32, bits em campos não
+    usados pelo formato) saem como ".word".
+    """
+    palavra &= 0xFFFFFFFF
+    mnem = INSTRUCOES.get(format(palavra >> 24, "08b"))
+    ra, rb, rc = (palavra >> 16) & 0xFF, (palavra >> 8) & 0xFF, palavra & 0xFF
+    formato = FORMATOS.get(mnem)
+    texto = None
+    if formato == "abc" and max(ra, rb, rc) < 32:
+        texto = f"{mnem} r{ra}, r{rb}, r{rc}"
+    elif formato == "ac" and rb == 0 and max(ra, rc) < 32:
+        texto = f"{mnem} r{ra}, r{rc}"
+    elif formato == "ca" and rb == 0 and max(ra, rc) < 32:
+        texto = f"{mnem} r{rc}, r{ra}"
+    elif formato == "a" and rb == rc == 0 and ra < 32:
+        texto = f"{mnem} r{ra}"
+    elif formato == "c" and ra == rb == 0 and rc < 32:
+        texto = f"{mnem} r{rc}"
+    elif formato == "ci" and rc < 32:
+        texto = f"{mnem} r{rc}, {(palavra >> 8) & 0xFFFF:#x}"
+    elif formato == "ai" and ra < 32 and (mnem != "storei" or rb == 0):
+        texto = f"{mnem} r{ra}, {palavra & 0xFFFF:#x}"
+    elif formato == "i":
+        texto = f"{mnem} {palavra & 0xFFFFFF:#x}"
+    elif formato == "abd" and max(ra, rb) < 32:
+        texto = f"{mnem} r{ra}, r{rb}, {rc - 256 if rc & 0x80 else rc}"
+    elif formato == "" and palavra & 0xFFFFFF == 0:
+        texto = mnem
+    return texto if texto is not None else f".word {palavra:#010x}"
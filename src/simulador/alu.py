@@ -175,3 +175,135 @@ def lsr_op(a, b_shifts): # Logical Shift Right (Preenche com zeros)
     neg = 1 if res & 0x80000000 else 0
     zero = 1 if res == 0 else 0
     return ALUResult(res, neg, zero, 0, 0)
+
+# CAMINHO RÁPIDO: SÓ O RESULTADO (sem alocar ALUResult nem calcular flags)
+# Mesma semântica das funções *_op acima; as flags ficam por conta de FlagsPreguicosas.
+
+def add_result(a, b):
+    return (a + b) & MASK32
+
+def sub_result(a, b):
+    return (a - b) & MASK32
+
+def xor_result(a, b):
+    return (a ^ b) & MASK32
+
+def or_result(a, b):
+    return (a | b) & MASK32
+
+def and_result(a, b):
+    return (a & b) & MASK32
+
+def not_result(a):
+    return (~a) & MASK32
+
+def passa_result(a):
+    return a & MASK32
+
+def mul_result(a, b):
+    return (a * b) & MASK32
+
+def div_result(a, b):
+    return (a // b) & MASK32 if b else 0
+
+def mod_result(a, b):
+    return (a % b) & MASK32 if b else 0
+
+def neg_result(a):
+    return (-a) & MASK32
+
+def inc_result(a):
+    return (a + 1) & MASK32
+
+def dec_result(a):
+    return (a - 1) & MASK32
+
+def asl_result(a, b_shifts):
+    return (a << (b_shifts & 0x1F)) & MASK32
+
+def asr_result(a, b_shifts):
+    return (to_signed32(a) >> (b_shifts & 0x1F)) & MASK32
+
+lsl_result = asl_result
+
+def lsr_result(a, b_shifts):
+    return (a & MASK32) >> (b_shifts & 0x1F)
+
+# FLAGS PREGUIÇOSAS
+# Nenhuma instrução do ISA lê as flags durante a execução (beq/bne comparam
+# registradores), então guardamos só a última operação e seus operandos e
+# calculamos neg/zero/carry/overflow quando alguém as consulta.
+
+FLAGS_NONE = 0    # nenhuma operação ainda: todas as flags em 0
+FLAGS_LOGIC = 1   # neg/zero do resultado, carry = overflow = 0
+FLAGS_ADD = 2     # flags de add_op(a, b)
+FLAGS_SUB = 3     # flags de sub_op(a, b)
+FLAGS_EXPLICIT = 4  # valores atribuídos diretamente (flags["neg"] = 1, ...)
+
+FLAG_NAMES = ("neg", "zero", "carry", "overflow")
+
+class FlagsPreguicosas:
+    """
+    Flags da ALU com avaliação preguiçosa. Lidas como um dict
+    (flags["zero"], dict(flags), print) e comparáveis com dicts.
+    """
+    __slots__ = ("op", "a", "b", "result")
+
+    def __init__(self):
+        self.op = FLAGS_NONE
+        self.a = 0
+        self.b = 0
+        self.result = 0
+
+    def record(self, op, a, b, result):
+        """Registra a última operação da ALU (custo O(1), sem calcular flags)."""
+        self.op = op
+        self.a = a
+        self.b = b
+        self.result = result
+
+    def _evaluate(self):
+        op = self.op
+        if op == FLAGS_LOGIC:
+            res = passa_op(self.result)
+        elif op == FLAGS_ADD:
+            res = add_op(self.a, self.b)
+        elif op == FLAGS_SUB:
+            res = sub_op(self.a, self.b)
+        elif op == FLAGS_EXPLICIT:
+            return dict(self.a)
+        else:
+            return {"neg": 0, "zero": 0, "carry": 0, "overflow": 0}
+        return {"neg": res.neg, "zero": res.zero, "carry": res.carry, "overflow": res.overflow}
+
+    def as_dict(self):
+        return self._evaluate()
+
+    def __getitem__(self, name):
+        return self._evaluate()[name]
+
+    def __setitem__(self, name, value):
+        if name not in FLAG_NAMES:
+            raise KeyError(name)
+        values = self._evaluate()
+        values[name] = value
+        self.record(FLAGS_EXPLICIT, values, 0, 0)
+
+    def keys(self):
+        return list(FLAG_NAMES)
+
+    def __iter__(self):
+        return iter(FLAG_NAMES)
+
+    def __len__(self):
+        return len(FLAG_NAMES)
+
+    def __eq__(self, other):
+        if isinstance(other, FlagsPreguicosas):
+            return self._evaluate() == other._evaluate()
+        if isinstance(other, dict):
+            return self._evaluate() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self._evaluate())
@@ -2,11 +2,20 @@
 # Implementa o banco de registradores do processador
 # 32 registradores de 32 bits (r0 a r31) para armazenamento temporário de dados
 
+from array import array
+
+from src.simulador.memoria import WORD_TYPECODE
+
 class RegisterFile:
+    __slots__ = ("regs", "_base")
+
     # Inicializa todos os 32 registradores com valor zero
     def __init__(self):
-        # self.regs é uma lista onde cada posição representa um registrador
-        self.regs = [0] * 32
+        # self.regs é um array compacto onde cada posição representa um registrador
+        self.regs = array(WORD_TYPECODE, [0]) * 32
+        # Cópia dos registradores no último checkpoint(). Os motores escrevem
+        # direto em self.regs, então o delta sai da comparação com ela (32 posições).
+        self._base = array(WORD_TYPECODE, [0]) * 32
 
     # Lê o valor de um registrador específico
     def read(self, idx: int) -> int:
@@ -24,6 +33,24 @@ class RegisterFile:
         # Armazena o valor no registrador aplicando máscara de 32 bits (simula overflow)
         self.regs[idx] = value & 0xFFFFFFFF
 
+    # Caminho rápido sem verificação de índice (0 <= idx < 32 garantido pelo chamador)
+    def read_unchecked(self, idx: int) -> int:
+        return self.regs[idx]
+
+    def write_unchecked(self, idx: int, value: int):
+        self.regs[idx] = value & 0xFFFFFFFF
+
+    # Retorna os pares (índice, valor atual) dos registradores alterados desde o último checkpoint
+    def changes_since_checkpoint(self):
+        base = self._base
+        return [(i, v) for i, v in enumerate(self.regs) if v != base[i]]
+
+    # Retorna changes_since_checkpoint() e passa a comparar com os valores atuais
+    def checkpoint(self):
+        changes = self.changes_since_checkpoint()
+        self._base = array(WORD_TYPECODE, self.regs)
+        return changes
+
     # Retorna lista de registradores com valores diferentes de zero para o debug do que está sendo utilizado
     def dump_nonzero(self):
         # Formato: [(índice, valor), (índice, valor), ...]
@@ -0,0 +1,117 @@
+# batch.py
+# Executa muitos programas em paralelo, cada um na sua CPU, num pool de processos.
+# Resultados saem como JSON lines (um objeto por programa, na ordem em que terminam).
+#
+# Uso:
+#   python -m src.simulador.batch <diretório | manifesto> [--workers N]
+#          [--max-cycles N] [--engine run|run_fast|run_fused|run_blocks] [--output arquivo]
+#
+# Manifesto: arquivo texto com um caminho de programa por linha (relativo ao
+# manifesto); linhas vazias e começando com '#' são ignoradas.
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import os
+import sys
+import time
+
+from src.simulador.unidade_de_controle import CPU
+
+ENGINES = ("run", "run_fast", "run_fused", "run_blocks")
+
+# Extensões aceitas ao varrer um diretório
+EXTENSOES = (".txt", ".bin")
+
+
+def listar_programas(alvo):
+    """Lista os programas de um diretório (ordenados) ou de um manifesto."""
+    if os.path.isdir(alvo):
+        return [
+            os.path.join(alvo, nome)
+            for nome in sorted(os.listdir(alvo))
+            if nome.endswith(EXTENSOES)
+        ]
+    base = os.path.dirname(os.path.abspath(alvo))
+    programas = []
+    with open(alvo, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            programas.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return programas
+
+
+def executar_programa(path, max_cycles=10000, engine="run"):
+    """Executa um programa e devolve o estado final como dict serializável em JSON."""
+    inicio = time.perf_counter()
+    try:
+        cpu = CPU(path)
+        if engine == "run":
+            cpu.run(max_cycles=max_cycles, verbose=False)
+        else:
+            # Mesmo limite de run(): instruções iniciadas enquanto cycle < max_cycles
+            getattr(cpu, engine)((max_cycles + 3) // 4)
+    except Exception as e:
+        return {
+            "program": path,
+            "error": f"{type(e).__name__}: {e}",
+            "wall_time": time.perf_counter() - inicio,
+        }
+    return {
+        "program": path,
+        "halted": cpu.halted,
+        "cycles": cpu.cycle,
+        "pc": cpu.PC,
+        "registers": list(cpu.rf.regs),
+        "memory": cpu.mem.dump_modified(),
+        "flags": cpu.flags.as_dict(),
+        "wall_time": time.perf_counter() - inicio,
+    }
+
+
+def executar_lote(programas, workers=None, max_cycles=10000, engine="run"):
+    """Gera os resultados de cada programa à medida que terminam."""
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconhecido: '{engine}'")
+    if workers == 1:
+        for path in programas:
+            yield executar_programa(path, max_cycles, engine)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(executar_programa, path, max_cycles, engine) for path in programas]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.batch",
+                                     description="Executa programas UFLA-RISC em paralelo.")
+    parser.add_argument("alvo", help="diretório com programas ou manifesto")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos no pool (padrão: número de CPUs)")
+    parser.add_argument("--max-cycles", type=int, default=10000,
+                        help="limite de ciclos por programa (padrão: 10000)")
+    parser.add_argument("--engine", choices=ENGINES, default="run",
+                        help="motor de execução (padrão: run)")
+    parser.add_argument("--output", default=None,
+                        help="arquivo de saída JSON lines (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    programas = listar_programas(args.alvo)
+    saida = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    falhas = 0
+    try:
+        for resultado in executar_lote(programas, args.workers, args.max_cycles, args.engine):
+            falhas += "error" in resultado
+            saida.write(json.dumps(resultado) + "\n")
+            saida.flush()
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
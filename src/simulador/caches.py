@@ -0,0 +1,437 @@
+# caches.py
+# Modelo de caches L1 de instruções e de dados (associativas por conjunto) para
+# estimar acertos, falhas e ciclos de espera da hierarquia de memória.
+#
+# Como o perfilador, entra trocando cpu.handlers por uma tabela instrumentada
+# (CPU.run/run_fast/run_fused com caches=): cada instrução executada conta uma
+# busca na L1 de instruções (endereço = PC) e load/loadi/store/storei contam um
+# acesso na L1 de dados (faa conta uma leitura e uma escrita). A busca passa pelo modelo mesmo quando o motor usa o
+# cache de decodificação e não chega a chamar Memoria.read. A memória funcional
+# não muda: o modelo só guarda tags.
+#
+# Endereços são de palavra (32 bits); tamanhos de cache e de linha em bytes.
+# As tags ficam numa lista plana (conjunto * associatividade + via), em ordem de
+# uso para LRU; um acesso à mesma linha do acesso anterior nem consulta o conjunto.
+#
+# Falhas são classificadas em compulsórias (linha nunca trazida), de capacidade
+# (também falharia numa cache totalmente associativa LRU do mesmo tamanho) e de
+# conflito (as demais).
+#
+# Uso:
+#   python -m src.simulador.caches <programa> [--icache 4096,2,32,lru]
+#                                  [--dcache 4096,4,32,lru,write-back] [--latencia 20]
+
+from collections import OrderedDict
+import json
+
+from src.interpretador.interpretador_de_instrucoes import OPCODES
+
+SUBSTITUICOES = ("lru", "fifo")
+POLITICAS_DE_ESCRITA = ("write-back", "write-through")
+
+# Ciclos para trazer uma linha da memória (ou devolver uma linha suja)
+LATENCIA_PADRAO = 20
+
+# Índices de CacheL1._contadores
+_LEITURAS, _ESCRITAS, _ESCRITAS_NA_MEMORIA = range(3)
+
+
+def _log2(valor, nome):
+    if valor <= 0 or valor & (valor - 1):
+        raise ValueError(f"{nome} deve ser potência de 2: {valor}")
+    return valor.bit_length() - 1
+
+
+class CacheL1:
+    """
+    Uma cache associativa por conjunto. write-back aloca a linha na falha de
+    escrita; write-through não aloca (a escrita vai direto para a memória,
+    por um buffer de escrita, sem espera).
+    """
+
+    def __init__(self, nome, tamanho=4096, associatividade=2, linha=32,
+                 substituicao="lru", escrita="write-back"):
+        if substituicao not in SUBSTITUICOES:
+            raise ValueError(f"Substituição desconhecida: '{substituicao}'")
+        if escrita not in POLITICAS_DE_ESCRITA:
+            raise ValueError(f"Política de escrita desconhecida: '{escrita}'")
+        bits_linha = _log2(linha, "Tamanho da linha")
+        if linha < 4:
+            raise ValueError(f"Linha menor que uma palavra: {linha} bytes")
+        _log2(associatividade, "Associatividade")
+        conjuntos = tamanho // (linha * associatividade)
+        if conjuntos < 1 or conjuntos * linha * associatividade != tamanho:
+            raise ValueError(f"Tamanho {tamanho} incompatível com {associatividade} vias de {linha} bytes")
+        _log2(conjuntos, "Número de conjuntos")
+
+        self.nome = nome
+        self.tamanho = tamanho
+        self.associatividade = associatividade
+        self.linha = linha
+        self.substituicao = substituicao
+        self.escrita = escrita
+        self.conjuntos = conjuntos
+        # Endereço de palavra -> número da linha
+        self._deslocamento = bits_linha - 2
+        self._mascara = conjuntos - 1
+        self._lru = substituicao == "lru"
+        self._write_back = escrita == "write-back"
+
+        # Número da linha em cada via (-1: vazia) e bit de sujeira
+        self._tags = [-1] * (conjuntos * associatividade)
+        self._sujas = bytearray(conjuntos * associatividade)
+        # FIFO: próxima via a substituir em cada conjunto
+        self._proxima = [0] * conjuntos
+        # Linha e via do último acesso
+        self._ultima = -1
+        self._ultima_via = 0
+        # Classificação das falhas
+        self._vistas = set()
+        self._sombra = OrderedDict()
+
+        # Contadores numa lista para que os caminhos rápidos de
+        # HierarquiaDeMemoria os atualizem sem chamar ler()/escrever()
+        self._contadores = [0] * 3  # _LEITURAS, _ESCRITAS, _ESCRITAS_NA_MEMORIA
+        self.falhas = {"compulsoria": 0, "capacidade": 0, "conflito": 0}
+        self.falhas_de_escrita_sem_alocacao = 0
+        self.writebacks = 0
+
+    @classmethod
+    def de_especificacao(cls, nome, texto):
+        """Cria a partir de "tamanho,associatividade,linha[,substituição[,escrita]]"."""
+        partes = [p.strip() for p in texto.split(",")]
+        if not 3 <= len(partes) <= 5:
+            raise ValueError(f"Especificação de cache inválida: '{texto}'")
+        numeros = [int(p, 0) for p in partes[:3]]
+        return cls(nome, *numeros, *partes[3:])
+
+    @property
+    def leituras(self):
+        return self._contadores[_LEITURAS]
+
+    @property
+    def escritas(self):
+        return self._contadores[_ESCRITAS]
+
+    @property
+    def escritas_na_memoria(self):
+        return self._contadores[_ESCRITAS_NA_MEMORIA]
+
+    @property
+    def acessos(self):
+        return self.leituras + self.escritas
+
+    @property
+    def total_de_falhas(self):
+        return sum(self.falhas.values()) + self.falhas_de_escrita_sem_alocacao
+
+    @property
+    def taxa_de_acertos(self):
+        acessos = self.acessos
+        return (acessos - self.total_de_falhas) / acessos if acessos else 0.0
+
+    @property
+    def linhas_trazidas(self):
+        """Falhas que buscaram uma linha na memória (as que custam espera)."""
+        return sum(self.falhas.values())
+
+    def ler(self, addr):
+        self._contadores[_LEITURAS] += 1
+        linha = addr >> self._deslocamento
+        if linha != self._ultima:
+            self._acessar(linha, False)
+
+    def escrever(self, addr):
+        self._contadores[_ESCRITAS] += 1
+        linha = addr >> self._deslocamento
+        if linha != self._ultima:
+            self._acessar(linha, True)
+        elif self._write_back:
+            self._sujas[self._ultima_via] = 1
+        else:
+            self._contadores[_ESCRITAS_NA_MEMORIA] += 1
+
+    def _acessar(self, linha, escrita):
+        tags = self._tags
+        n = self.associatividade
+        base = (linha & self._mascara) * n
+        try:
+            via = tags.index(linha, base, base + n)
+        except ValueError:
+            via = -1
+
+        if via >= 0:
+            if self._lru and via != base:
+                # Move para a primeira via do conjunto (mais recente)
+                sujas = self._sujas
+                suja = sujas[via]
+                tags[base + 1:via + 1] = tags[base:via]
+                sujas[base + 1:via + 1] = sujas[base:via]
+                tags[base] = linha
+                sujas[base] = suja
+                via = base
+            self._atualizar_sombra(linha)
+        elif escrita and not self._write_back:
+            # write-through sem alocação: não traz a linha
+            self.falhas_de_escrita_sem_alocacao += 1
+            self._contadores[_ESCRITAS_NA_MEMORIA] += 1
+            return
+        else:
+            self._classificar_falha(linha)
+            via = self._substituir(linha, base)
+
+        if escrita:
+            if self._write_back:
+                self._sujas[via] = 1
+            else:
+                self._contadores[_ESCRITAS_NA_MEMORIA] += 1
+        self._ultima = linha
+        self._ultima_via = via
+
+    def _substituir(self, linha, base):
+        tags = self._tags
+        sujas = self._sujas
+        n = self.associatividade
+        if self._lru:
+            # Descarta a última via (menos recente) e insere na primeira
+            vitima = base + n - 1
+            if sujas[vitima]:
+                self.writebacks += 1
+            tags[base + 1:base + n] = tags[base:base + n - 1]
+            sujas[base + 1:base + n] = sujas[base:base + n - 1]
+            via = base
+        else:
+            conjunto = base // n
+            via = base + self._proxima[conjunto]
+            self._proxima[conjunto] = (self._proxima[conjunto] + 1) % n
+            if sujas[via]:
+                self.writebacks += 1
+        tags[via] = linha
+        sujas[via] = 0
+        return via
+
+    def _atualizar_sombra(self, linha):
+        sombra = self._sombra
+        if linha in sombra:
+            sombra.move_to_end(linha)
+        else:
+            sombra[linha] = None
+            if len(sombra) > len(self._tags):
+                sombra.popitem(last=False)
+
+    def _classificar_falha(self, linha):
+        if linha not in self._vistas:
+            self._vistas.add(linha)
+            tipo = "compulsoria"
+        elif linha not in self._sombra:
+            tipo = "capacidade"
+        else:
+            tipo = "conflito"
+        self.falhas[tipo] += 1
+        self._atualizar_sombra(linha)
+
+    def to_dict(self):
+        return {
+            "size": self.tamanho,
+            "associativity": self.associatividade,
+            "line": self.linha,
+            "replacement": self.substituicao,
+            "write_policy": self.escrita,
+            "reads": self.leituras,
+            "writes": self.escritas,
+            "hit_rate": self.taxa_de_acertos,
+            "misses": dict(self.falhas),
+            "write_misses_no_allocate": self.falhas_de_escrita_sem_alocacao,
+            "writebacks": self.writebacks,
+            "memory_writes": self.escritas_na_memoria,
+        }
+
+
+class HierarquiaDeMemoria:
+    """
+    L1 de instruções e de dados (qualquer uma pode ser None). Cada linha trazida
+    ou devolvida (writeback) para a memória custa latencia ciclos de espera.
+    """
+
+    def __init__(self, icache=None, dcache=None, latencia=LATENCIA_PADRAO):
+        self.icache = icache
+        self.dcache = dcache
+        self.latencia = latencia
+
+    @property
+    def ciclos_de_espera(self):
+        transferencias = 0
+        for cache in (self.icache, self.dcache):
+            if cache is not None:
+                transferencias += cache.linhas_trazidas + cache.writebacks
+        return transferencias * self.latencia
+
+    def instrumentar(self, handlers):
+        """Retorna uma cópia da tabela de despacho que passa cada acesso pelas caches."""
+        # Entradas além dos 256 opcodes (ex.: pontos de parada do depurador)
+        # passam adiante sem instrumentação
+        return [self._envolver(opcode, handler)
+                for opcode, handler in enumerate(handlers[:256])] + list(handlers[256:])
+
+    def _envolver(self, opcode, handler):
+        mnemonic = OPCODES.get(opcode)
+        icache = self.icache
+        dcache = self.dcache
+        dados = dcache is not None and mnemonic in ("load", "loadi", "store", "storei", "faa")
+        if icache is None and not dados:
+            return handler
+
+        if icache is not None and mnemonic not in ("loadi", "storei", "faa"):
+            # Caminho rápido: um acesso à mesma linha do acesso anterior só é
+            # contado; só uma linha diferente passa por CacheL1._acessar
+            i_deslocamento, i_acessar = icache._deslocamento, icache._acessar
+            i_contadores = icache._contadores
+
+            if not dados:
+                def com_cache(cpu, d, ra_val, rb_val, rc_val):
+                    i_contadores[_LEITURAS] += 1
+                    linha = (cpu.PC - 1) >> i_deslocamento
+                    if linha != icache._ultima:
+                        i_acessar(linha, False)
+                    return handler(cpu, d, ra_val, rb_val, rc_val)
+                return com_cache
+
+            d_deslocamento, d_acessar = dcache._deslocamento, dcache._acessar
+            d_contadores = dcache._contadores
+
+            if mnemonic == "load":
+                def com_cache(cpu, d, ra_val, rb_val, rc_val):
+                    i_contadores[_LEITURAS] += 1
+                    linha = (cpu.PC - 1) >> i_deslocamento
+                    if linha != icache._ultima:
+                        i_acessar(linha, False)
+                    d_contadores[_LEITURAS] += 1
+                    linha = (ra_val & cpu.mem.mascara) >> d_deslocamento
+                    if linha != dcache._ultima:
+                        d_acessar(linha, False)
+                    return handler(cpu, d, ra_val, rb_val, rc_val)
+                return com_cache
+
+            d_sujas = dcache._sujas
+            write_back = dcache._write_back
+
+            def com_cache(cpu, d, ra_val, rb_val, rc_val):
+                i_contadores[_LEITURAS] += 1
+                linha = (cpu.PC - 1) >> i_deslocamento
+                if linha != icache._ultima:
+                    i_acessar(linha, False)
+                d_contadores[_ESCRITAS] += 1
+                linha = (rc_val & cpu.mem.mascara) >> d_deslocamento
+                if linha != dcache._ultima:
+                    d_acessar(linha, True)
+                elif write_back:
+                    d_sujas[dcache._ultima_via] = 1
+                else:
+                    d_contadores[_ESCRITAS_NA_MEMORIA] += 1
+                return handler(cpu, d, ra_val, rb_val, rc_val)
+            return com_cache
+
+        # Demais casos (loadi/storei/faa, ou sem L1 de instruções): pelos métodos
+        buscar = icache.ler if icache is not None else None
+        if mnemonic == "faa" and dados:
+            def com_cache(cpu, d, ra_val, rb_val, rc_val):
+                if buscar is not None:
+                    buscar(cpu.PC - 1)
+                addr = rb_val & cpu.mem.mascara
+                dcache.ler(addr)
+                dcache.escrever(addr)
+                return handler(cpu, d, ra_val, rb_val, rc_val)
+            return com_cache
+        acessar = None
+        if dados:
+            acessar = dcache.ler if mnemonic.startswith("load") else dcache.escrever
+            # Endereços por registrador usam a máscara da memória (16, 24 ou 32 bits)
+            if mnemonic == "load":
+                endereco = lambda cpu, d, ra_val, rc_val: ra_val & cpu.mem.mascara
+            elif mnemonic == "loadi":
+                endereco = lambda cpu, d, ra_val, rc_val: d.end24 & 0xFFFF
+            elif mnemonic == "store":
+                endereco = lambda cpu, d, ra_val, rc_val: rc_val & cpu.mem.mascara
+            else:
+                endereco = lambda cpu, d, ra_val, rc_val: d.rc & 0xFFFF
+
+        def com_cache(cpu, d, ra_val, rb_val, rc_val):
+            if buscar is not None:
+                buscar(cpu.PC - 1)
+            if acessar is not None:
+                acessar(endereco(cpu, d, ra_val, rc_val))
+            return handler(cpu, d, ra_val, rb_val, rc_val)
+        return com_cache
+
+    def to_dict(self):
+        return {
+            "latency": self.latencia,
+            "stall_cycles": self.ciclos_de_espera,
+            "icache": self.icache.to_dict() if self.icache is not None else None,
+            "dcache": self.dcache.to_dict() if self.dcache is not None else None,
+        }
+
+    def salvar(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def relatorio(self):
+        """Texto com acertos, falhas por tipo e ciclos de espera de cada cache."""
+        linhas = []
+        for cache in (self.icache, self.dcache):
+            if cache is None:
+                continue
+            linhas += [f"{cache.nome}: {cache.tamanho} bytes, {cache.associatividade} vias, "
+                       f"linhas de {cache.linha} bytes, {cache.substituicao}, {cache.escrita}",
+                       f"  acessos: {cache.acessos} ({cache.leituras} leituras, {cache.escritas} escritas)",
+                       f"  acertos: {100 * cache.taxa_de_acertos:.2f}%",
+                       f"  falhas: {cache.total_de_falhas}"]
+            for tipo, n in cache.falhas.items():
+                linhas.append(f"    {tipo:14s} {n:10d}")
+            if cache.falhas_de_escrita_sem_alocacao:
+                linhas.append(f"    {'escrita direta':14s} {cache.falhas_de_escrita_sem_alocacao:10d}")
+            if cache.escrita == "write-back":
+                linhas.append(f"  writebacks: {cache.writebacks}")
+            else:
+                linhas.append(f"  escritas na memória: {cache.escritas_na_memoria}")
+            linhas.append("")
+        linhas.append(f"Ciclos de espera: {self.ciclos_de_espera} "
+                      f"({self.latencia} por linha trazida ou devolvida)")
+        return "\n".join(linhas)
+
+
+def main(argv=None):
+    import argparse
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.caches",
+                                     description="Simula caches L1 de instruções e de dados.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--icache", default="4096,2,32,lru",
+                        help="tamanho,vias,linha[,lru|fifo] em bytes, ou 'nenhuma' (padrão: 4096,2,32,lru)")
+    parser.add_argument("--dcache", default="4096,4,32,lru,write-back",
+                        help="tamanho,vias,linha[,lru|fifo[,write-back|write-through]] "
+                             "em bytes, ou 'nenhuma' (padrão: 4096,4,32,lru,write-back)")
+    parser.add_argument("--latencia", type=int, default=LATENCIA_PADRAO,
+                        help=f"ciclos por linha trazida da memória (padrão: {LATENCIA_PADRAO})")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    parser.add_argument("--json", default=None, help="grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        icache = None if args.icache == "nenhuma" else CacheL1.de_especificacao("L1I", args.icache)
+        dcache = None if args.dcache == "nenhuma" else CacheL1.de_especificacao("L1D", args.dcache)
+    except ValueError as e:
+        parser.error(str(e))
+    hierarquia = HierarquiaDeMemoria(icache, dcache, args.latencia)
+    cpu = CPU(args.programa)
+    cpu.run_fast(args.max_instructions, caches=hierarquia)
+    print(hierarquia.relatorio())
+    if args.json:
+        hierarquia.salvar(args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
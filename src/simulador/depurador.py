@@ -0,0 +1,529 @@
+# depurador.py
+# Depurador da CPU:
+#   - DepuradorTemporal: "viagem no tempo" com checkpoints (CPU.snapshot) a
+#     cada N instruções e reexecução determinística a partir do mais próximo.
+#   - Depurador: pontos de parada por PC (com condição sobre registradores) e
+#     vigias de leitura/escrita em faixas da memória, com linha de comando.
+#
+# A execução do simulador é determinística (não há entrada externa), então o
+# único registro necessário para reproduzir qualquer ponto é a posição, ou
+# seja, o número de instruções executadas desde o início. Os checkpoints só
+# encurtam a reexecução e podem ser descartados quando passam do orçamento
+# de memória.
+#
+# O estado da CPU não deve ser alterado por fora do depurador enquanto ele
+# estiver em uso (a reexecução deixaria de reproduzir a mesma história).
+
+from bisect import bisect_right, insort
+from collections import namedtuple
+import cmd
+import operator
+import re
+
+from src.simulador.memoria import exigir_memoria
+from src.simulador.perfilador import Perfilador
+
+# Custo estimado de um checkpoint fora as páginas de memória (tuplas, registradores)
+_CUSTO_FIXO = 4096
+
+
+class DepuradorTemporal:
+    def __init__(self, cpu, intervalo=10000, orcamento=64 * 1024 * 1024, engine="run_fast"):
+        if intervalo < 1:
+            raise ValueError("intervalo deve ser >= 1")
+        exigir_memoria(cpu.mem, "DepuradorTemporal")
+        self.cpu = cpu
+        self.intervalo = intervalo
+        self.orcamento = orcamento
+        self._executar = getattr(cpu, engine)
+        self._ciclo_inicial = cpu.cycle
+        # Posições com checkpoint (ordenadas) e posição -> Instantaneo
+        self._posicoes = []
+        self._checkpoints = {}
+        # Páginas retidas pelos checkpoints: id -> [referências, tamanho]
+        self._paginas = {}
+        self.memoria_usada = 0
+        # Maior posição já alcançada; só avanços além dela criam checkpoints
+        self._fronteira = 0
+        # Parada pedida por interromper() e ainda não tratada por step()
+        self._interrompido = False
+        self._checkpoint()
+
+    @property
+    def posicao(self):
+        """Instruções executadas desde que o depurador foi criado."""
+        return (self.cpu.cycle - self._ciclo_inicial) // 4
+
+    @property
+    def checkpoints(self):
+        return list(self._posicoes)
+
+    # ---- checkpoints -------------------------------------------------------
+
+    def _checkpoint(self):
+        posicao = self.posicao
+        if posicao in self._checkpoints:
+            return
+        snap = self.cpu.snapshot()
+        self._checkpoints[posicao] = snap
+        insort(self._posicoes, posicao)
+        self.memoria_usada += _CUSTO_FIXO
+        for pagina in snap.paginas:
+            ref = self._paginas.get(id(pagina))
+            if ref is None:
+                self._paginas[id(pagina)] = [1, len(pagina)]
+                self.memoria_usada += len(pagina)
+            else:
+                ref[0] += 1
+        while self.memoria_usada > self.orcamento and len(self._posicoes) > 2:
+            self._descartar()
+
+    def _descartar(self):
+        # Remove o checkpoint interno cujos vizinhos ficam mais próximos: as
+        # regiões densas são afinadas primeiro (empate: o mais antigo). O
+        # primeiro e o último nunca saem.
+        posicoes = self._posicoes
+        k = min(range(1, len(posicoes) - 1), key=lambda i: posicoes[i + 1] - posicoes[i - 1])
+        snap = self._checkpoints.pop(posicoes.pop(k))
+        self.memoria_usada -= _CUSTO_FIXO
+        for pagina in snap.paginas:
+            ref = self._paginas[id(pagina)]
+            ref[0] -= 1
+            if ref[0] == 0:
+                del self._paginas[id(pagina)]
+                self.memoria_usada -= ref[1]
+
+    def _checkpoint_ate(self, posicao):
+        """Posição do checkpoint mais recente <= posicao."""
+        return self._posicoes[bisect_right(self._posicoes, posicao) - 1]
+
+    # ---- execução para frente ----------------------------------------------
+
+    def interromper(self):
+        """
+        Faz o motor parar depois da instrução atual (vigias do Depurador). O motor
+        só enxerga cpu.halted; step() desfaz esse halted antes de qualquer
+        checkpoint, então a parada nunca fica gravada como se fosse um HALT.
+        """
+        self._interrompido = True
+        self.cpu.halted = True
+
+    def step(self, n=1):
+        """Executa até n instruções, criando checkpoints nas posições múltiplas do intervalo."""
+        cpu = self.cpu
+        alvo = self.posicao + n
+        while not cpu.halted and self.posicao < alvo:
+            inicio = self.posicao
+            proximo = (inicio // self.intervalo + 1) * self.intervalo
+            try:
+                self._executar(min(alvo, proximo) - inicio)
+            finally:
+                self._fronteira = max(self._fronteira, self.posicao)
+                interrompido = self._interrompido
+                if interrompido:
+                    self._interrompido = False
+                    cpu.halted = False
+            if self.posicao == inicio:
+                break
+            if self.posicao == proximo and proximo >= self._fronteira:
+                self._checkpoint()
+            if interrompido:
+                break
+        return self.posicao - (alvo - n)
+
+    def run(self, max_instructions=10000000):
+        """Executa até halt ou max_instructions."""
+        return self.step(max_instructions)
+
+    # ---- execução para trás ------------------------------------------------
+
+    def goto(self, posicao):
+        """Leva a CPU ao estado de antes da instrução de índice posicao (0 = início)."""
+        if posicao < 0:
+            raise ValueError("posição anterior ao início")
+        if posicao < self.posicao:
+            base = self._checkpoint_ate(posicao)
+            self.cpu.restore(self._checkpoints[base])
+        self.step(posicao - self.posicao)
+        return self.posicao
+
+    def step_back(self, n=1):
+        """Volta n instruções (restaura o checkpoint anterior e reexecuta)."""
+        return self.goto(max(0, self.posicao - n))
+
+    def _segmentos_anteriores(self, fim):
+        # Intervalos [inicio, fim) entre checkpoints, do mais recente ao mais antigo
+        while fim > 0:
+            inicio = self._checkpoint_ate(fim - 1)
+            yield inicio, fim
+            fim = inicio
+
+    def run_back_to(self, pc):
+        """
+        Volta ao estado de antes da última execução (anterior à posição atual)
+        da instrução em pc. Retorna a nova posição ou None (a CPU fica onde estava).
+        """
+        atual = self.posicao
+        cpu = self.cpu
+        for inicio, fim in self._segmentos_anteriores(atual):
+            # Reexecuta o segmento inteiro com o perfilador para saber se pc aparece
+            cpu.restore(self._checkpoints[inicio])
+            perfil = Perfilador()
+            cpu.run_fast(fim - inicio, profiler=perfil)
+            if pc not in perfil.pcs:
+                continue
+            # Reexecuta de instrução em instrução até a última ocorrência
+            cpu.restore(self._checkpoints[inicio])
+            ultima = None
+            while self.posicao < fim:
+                if cpu.PC == pc:
+                    ultima = self.posicao
+                cpu.run_fast(1)
+            return self.goto(ultima)
+        self.goto(atual)
+        return None
+
+    def last_write(self, addr):
+        """
+        Posição da última instrução, antes da posição atual, que escreveu em
+        mem[addr] (ou None). A CPU volta para a posição em que estava.
+        """
+        atual = self.posicao
+        cpu = self.cpu
+        encontrada = None
+        for inicio, fim in self._segmentos_anteriores(atual):
+            # restore() conta como checkpoint da memória: o delta do segmento
+            # diz se addr foi escrito nele
+            cpu.restore(self._checkpoints[inicio])
+            cpu.run_fast(fim - inicio)
+            if not any(a == addr for a, _ in cpu.mem.changes_since_checkpoint()):
+                continue
+            cpu.restore(self._checkpoints[inicio])
+            while self.posicao < fim:
+                posicao = self.posicao
+                cpu.run_fast(1)
+                if any(a == addr for a, _ in cpu.mem.checkpoint()):
+                    encontrada = posicao
+            break
+        self.goto(atual)
+        return encontrada
+
+
+# ---- pontos de parada e vigias -----------------------------------------------
+#
+# Nada disso custa enquanto o Depurador não está executando: os ganchos só são
+# instalados durante continuar()/step() e removidos em seguida.
+#   - Pontos de parada: a entrada do cache de decodificação de cada PC com
+#     ponto de parada é trocada por uma cópia com o opcode _OPCODE_PARADA, que
+#     cai num handler extra no fim de cpu.handlers. Os demais PCs seguem pelo
+#     despacho normal.
+#   - Vigias: Memoria.add_watch (ganchos por página, ver MemoriaVigiada).
+
+# Índice do handler de ponto de parada (logo após os 256 opcodes)
+_OPCODE_PARADA = 256
+
+Parada = namedtuple("Parada", ["motivo", "pc", "endereco", "valor"])
+# motivo: "breakpoint", "watch-read", "watch-write", "halt" ou "limite"
+# endereco/valor: acesso que disparou a vigia (None nos demais casos)
+
+
+class _PontoDeParada(Exception):
+    pass
+
+
+_OPERADORES = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+def condicao_de_registrador(texto):
+    """
+    Converte "rN OP valor" (OP em == != < <= > >=; valor decimal, 0x.. ou
+    outro registrador) em uma função cpu -> bool.
+    """
+    m = re.fullmatch(r"\s*r(\d+)\s*(==|!=|<=|>=|<|>)\s*(r\d+|[-+]?\w+)\s*", texto)
+    if not m or int(m.group(1)) >= 32:
+        raise ValueError(f"Condição inválida: '{texto}'")
+    reg = int(m.group(1))
+    op = _OPERADORES[m.group(2)]
+    lado = m.group(3)
+    if lado.startswith("r"):
+        outro = int(lado[1:])
+        if outro >= 32:
+            raise ValueError(f"Condição inválida: '{texto}'")
+        return lambda cpu: op(cpu.rf.regs[reg], cpu.rf.regs[outro])
+    valor = int(lado, 0) & 0xFFFFFFFF
+    return lambda cpu: op(cpu.rf.regs[reg], valor)
+
+
+class Depurador:
+    def __init__(self, cpu, intervalo=None, orcamento=64 * 1024 * 1024):
+        self.cpu = cpu
+        # pc -> condição (função cpu -> bool) ou None
+        self.breakpoints = {}
+        # (inicio, fim, leitura, escrita), fim exclusivo
+        self.watchpoints = []
+        # Com intervalo, guarda checkpoints e permite voltar no tempo
+        self.tempo = DepuradorTemporal(cpu, intervalo, orcamento) if intervalo else None
+        self._parada = None
+        self._ignorar = None
+        self._originais = {}
+        self._vigias = []
+        self._handlers = None
+
+    # ---- configuração ------------------------------------------------------
+
+    def break_at(self, pc, condicao=None):
+        """Ponto de parada antes da instrução em pc; condicao: função cpu -> bool ou texto "rN OP valor"."""
+        if isinstance(condicao, str):
+            condicao = condicao_de_registrador(condicao)
+        self.breakpoints[pc] = condicao
+
+    def remove_break(self, pc):
+        self.breakpoints.pop(pc, None)
+
+    def watch(self, inicio, fim=None, leitura=False, escrita=True):
+        """Vigia inicio..fim-1 (só inicio se fim for None)."""
+        exigir_memoria(self.cpu.mem, "watch()")
+        fim = inicio + 1 if fim is None else fim
+        self.watchpoints.append((inicio, fim, leitura, escrita))
+
+    def remove_watch(self, inicio):
+        self.watchpoints = [w for w in self.watchpoints if w[0] != inicio]
+
+    # ---- instalação dos ganchos --------------------------------------------
+
+    def _instalar(self):
+        cpu = self.cpu
+        if self.breakpoints:
+            self._handlers = cpu.handlers
+            cpu.handlers = list(cpu.handlers[:_OPCODE_PARADA]) + [self._tratar_parada]
+            # As entradas são recriadas (já trocadas) pelo decode_at abaixo
+            cpu.decode_at = self._decode_at
+            for pc in self.breakpoints:
+                cpu._decode_cache.pop(pc, None)
+        for inicio, fim, leitura, escrita in self.watchpoints:
+            self._vigias.append(cpu.mem.add_watch(inicio, fim, self._tratar_vigia, leitura, escrita))
+
+    def _desinstalar(self):
+        cpu = self.cpu
+        for vigia in self._vigias:
+            cpu.mem.remove_watch(vigia)
+        self._vigias = []
+        if self._handlers is not None:
+            cpu.handlers = self._handlers
+            self._handlers = None
+            del cpu.decode_at
+            for pc in self._originais:
+                cpu._decode_cache.pop(pc, None)
+            self._originais = {}
+
+    def _decode_at(self, addr, instr_word):
+        cpu = self.cpu
+        decoded = type(cpu).decode_at(cpu, addr, instr_word)
+        if addr in self.breakpoints:
+            self._originais[addr] = decoded
+            decoded = decoded._replace(opcode=_OPCODE_PARADA)
+            cpu._decode_cache[addr] = decoded
+        return decoded
+
+    def _tratar_parada(self, cpu, d, ra_val, rb_val, rc_val):
+        pc = cpu.PC - 1
+        original = self._originais[pc]
+        if pc == self._ignorar:
+            # Retomando a partir deste ponto de parada: executa a instrução uma vez
+            self._ignorar = None
+        else:
+            condicao = self.breakpoints.get(pc)
+            if condicao is None or condicao(cpu):
+                # Para antes de executar: desfaz o avanço do PC
+                cpu.PC = pc
+                self._parada = Parada("breakpoint", pc, None, None)
+                raise _PontoDeParada()
+        return cpu.handlers[original.opcode](cpu, original, ra_val, rb_val, rc_val)
+
+    def _tratar_vigia(self, addr, valor, escrita):
+        # A instrução termina normalmente; halted faz o motor parar logo depois.
+        # Com tempo, a parada passa por interromper() para não virar checkpoint.
+        self._parada = Parada("watch-write" if escrita else "watch-read",
+                              self.cpu.PC - 1, addr, valor)
+        if self.tempo is not None:
+            self.tempo.interromper()
+        else:
+            self.cpu.halted = True
+
+    # ---- execução ----------------------------------------------------------
+
+    def continuar(self, max_instructions=10000000):
+        """Executa até um ponto de parada, uma vigia, halt ou o limite. Retorna a Parada."""
+        cpu = self.cpu
+        self._parada = None
+        self._ignorar = cpu.PC if cpu.PC in self.breakpoints else None
+        self._instalar()
+        try:
+            if self.tempo is not None:
+                self.tempo.step(max_instructions)
+            else:
+                cpu.run_fast(max_instructions)
+        except _PontoDeParada:
+            pass
+        finally:
+            self._desinstalar()
+        parada = self._parada
+        if parada is not None:
+            if parada.motivo != "breakpoint":
+                cpu.halted = False
+            return parada
+        return Parada("halt" if cpu.halted else "limite", cpu.PC, None, None)
+
+    def step(self, n=1):
+        return self.continuar(n)
+
+
+class LinhaDeComando(cmd.Cmd):
+    """Interface de linha de comando do Depurador (interativa ou lida de um arquivo)."""
+    prompt = "(ufla-risc) "
+
+    def __init__(self, depurador, stdin=None, stdout=None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+            self.prompt = ""
+        self.dbg = depurador
+
+    def _escrever(self, texto):
+        self.stdout.write(texto + "\n")
+
+    def _mostrar(self, parada):
+        texto = f"{parada.motivo} em pc={parada.pc}"
+        if parada.endereco is not None:
+            texto += f" mem[{parada.endereco}] = {parada.valor}"
+        if self.dbg.tempo is not None:
+            texto += f" (instrução {self.dbg.tempo.posicao})"
+        self._escrever(texto)
+
+    def onecmd(self, line):
+        try:
+            return super().onecmd(line)
+        except (ValueError, IndexError) as e:
+            self._escrever(f"erro: {e}")
+            return False
+
+    def emptyline(self):
+        return False
+
+    def do_break(self, arg):
+        """break PC [if rN OP valor]: ponto de parada (condicional) antes da instrução em PC."""
+        pc, _, condicao = arg.partition(" if ")
+        self.dbg.break_at(int(pc, 0), condicao or None)
+
+    def do_delete(self, arg):
+        """delete PC: remove o ponto de parada em PC."""
+        self.dbg.remove_break(int(arg, 0))
+
+    def _vigiar(self, arg, leitura, escrita):
+        partes = arg.split()
+        inicio = int(partes[0], 0)
+        n = int(partes[1], 0) if len(partes) > 1 else 1
+        self.dbg.watch(inicio, inicio + n, leitura, escrita)
+
+    def do_watch(self, arg):
+        """watch ADDR [N]: para após escritas em ADDR..ADDR+N-1."""
+        self._vigiar(arg, False, True)
+
+    def do_rwatch(self, arg):
+        """rwatch ADDR [N]: para após leituras em ADDR..ADDR+N-1."""
+        self._vigiar(arg, True, False)
+
+    def do_awatch(self, arg):
+        """awatch ADDR [N]: para após leituras ou escritas em ADDR..ADDR+N-1."""
+        self._vigiar(arg, True, True)
+
+    def do_unwatch(self, arg):
+        """unwatch ADDR: remove as vigias que começam em ADDR."""
+        self.dbg.remove_watch(int(arg, 0))
+
+    def do_info(self, arg):
+        """info: lista pontos de parada e vigias."""
+        for pc, condicao in sorted(self.dbg.breakpoints.items()):
+            self._escrever(f"break {pc}{' (condicional)' if condicao else ''}")
+        for inicio, fim, leitura, escrita in self.dbg.watchpoints:
+            tipo = "awatch" if leitura and escrita else "rwatch" if leitura else "watch"
+            self._escrever(f"{tipo} {inicio}..{fim - 1}")
+
+    def do_continue(self, arg):
+        """continue [N]: executa até parar (no máximo N instruções)."""
+        self._mostrar(self.dbg.continuar(int(arg, 0) if arg else 10000000))
+
+    def do_step(self, arg):
+        """step [N]: executa N instruções (padrão 1)."""
+        self._mostrar(self.dbg.step(int(arg, 0) if arg else 1))
+
+    def do_regs(self, arg):
+        """regs: registradores não nulos, PC, ciclos e flags."""
+        cpu = self.dbg.cpu
+        self._escrever(f"pc={cpu.PC} cycle={cpu.cycle} halted={cpu.halted} flags={cpu.flags}")
+        for i, v in cpu.rf.dump_nonzero():
+            self._escrever(f"  r{i} = {v} (0x{v:08x})")
+
+    def do_mem(self, arg):
+        """mem ADDR [N]: mostra N palavras a partir de ADDR."""
+        partes = arg.split()
+        inicio = int(partes[0], 0)
+        n = int(partes[1], 0) if len(partes) > 1 else 1
+        for addr in range(inicio, inicio + n):
+            v = self.dbg.cpu.mem.read(addr)
+            self._escrever(f"  mem[{addr}] = {v} (0x{v:08x})")
+
+    def _tempo(self):
+        if self.dbg.tempo is None:
+            raise ValueError("volta no tempo desativada (use --intervalo)")
+        return self.dbg.tempo
+
+    def do_back(self, arg):
+        """back [N]: volta N instruções (requer --intervalo)."""
+        posicao = self._tempo().step_back(int(arg, 0) if arg else 1)
+        self._escrever(f"instrução {posicao}, pc={self.dbg.cpu.PC}")
+
+    def do_backto(self, arg):
+        """backto PC: volta à última execução da instrução em PC (requer --intervalo)."""
+        posicao = self._tempo().run_back_to(int(arg, 0))
+        self._escrever("não encontrado" if posicao is None else f"instrução {posicao}, pc={self.dbg.cpu.PC}")
+
+    def do_lastwrite(self, arg):
+        """lastwrite ADDR: instrução que escreveu ADDR por último (requer --intervalo)."""
+        posicao = self._tempo().last_write(int(arg, 0))
+        self._escrever("nunca escrito" if posicao is None else f"instrução {posicao}")
+
+    def do_quit(self, arg):
+        """quit: sai."""
+        return True
+
+    do_EOF = do_quit
+
+
+def main(argv=None):
+    import argparse
+    import sys
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.depurador",
+                                     description="Depurador do simulador UFLA-RISC.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--comandos", default=None, help="arquivo com comandos (modo script)")
+    parser.add_argument("--intervalo", type=int, default=None,
+                        help="checkpoints a cada N instruções (ativa back/backto/lastwrite)")
+    args = parser.parse_args(argv)
+
+    depurador = Depurador(CPU(args.programa), args.intervalo)
+    if args.comandos:
+        with open(args.comandos, "r", encoding="utf-8") as f:
+            LinhaDeComando(depurador, stdin=f).cmdloop(intro="")
+    else:
+        LinhaDeComando(depurador).cmdloop()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# despacho.py
+# Tabela de despacho indexada pelo opcode inteiro (0..255): um handler por instrução.
+# Assinatura: handler(cpu, d, ra_val, rb_val, rc_val) -> (reg, valor) para o WB, ou None
+# d é a InstrucaoDecodificada; ra_val/rb_val/rc_val são os valores lidos no ID.
+# Operações da ALU usam o caminho só-resultado e registram a operação em
+# cpu.flags (FlagsPreguicosas); as flags só são calculadas quando lidas.
+
+from src.interpretador.interpretador_de_instrucoes import INSTRUCOES, OPCODES
+from src.interpretador.montador import FORMATOS, _N_OPERANDOS
+import src.simulador.alu as alu
+
+def _nop(cpu, d, ra_val, rb_val, rc_val):
+    # Opcode desconhecido: não faz nada (mesmo comportamento do antigo "else: pass")
+    return None
+
+HANDLERS = [_nop] * 256
+
+def registrar_instrucao(opcode: int, mnemonic: str, handler, formato: str = "abc"):
+    """
+    Registra (ou substitui) o handler de uma instrução na tabela de despacho.
+    O mnemonic também passa a ser reconhecido pelo decodificador e pelo montador,
+    com os operandos no formato dado (ver montador.FORMATOS; padrão: ra, rb, rc).
+    """
+    if opcode < 0 or opcode > 0xFF:
+        raise ValueError(f"Opcode fora do intervalo (0..255): {opcode}")
+    if formato not in _N_OPERANDOS:
+        raise ValueError(f"Formato de operandos desconhecido: '{formato}'")
+    HANDLERS[opcode] = handler
+    FORMATOS[mnemonic] = formato
+    OPCODES[opcode] = mnemonic
+    INSTRUCOES[format(opcode, '08b')] = mnemonic
+
+def instrucao(mnemonic: str, opcode: int = None):
+    """Decorator: registra o handler; sem opcode, usa o da tabela INSTRUCOES."""
+    if opcode is None:
+        opcode = {v: k for k, v in OPCODES.items()}[mnemonic]
+    def decorator(handler):
+        registrar_instrucao(opcode, mnemonic, handler, FORMATOS.get(mnemonic, "abc"))
+        return handler
+    return decorator
+
+
+@instrucao("halt")
+def _halt(cpu, d, ra_val, rb_val, rc_val):
+    cpu.halted = True
+    return None
+
+# Aritméticas/lógicas de três registradores: ra = rb op rc
+@instrucao("add")
+def _add(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.add_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_ADD, rb_val, rc_val, res)
+    return (d.ra, res)
+
+@instrucao("sub")
+def _sub(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.sub_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_SUB, rb_val, rc_val, res)
+    return (d.ra, res)
+
+@instrucao("xor")
+def _xor(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.xor_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("or")
+def _or(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.or_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("and")
+def _and(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.and_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("asl")
+def _asl(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.asl_result(rb_val, rc_val & 0x1F)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("asr")
+def _asr(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.asr_result(rb_val, rc_val & 0x1F)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("lsl")
+def _lsl(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.lsl_result(rb_val, rc_val & 0x1F)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("lsr")
+def _lsr(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.lsr_result(rb_val, rc_val & 0x1F)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("mul")
+def _mul(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.mul_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("div")
+def _div(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.div_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("mod")
+def _mod(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.mod_result(rb_val, rc_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+# Unárias: rc = op ra (inc/dec escrevem no próprio ra)
+@instrucao("zeros")
+def _zeros(cpu, d, ra_val, rb_val, rc_val):
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, 0)
+    return (d.rc, 0)
+
+@instrucao("passnota")
+def _passnota(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.not_result(ra_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.rc, res)
+
+@instrucao("passa")
+def _passa(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.passa_result(ra_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.rc, res)
+
+@instrucao("neg")
+def _neg(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.neg_result(ra_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.rc, res)
+
+@instrucao("inc")
+def _inc(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.inc_result(ra_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+@instrucao("dec")
+def _dec(cpu, d, ra_val, rb_val, rc_val):
+    res = alu.dec_result(ra_val)
+    cpu.flags.record(alu.FLAGS_LOGIC, 0, 0, res)
+    return (d.ra, res)
+
+# Constantes de 16 bits
+@instrucao("lcl_msb")
+def _lcl_msb(cpu, d, ra_val, rb_val, rc_val):
+    # rc = (const16 << 16) | (rc & 0x0000ffff)
+    return (d.rc, ((d.const16 << 16) & 0xFFFF0000) | (rc_val & 0x0000FFFF))
+
+@instrucao("lcl_lsb")
+def _lcl_lsb(cpu, d, ra_val, rb_val, rc_val):
+    return (d.rc, (d.const16 & 0xFFFF) | (rc_val & 0xFFFF0000))
+
+# Memória
+@instrucao("load")
+def _load(cpu, d, ra_val, rb_val, rc_val):
+    # load rc, ra  → rc = MEM[ ra ]
+    return (d.rc, cpu.mem.read_unchecked(ra_val & 0xFFFF))
+
+@instrucao("store")
+def _store(cpu, d, ra_val, rb_val, rc_val):
+    # store rc, ra  → MEM[ rc ] = ra
+    cpu.mem.write_unchecked(rc_val & 0xFFFF, ra_val)
+    return None
+
+@instrucao("storei")
+def _storei(cpu, d, ra_val, rb_val, rc_val):
+    # storei ra, imm8 → mem[imm8] = ra_val
+    cpu.mem.write_unchecked(d.rc & 0xFFFF, ra_val)
+    return None
+
+@instrucao("faa")
+def _faa(cpu, d, ra_val, rb_val, rc_val):
+    # faa ra, rb, rc → ra = MEM[ rb ]; MEM[ rb ] = MEM[ rb ] + rc
+    # Atômica: nenhum outro núcleo executa entre a leitura e a escrita (ver multinucleo.py)
+    addr = rb_val & 0xFFFF
+    antigo = cpu.mem.read_unchecked(addr)
+    cpu.mem.write_unchecked(addr, antigo + rc_val)
+    return (d.ra, antigo)
+
+@instrucao("loadi")
+def _loadi(cpu, d, ra_val, rb_val, rc_val):
+    return (d.ra, cpu.mem.read_unchecked(d.end24 & 0xFFFF))
+
+# Desvios
+@instrucao("jal")
+def _jal(cpu, d, ra_val, rb_val, rc_val):
+    cpu.rf.write_unchecked(31, cpu.PC)
+    cpu.PC = d.end24
+    return None
+
+@instrucao("jr")
+def _jr(cpu, d, ra_val, rb_val, rc_val):
+    cpu.PC = ra_val
+    return None
+
+@instrucao("beq")
+def _beq(cpu, d, ra_val, rb_val, rc_val):
+    if ra_val == rb_val:
+        # Soma em 32 bits: deslocamento negativo (complemento de 2) volta o PC
+        cpu.PC = (cpu.PC + cpu.sign_extend_8_to_32(d.const8)) & 0xFFFFFFFF
+    return None
+
+@instrucao("bne")
+def _bne(cpu, d, ra_val, rb_val, rc_val):
+    if ra_val != rb_val:
+        cpu.PC = (cpu.PC + cpu.sign_extend_8_to_32(d.const8)) & 0xFFFFFFFF
+    return None
+
+@instrucao("j")
+def _j(cpu, d, ra_val, rb_val, rc_val):
+    cpu.PC = d.end24
+    return None
+
+
+def tabela_de_despacho(mascara):
+    """
+    Tabela de despacho para uma memória cujos endereços usam mascara
+    (Memoria.mascara). Com 0xFFFF é a própria HANDLERS; com outra máscara
+    (memoria_esparsa.MemoriaEsparsa), uma cópia em que load, store e faa mascaram
+    o endereço com ela. loadi/storei continuam limitados aos seus imediatos.
+    """
+    if mascara == 0xFFFF:
+        return HANDLERS
+
+    def load(cpu, d, ra_val, rb_val, rc_val):
+        return (d.rc, cpu.mem.read_unchecked(ra_val & mascara))
+
+    def store(cpu, d, ra_val, rb_val, rc_val):
+        cpu.mem.write_unchecked(rc_val & mascara, ra_val)
+        return None
+
+    def faa(cpu, d, ra_val, rb_val, rc_val):
+        addr = rb_val & mascara
+        antigo = cpu.mem.read_unchecked(addr)
+        cpu.mem.write_unchecked(addr, antigo + rc_val)
+        return (d.ra, antigo)
+
+    tabela = list(HANDLERS)
+    opcode_de = {v: k for k, v in OPCODES.items()}
+    for mnemonic, handler in (("load", load), ("store", store), ("faa", faa)):
+        tabela[opcode_de[mnemonic]] = handler
+    return tabela
@@ -0,0 +1,278 @@
+# dispositivos.py
+# Dispositivos de E/S mapeados em memória, para a janela do topo da Memoria
+# (BASE_DE_E_S..65535, ver Memoria.map_device). Loads, stores e faa nesses
+# endereços chamam ler(deslocamento) / escrever(deslocamento, valor) do
+# dispositivo; a RAM abaixo da janela não passa por nenhuma consulta.
+#
+# Mapa padrão (mapear_padrao):
+#   0xFF00 Console            +0 escreve um caractere (8 bits baixos)
+#                             +1 escreve o número (decimal sem sinal)
+#                             +2 descarrega o buffer
+#   0xFF04 ContadorDeCiclos   +0 ciclos (32 bits baixos), +1 (32 bits altos)
+#   0xFF10 DispositivoDeBlocos
+#                             +0 bloco selecionado
+#                             +1 comando (escrita): 1 carrega o bloco no buffer,
+#                                2 grava o buffer no bloco; leitura: 0 ok, 1 erro
+#                             +2 próxima palavra do fluxo sequencial (0 no fim)
+#                             +3 palavras restantes no fluxo
+#                             +4.. buffer de PALAVRAS_POR_BLOCO palavras
+#
+# O arquivo do dispositivo de blocos é lido em pedaços (um bloco por vez), então
+# pode ser bem maior que o espaço de endereçamento. Palavras de 32 bits little-endian.
+#
+# O estado dos dispositivos não entra em snapshot()/restore() nem no rastro de memória.
+#
+# Uso:
+#   python -m src.simulador.dispositivos <programa> [--blocos arquivo] [--gravavel]
+#          [--engine run|run_fast|run_fused|run_blocks] [--max-instructions N]
+
+from array import array
+import os
+import sys
+
+from src.simulador.memoria import BASE_DE_E_S, WORD_TYPECODE, exigir_memoria
+
+PALAVRAS_POR_BLOCO = 128
+
+# Endereços do mapa padrão
+CONSOLE = BASE_DE_E_S
+CONTADOR = BASE_DE_E_S + 0x04
+BLOCOS = BASE_DE_E_S + 0x10
+
+# Caracteres acumulados antes de escrever na saída
+TAMANHO_DO_BUFFER = 4096
+
+
+class Console:
+    """Porta de saída de texto com buffer; sem saida, o texto fica em .texto."""
+    tamanho = 3
+
+    def __init__(self, saida=None, tamanho_do_buffer=TAMANHO_DO_BUFFER):
+        self.saida = saida
+        self.tamanho_do_buffer = tamanho_do_buffer
+        self._buffer = []
+        self._pendentes = 0
+        self._guardado = []  # texto já descarregado quando não há saida
+
+    @property
+    def texto(self):
+        return "".join(self._guardado) + "".join(self._buffer)
+
+    def ler(self, deslocamento):
+        return 0
+
+    def escrever(self, deslocamento, valor):
+        if deslocamento == 0:
+            texto = chr(valor & 0xFF)
+        elif deslocamento == 1:
+            texto = str(valor)
+        else:
+            self.descarregar()
+            return
+        self._buffer.append(texto)
+        self._pendentes += len(texto)
+        if self._pendentes >= self.tamanho_do_buffer:
+            self.descarregar()
+
+    def descarregar(self):
+        if not self._buffer:
+            return
+        texto = "".join(self._buffer)
+        self._buffer = []
+        self._pendentes = 0
+        if self.saida is None:
+            self._guardado.append(texto)
+        else:
+            self.saida.write(texto)
+            self.saida.flush()
+
+    def fechar(self):
+        self.descarregar()
+
+
+class ContadorDeCiclos:
+    """
+    Registrador só de leitura com cpu.cycle (64 bits em duas palavras), lido
+    no EX/MEM do load. Com dispositivos mapeados todos os motores mantêm o
+    ciclo em dia a cada instrução (ver SincronizadorDeCiclos).
+    """
+    tamanho = 2
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+
+    def ler(self, deslocamento):
+        ciclo = self.cpu.cycle
+        return ciclo >> 32 if deslocamento else ciclo
+
+    def escrever(self, deslocamento, valor):
+        pass
+
+    def fechar(self):
+        pass
+
+
+class SincronizadorDeCiclos:
+    """
+    Instrumento (como perfilador.Perfilador) usado por CPU.run_fast com
+    dispositivos mapeados: durante cada handler, cpu.cycle vale o de run() no
+    EX/MEM (inicio + 4 por instrução anterior + 3). Depois de cada handler
+    volta a inicio, e o laço de run_fast soma os 4 ciclos por instrução ao fim.
+    """
+
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.executadas = 0
+
+    def instrumentar(self, handlers):
+        """Retorna uma cópia da tabela de despacho com o ciclo sincronizado em cada handler."""
+        # Entradas além dos 256 opcodes (ex.: pontos de parada do depurador)
+        # passam adiante sem instrumentação
+        return [self._envolver(handler) for handler in handlers[:256]] + list(handlers[256:])
+
+    def _envolver(self, handler):
+        relogio = self
+        inicio = self.inicio
+
+        def sincronizado(cpu, d, ra_val, rb_val, rc_val):
+            cpu.cycle = inicio + 4 * relogio.executadas + 3
+            try:
+                wb = handler(cpu, d, ra_val, rb_val, rc_val)
+            finally:
+                cpu.cycle = inicio
+            relogio.executadas += 1
+            return wb
+        return sincronizado
+
+
+class DispositivoDeBlocos:
+    """
+    Arquivo de palavras acessado em blocos de PALAVRAS_POR_BLOCO palavras, mais
+    um fluxo sequencial lido um bloco por vez. Só com gravavel=True o comando 2
+    escreve no arquivo (blocos além do fim aumentam o arquivo).
+    """
+    tamanho = 4 + PALAVRAS_POR_BLOCO
+
+    def __init__(self, path, gravavel=False):
+        self.path = path
+        self.gravavel = gravavel
+        self._arquivo = open(path, "r+b" if gravavel else "rb")
+        self._tamanho_bytes = os.path.getsize(path)
+        self.bloco = 0
+        self.estado = 0
+        self.buffer = array(WORD_TYPECODE, [0]) * PALAVRAS_POR_BLOCO
+        # Fluxo sequencial: pedaço atual e posição (em palavras) no arquivo
+        self._fluxo = array(WORD_TYPECODE)
+        self._indice = 0
+        self._posicao = 0
+        self.blocos_lidos = 0
+        self.blocos_gravados = 0
+
+    @property
+    def palavras(self):
+        return self._tamanho_bytes // 4
+
+    def _ler_palavras(self, palavra_inicial, n):
+        self._arquivo.seek(palavra_inicial * 4)
+        dados = self._arquivo.read(n * 4)
+        palavras = array(WORD_TYPECODE)
+        palavras.frombytes(dados[:len(dados) - len(dados) % 4])
+        if sys.byteorder == "big":
+            palavras.byteswap()
+        self.blocos_lidos += 1
+        return palavras
+
+    def ler(self, deslocamento):
+        if deslocamento == 0:
+            return self.bloco
+        if deslocamento == 1:
+            return self.estado
+        if deslocamento == 2:
+            if self._indice >= len(self._fluxo):
+                if self._posicao >= self.palavras:
+                    return 0
+                self._fluxo = self._ler_palavras(self._posicao, PALAVRAS_POR_BLOCO)
+                self._indice = 0
+            valor = self._fluxo[self._indice]
+            self._indice += 1
+            self._posicao += 1
+            return valor
+        if deslocamento == 3:
+            return min(self.palavras - self._posicao, 0xFFFFFFFF)
+        return self.buffer[deslocamento - 4]
+
+    def escrever(self, deslocamento, valor):
+        if deslocamento == 0:
+            self.bloco = valor
+        elif deslocamento == 1:
+            self.estado = self._comando(valor)
+        elif deslocamento >= 4:
+            self.buffer[deslocamento - 4] = valor
+
+    def _comando(self, comando):
+        inicio = self.bloco * PALAVRAS_POR_BLOCO
+        if comando == 1:
+            if inicio >= self.palavras:
+                return 1
+            palavras = self._ler_palavras(inicio, PALAVRAS_POR_BLOCO)
+            # Bloco final incompleto: o resto do buffer fica zerado
+            palavras.extend([0] * (PALAVRAS_POR_BLOCO - len(palavras)))
+            self.buffer = palavras
+            return 0
+        if comando == 2 and self.gravavel:
+            dados = array(WORD_TYPECODE, self.buffer)
+            if sys.byteorder == "big":
+                dados.byteswap()
+            self._arquivo.seek(inicio * 4)
+            self._arquivo.write(dados.tobytes())
+            self._tamanho_bytes = max(self._tamanho_bytes, (inicio + PALAVRAS_POR_BLOCO) * 4)
+            self.blocos_gravados += 1
+            return 0
+        return 1
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def mapear_padrao(cpu, blocos=None, gravavel=False, saida=sys.stdout):
+    """Mapeia console, contador de ciclos e (com blocos) o dispositivo de blocos. Devolve a lista."""
+    exigir_memoria(cpu.mem, "mapear_padrao()")
+    dispositivos = [(CONSOLE, Console(saida)), (CONTADOR, ContadorDeCiclos(cpu))]
+    if blocos is not None:
+        dispositivos.append((BLOCOS, DispositivoDeBlocos(blocos, gravavel)))
+    for inicio, dispositivo in dispositivos:
+        cpu.mem.map_device(inicio, dispositivo)
+    return [d for _, d in dispositivos]
+
+
+def main(argv=None):
+    import argparse
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.dispositivos",
+                                     description="Executa um programa com console, contador de "
+                                                 "ciclos e dispositivo de blocos mapeados em memória.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--blocos", default=None, help="arquivo do dispositivo de blocos")
+    parser.add_argument("--gravavel", action="store_true", help="permite gravar blocos no arquivo")
+    parser.add_argument("--engine", choices=("run", "run_fast", "run_fused", "run_blocks"),
+                        default="run_fast")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    args = parser.parse_args(argv)
+
+    cpu = CPU(args.programa)
+    dispositivos = mapear_padrao(cpu, args.blocos, args.gravavel)
+    try:
+        if args.engine == "run":
+            cpu.run(max_cycles=4 * args.max_instructions, verbose=False)
+        else:
+            getattr(cpu, args.engine)(args.max_instructions)
+    finally:
+        for dispositivo in dispositivos:
+            dispositivo.fechar()
+    print(f"\n[{cpu.cycle} ciclos, {'HALT' if cpu.halted else 'limite de instruções'}]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
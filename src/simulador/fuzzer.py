@@ -0,0 +1,354 @@
+# fuzzer.py
+# Fuzzing diferencial dos motores de execução: gera programas aleatórios válidos
+# a partir da tabela INSTRUCOES, executa cada um no interpretador de referência
+# (CPU.run) e nos motores alternativos (run_fast, run_fused, run_blocks, ...)
+# e compara o estado completo a cada `passo` instruções.
+#
+# Os programas começam com um prólogo que carrega valores de borda nos
+# registradores (0, 31, 32, 0x8000, 0xFFFF, 0x10000, 0x80000000, 0xFFFFFFFF,
+# endereços do próprio programa, ...), o que exercita deslocamentos >= 32,
+# div/mod por zero, endereços que dão a volta nos 16 bits e código
+# automodificável (stores no próprio programa). O corpo mistura todas as
+# instruções, com deslocamentos de beq/bne negativos e nos extremos, campos de
+# registrador >= 32 (leem 0) e bits ligados em campos não usados.
+#
+# Uma divergência é reduzida (remoção de trechos e simplificação dos operandos)
+# até um reprodutor mínimo, gravado como assembly (montador.desmontar).
+#
+# Uso:
+#   python -m src.simulador.fuzzer [--engines run_fast,run_fused,run_blocks]
+#          [--programas N | --duracao S] [--workers N] [--semente S] [--tamanho N]
+#          [--passo N] [--max-instructions N] [--alvo P] [--saida diretório]
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import os
+import random
+import sys
+import time
+
+from src.interpretador.interpretador_de_instrucoes import INSTRUCOES
+from src.interpretador.montador import FORMATOS, desmontar
+from src.simulador.unidade_de_controle import CPU
+
+ENGINES = ("run_fast", "run_fused", "run_blocks")
+
+# Valores de borda para os registradores do prólogo
+VALORES_DE_BORDA = (
+    0, 1, 2, 31, 32, 33, 0x7F, 0x80, 0xFF, 0x7FFF, 0x8000, 0xFFFF, 0x10000, 0x1FFFF,
+    0x7FFFFFFF, 0x80000000, 0xFFFFFFFE, 0xFFFFFFFF,
+)
+
+# Deslocamentos de beq/bne (8 bits, com sinal) além dos pequenos
+DESLOCAMENTOS_DE_BORDA = (0x00, 0x01, 0x7F, 0x80, 0x81, 0xFE, 0xFF)
+
+_OPCODE_DE = {mnem: int(bits, 2) for bits, mnem in INSTRUCOES.items()}
+# Instruções do corpo (halt só ocasionalmente, e sempre no fim)
+_CORPO = sorted(m for m in _OPCODE_DE if m != "halt")
+
+# Programas por tarefa enviada a um processo
+PROGRAMAS_POR_LOTE = 16
+
+
+def _gerador(semente, indice):
+    # Programa indice da semente: reproduzível em qualquer processo
+    return random.Random((semente << 32) | indice)
+
+
+def _registrador(rng):
+    # Campo de 8 bits: índices >= 32 leem 0 e descartam a escrita
+    return rng.randrange(32) if rng.random() < 0.93 else rng.randrange(32, 256)
+
+
+def _lixo(rng):
+    # Bits em campos não usados pelo formato (devem ser ignorados)
+    return rng.randrange(256) if rng.random() < 0.05 else 0
+
+
+def _instrucao(rng, mnem, tamanho):
+    opcode = _OPCODE_DE[mnem]
+    formato = FORMATOS.get(mnem, "abc")
+    ra, rb, rc = _registrador(rng), _registrador(rng), _registrador(rng)
+    if formato == "ac" or formato == "ca":
+        rb = _lixo(rng)
+    elif formato == "a":
+        rb, rc = _lixo(rng), _lixo(rng)
+    elif formato == "c":
+        ra, rb = _lixo(rng), _lixo(rng)
+    elif formato == "ci":
+        valor = rng.choice(VALORES_DE_BORDA) & 0xFFFF if rng.random() < 0.5 else rng.randrange(0x10000)
+        return (opcode << 24) | (valor << 8) | rc
+    elif formato == "ai":
+        if mnem == "storei":
+            return (opcode << 24) | (ra << 16) | (_lixo(rng) << 8) | rng.randrange(256)
+        # loadi: o endereço usa os 16 bits baixos de end24
+        endereco = rng.choice(VALORES_DE_BORDA) & 0xFFFF if rng.random() < 0.3 else rng.randrange(0x10000)
+        return (opcode << 24) | (ra << 16) | endereco
+    elif formato == "i":
+        sorteio = rng.random()
+        if sorteio < 0.9:
+            destino = rng.randrange(tamanho)
+        elif sorteio < 0.97:
+            destino = rng.choice((tamanho, 0xFFFF, 0x10000))
+        else:
+            destino = 0xFFFFFF
+        return (opcode << 24) | destino
+    elif formato == "abd":
+        if rng.random() < 0.8:
+            deslocamento = rng.randrange(-8, 9) & 0xFF
+        else:
+            deslocamento = rng.choice(DESLOCAMENTOS_DE_BORDA)
+        return (opcode << 24) | (ra << 16) | (rb << 8) | deslocamento
+    elif formato == "":
+        return opcode << 24
+    return (opcode << 24) | (ra << 16) | (rb << 8) | rc
+
+
+def gerar_programa(rng, tamanho=48):
+    """Palavras de um programa aleatório: prólogo com valores de borda, corpo e halt."""
+    n_prologo = rng.randrange(4, 12)
+    total = 2 * n_prologo + tamanho + 1
+    palavras = []
+    lcl_msb, lcl_lsb = _OPCODE_DE["lcl_msb"], _OPCODE_DE["lcl_lsb"]
+    for _ in range(n_prologo):
+        reg = rng.randrange(32)
+        sorteio = rng.random()
+        if sorteio < 0.6:
+            valor = rng.choice(VALORES_DE_BORDA)
+        elif sorteio < 0.8:
+            # Endereço dentro do programa (jr, stores automodificáveis)
+            valor = rng.randrange(total)
+        else:
+            valor = rng.getrandbits(32)
+        palavras.append((lcl_msb << 24) | ((valor >> 16) << 8) | reg)
+        palavras.append((lcl_lsb << 24) | ((valor & 0xFFFF) << 8) | reg)
+    for _ in range(tamanho):
+        mnem = "halt" if rng.random() < 0.01 else rng.choice(_CORPO)
+        palavras.append(_instrucao(rng, mnem, total))
+    palavras.append(_OPCODE_DE["halt"] << 24)
+    return palavras
+
+
+def _cpu(palavras):
+    cpu = CPU(None)
+    for addr, palavra in enumerate(palavras):
+        cpu.mem.write(addr, palavra)
+    return cpu
+
+
+def _estado(cpu):
+    # IR não entra: run_blocks não mantém o registrador de instrução
+    return (cpu.PC, cpu.cycle, cpu.halted, tuple(cpu.rf.regs), cpu.flags.as_dict(),
+            cpu.mem.dump_modified())
+
+
+def _executar(cpu, engine, n):
+    # Devolve a exceção (tipo e mensagem) ou None
+    try:
+        if engine == "run":
+            cpu.run(max_cycles=cpu.cycle + 4 * n, verbose=False)
+        else:
+            getattr(cpu, engine)(n)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def comparar(palavras, engines=ENGINES, passo=16, max_instructions=1000):
+    """
+    Executa o programa em CPU.run e em cada motor, passo instruções por vez.
+    Devolve None se todos concordam ou um dict com a primeira divergência:
+    engine, instrucoes (executadas até o fim do passo divergente), campo e valores.
+    Se a referência lança uma exceção, os motores devem lançar a mesma; o
+    estado depois da exceção não é comparado.
+    """
+    referencia = _cpu(palavras)
+    motores = [(engine, _cpu(palavras)) for engine in engines]
+    nomes = ("PC", "cycle", "halted", "regs", "flags", "memory")
+    executadas = 0
+    while executadas < max_instructions:
+        n = min(passo, max_instructions - executadas)
+        erro = _executar(referencia, "run", n)
+        executadas += n
+        esperado = _estado(referencia) if erro is None else None
+        for engine, cpu in motores:
+            obtido = _executar(cpu, engine, n)
+            if obtido != erro:
+                return {"engine": engine, "instrucoes": executadas, "campo": "exception",
+                        "esperado": erro, "obtido": obtido}
+            if erro is None:
+                estado = _estado(cpu)
+                if estado != esperado:
+                    for nome, a, b in zip(nomes, esperado, estado):
+                        if a != b:
+                            return {"engine": engine, "instrucoes": executadas, "campo": nome,
+                                    "esperado": _resumo(a), "obtido": _resumo(b)}
+        if erro is not None or referencia.halted:
+            break
+    return None
+
+
+def _resumo(valor):
+    if isinstance(valor, tuple) and len(valor) == 32:
+        return {f"r{i}": v for i, v in enumerate(valor) if v}
+    if isinstance(valor, list) and len(valor) > 16:
+        return valor[:16] + ["..."]
+    return valor
+
+
+def reduzir(palavras, engines=ENGINES, passo=16, max_instructions=1000, tentativas=3000):
+    """
+    Reduz um programa divergente: remove trechos (metades, quartos, ... até
+    instruções isoladas) e zera campos de operandos enquanto a divergência
+    continuar. Devolve o menor programa encontrado.
+    """
+    restantes = [tentativas]
+
+    def diverge(candidato):
+        if restantes[0] <= 0 or not candidato:
+            return False
+        restantes[0] -= 1
+        return comparar(candidato, engines, passo, max_instructions) is not None
+
+    atual = list(palavras)
+    trecho = max(1, len(atual) // 2)
+    while trecho >= 1 and restantes[0] > 0:
+        i = 0
+        removeu = False
+        while i < len(atual):
+            candidato = atual[:i] + atual[i + trecho:]
+            if diverge(candidato):
+                atual = candidato
+                removeu = True
+            else:
+                i += trecho
+        if not removeu:
+            trecho //= 2
+
+    # Simplifica operandos: zera cada byte de campo (ra, rb, rc) que não for necessário
+    for i in range(len(atual)):
+        for mascara in (0x00FF0000, 0x0000FF00, 0x000000FF):
+            if atual[i] & mascara:
+                candidato = atual[:i] + [atual[i] & ~mascara] + atual[i + 1:]
+                if diverge(candidato):
+                    atual = candidato
+    return atual
+
+
+def reprodutor(palavras, divergencia, semente=None, indice=None):
+    """Texto assembly do reprodutor, com a divergência em comentário."""
+    linhas = ["# Reprodutor gerado por src.simulador.fuzzer"]
+    if semente is not None:
+        linhas.append(f"# semente {semente}, programa {indice}")
+    for chave in ("engine", "instrucoes", "campo", "esperado", "obtido"):
+        linhas.append(f"# {chave}: {divergencia[chave]}")
+    linhas += [f"{desmontar(p):32s} # {addr}" for addr, p in enumerate(palavras)]
+    return "\n".join(linhas) + "\n"
+
+
+def _lote(semente, inicio, quantidade, engines, tamanho, passo, max_instructions):
+    """Executa os programas inicio..inicio+quantidade-1; devolve (programas, falhas)."""
+    falhas = []
+    for indice in range(inicio, inicio + quantidade):
+        palavras = gerar_programa(_gerador(semente, indice), tamanho)
+        divergencia = comparar(palavras, engines, passo, max_instructions)
+        if divergencia is not None:
+            reduzido = reduzir(palavras, engines, 1, max_instructions)
+            # Localiza a instrução exata no reprodutor (passo 1)
+            divergencia = comparar(reduzido, engines, 1, max_instructions) or divergencia
+            falhas.append({"semente": semente, "indice": indice, "divergencia": divergencia,
+                           "programa": palavras, "reduzido": reduzido})
+    return quantidade, falhas
+
+
+def fuzz(engines=ENGINES, programas=1000, duracao=None, workers=None, semente=0,
+         tamanho=48, passo=16, max_instructions=1000, saida=sys.stdout):
+    """
+    Executa programas (ou até duracao segundos) em paralelo. Devolve
+    (programas executados, falhas, segundos). Cada falha é um dict com semente,
+    índice, divergência, programa original e reduzido.
+    """
+    workers = workers or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    fim = inicio + duracao if duracao is not None else None
+    executados = 0
+    falhas = []
+    proximo = 0
+
+    def ha_trabalho():
+        if fim is not None:
+            return time.perf_counter() < fim
+        return proximo < programas
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pendentes = set()
+        while True:
+            while ha_trabalho() and len(pendentes) < 2 * workers:
+                quantidade = PROGRAMAS_POR_LOTE if fim is not None else min(PROGRAMAS_POR_LOTE, programas - proximo)
+                pendentes.add(pool.submit(_lote, semente, proximo, quantidade, engines,
+                                          tamanho, passo, max_instructions))
+                proximo += quantidade
+            if not pendentes:
+                break
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                n, novas = futuro.result()
+                executados += n
+                for falha in novas:
+                    d = falha["divergencia"]
+                    saida.write(f"DIVERGÊNCIA semente {falha['semente']} programa {falha['indice']}: "
+                                f"{d['engine']} {d['campo']} após {d['instrucoes']} instruções "
+                                f"(reprodutor com {len(falha['reduzido'])} palavras)\n")
+                falhas.extend(novas)
+    return executados, falhas, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.fuzzer",
+                                     description="Fuzzing diferencial: CPU.run contra os motores rápidos.")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help=f"motores separados por vírgula (padrão: {','.join(ENGINES)})")
+    parser.add_argument("--programas", type=int, default=1000, help="programas a gerar (padrão: 1000)")
+    parser.add_argument("--duracao", type=float, default=None,
+                        help="executa por S segundos em vez de um número fixo de programas")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: núcleos)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--tamanho", type=int, default=48, help="instruções no corpo de cada programa")
+    parser.add_argument("--passo", type=int, default=16, help="instruções entre comparações de estado")
+    parser.add_argument("--max-instructions", type=int, default=1000,
+                        help="limite de instruções por programa (padrão: 1000)")
+    parser.add_argument("--alvo", type=float, default=None,
+                        help="vazão mínima em programas/s (sai com código 2 se não atingir)")
+    parser.add_argument("--saida", default=None, help="diretório para os reprodutores (.txt)")
+    args = parser.parse_args(argv)
+
+    engines = [e for e in args.engines.split(",") if e]
+    for engine in engines:
+        if engine == "run" or not callable(getattr(CPU, engine, None)):
+            parser.error(f"motor desconhecido: '{engine}'")
+
+    executados, falhas, segundos = fuzz(engines, args.programas, args.duracao, args.workers,
+                                        args.semente, args.tamanho, args.passo,
+                                        args.max_instructions)
+    vazao = executados / segundos if segundos else 0.0
+    print(f"{executados} programas em {segundos:.1f}s ({vazao:.1f} programas/s), "
+          f"{len(falhas)} divergência(s)")
+
+    if falhas and args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+        for falha in falhas:
+            caminho = os.path.join(args.saida, f"divergencia_{falha['semente']}_{falha['indice']}.txt")
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(reprodutor(falha["reduzido"], falha["divergencia"],
+                                   falha["semente"], falha["indice"]))
+            print(f"  {caminho}")
+    if falhas:
+        return 1
+    if args.alvo is not None and vazao < args.alvo:
+        print(f"Vazão abaixo do alvo de {args.alvo:.1f} programas/s")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# instantaneo.py
+# Snapshot (instantâneo) do estado completo da CPU: PC, registradores, flags,
+# memória, ciclos e halted. Criado por CPU.snapshot() e aplicado por CPU.restore().
+#
+# A memória é guardada como uma tupla de páginas imutáveis (ver
+# Memoria.snapshot_pages): snapshots sucessivos compartilham as páginas que não
+# foram escritas entre eles, então tirar um snapshot custa O(páginas alteradas).
+#
+# Formato do arquivo (little-endian):
+#   cabeçalho "<4sHHQQ?B": MAGIC, VERSAO, n_paginas não nulas, pc, ciclos, halted, op das flags
+#   flags "<III": a, b, result (para FLAGS_EXPLICIT, a guarda os bits neg|zero|carry|overflow)
+#   ir_addr "<q" (-1 se nenhum)
+#   32 registradores "<I"
+#   índices das páginas não nulas "<H"
+#   páginas não nulas comprimidas com zlib
+
+from array import array
+from collections import namedtuple
+import struct
+import sys
+import zlib
+
+from src.simulador.alu import FLAGS_EXPLICIT, FLAG_NAMES
+from src.simulador.memoria import N_PAGES, PAGINA_ZERO, WORD_TYPECODE
+
+MAGIC = b"URSN"
+VERSAO = 1
+
+_CABECALHO = struct.Struct("<4sHHQQ?B")
+_FLAGS = struct.Struct("<III")
+_IR_ADDR = struct.Struct("<q")
+_INDICE = struct.Struct("<H")
+
+Instantaneo = namedtuple(
+    "Instantaneo", ["pc", "cycle", "halted", "ir_addr", "regs", "flags", "paginas"]
+)
+# regs: tupla com os 32 registradores
+# flags: (op, a, b, result) de alu.FlagsPreguicosas
+# paginas: tupla de Memoria.snapshot_pages()
+
+
+def _palavras_le(dados):
+    # Páginas ficam na ordem de bytes nativa; o arquivo é sempre little-endian
+    if sys.byteorder == "big":
+        palavras = array(WORD_TYPECODE, dados)
+        palavras.byteswap()
+        return palavras.tobytes()
+    return dados
+
+
+def salvar(instantaneo, path):
+    """Grava o snapshot em path no formato compacto."""
+    op, a, b, result = instantaneo.flags
+    if op == FLAGS_EXPLICIT:
+        a = sum(1 << i for i, nome in enumerate(FLAG_NAMES) if a[nome])
+    nao_nulas = [i for i, p in enumerate(instantaneo.paginas) if p != PAGINA_ZERO]
+    with open(path, "wb") as f:
+        f.write(_CABECALHO.pack(MAGIC, VERSAO, len(nao_nulas), instantaneo.pc,
+                                instantaneo.cycle, instantaneo.halted, op))
+        f.write(_FLAGS.pack(a, b, result))
+        f.write(_IR_ADDR.pack(-1 if instantaneo.ir_addr is None else instantaneo.ir_addr))
+        f.write(struct.pack("<32I", *instantaneo.regs))
+        for i in nao_nulas:
+            f.write(_INDICE.pack(i))
+        f.write(zlib.compress(b"".join(_palavras_le(instantaneo.paginas[i]) for i in nao_nulas)))
+
+
+def carregar(path):
+    """Lê um snapshot gravado por salvar()."""
+    with open(path, "rb") as f:
+        dados = f.read()
+    if len(dados) < _CABECALHO.size or dados[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Arquivo não é um snapshot UFLA-RISC: '{path}'")
+    _, versao, n, pc, cycle, halted, op = _CABECALHO.unpack_from(dados, 0)
+    if versao != VERSAO:
+        raise ValueError(f"Versão de snapshot não suportada: {versao}")
+    pos = _CABECALHO.size
+    a, b, result = _FLAGS.unpack_from(dados, pos)
+    pos += _FLAGS.size
+    if op == FLAGS_EXPLICIT:
+        a = {nome: (a >> i) & 1 for i, nome in enumerate(FLAG_NAMES)}
+    ir_addr, = _IR_ADDR.unpack_from(dados, pos)
+    pos += _IR_ADDR.size
+    regs = struct.unpack_from("<32I", dados, pos)
+    pos += 32 * 4
+    indices = [i for i, in _INDICE.iter_unpack(dados[pos:pos + n * _INDICE.size])]
+    pos += n * _INDICE.size
+    conteudo = zlib.decompress(dados[pos:])
+    tamanho = len(PAGINA_ZERO)
+    if len(conteudo) != n * tamanho or any(i >= N_PAGES for i in indices):
+        raise ValueError(f"Snapshot corrompido: '{path}'")
+    paginas = [PAGINA_ZERO] * N_PAGES
+    for k, i in enumerate(indices):
+        paginas[i] = _palavras_le(conteudo[k * tamanho:(k + 1) * tamanho])
+    return Instantaneo(pc, cycle, halted, None if ir_addr < 0 else ir_addr,
+                       regs, (op, a, b, result), tuple(paginas))
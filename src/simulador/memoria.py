@@ -1,11 +1,65 @@
 # memoria.py
 # Memória word-addressed com 65536 posições (0..65535), cada posição guarda 32 bits (int)
+# Armazenada num array compacto de inteiros sem sinal de 32 bits (256 KiB por instância)
+# As 256 palavras do topo (BASE_DE_E_S..MEM_SIZE-1) podem receber dispositivos de
+# E/S mapeados em memória (ver map_device e dispositivos.py)
+
+from array import array
 
 MEM_SIZE = 65536
 
+# Páginas de 256 palavras para o registro de posições escritas
+PAGE_BITS = 8
+PAGE_SIZE = 1 << PAGE_BITS
+N_PAGES = MEM_SIZE >> PAGE_BITS
+
+# Typecode de 32 bits sem sinal ('I' na maioria das plataformas)
+WORD_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+
+# Página zerada (bytes), compartilhada por todos os snapshots
+PAGINA_ZERO = bytes(PAGE_SIZE * array(WORD_TYPECODE).itemsize)
+
+# Início da janela de E/S mapeada em memória
+BASE_DE_E_S = MEM_SIZE - 256
+
 class Memoria:
+    # Espaço de endereçamento: loads e stores mascaram o endereço com mascara
+    # (memoria_esparsa.MemoriaEsparsa cobre 24 ou 32 bits)
+    tamanho = MEM_SIZE
+    mascara = MEM_SIZE - 1
+
+    __slots__ = ("_mem", "_code", "_code_listeners", "_delta", "_paginas_sujas",
+                 "_pendente", "_paginas_base", "_paginas_novas", "_vigias", "_dispositivos")
+
     def __init__(self):
-        self._mem = [0] * MEM_SIZE
+        self._mem = array(WORD_TYPECODE, [0]) * MEM_SIZE
+        # Endereços cuja decodificação está em cache em algum motor de execução
+        self._code = set()
+        # Funções chamadas com o endereço quando uma escrita atinge código em cache
+        self._code_listeners = []
+        # Endereços escritos desde o último checkpoint() ...
+        self._delta = set()
+        # ... e páginas escritas antes dele. Só essas podem ter valor != 0.
+        self._paginas_sujas = set()
+        # Endereços do delta já entregues a um snapshot_pages() (ainda fazem
+        # parte de changes_since_checkpoint())
+        self._pendente = set()
+        # Páginas do último snapshot_pages()/restore_pages() e páginas escritas
+        # depois dele (fora as do delta atual)
+        self._paginas_base = (PAGINA_ZERO,) * N_PAGES
+        self._paginas_novas = set()
+        # Vigias de acesso por página (ver add_watch); vazio = sem ganchos
+        self._vigias = {}
+        # Endereço da janela de E/S -> (dispositivo, deslocamento) (ver map_device)
+        self._dispositivos = {}
+
+    def add_code_listener(self, fn):
+        """Registra fn(addr), chamada quando uma escrita invalida um endereço de código."""
+        self._code_listeners.append(fn)
+
+    def mark_code(self, addr: int):
+        """Marca addr como código decodificado (escritas nele invalidam os caches)."""
+        self._code.add(addr)
 
     def load_program(self, mem_map):
         """mem_map: dict endereco->instricao_binaria_string(32)"""
@@ -13,6 +67,23 @@ class Memoria:
             if addr < 0 or addr >= MEM_SIZE:
                 raise IndexError("Endereço de programa fora do alcance")
             self._mem[addr] = int(bits, 2)
+            self._delta.add(addr)
+            if addr in self._code:
+                self._invalidate_code(addr)
+
+    def load_segments(self, segmentos):
+        """segmentos: lista de (endereco_base, array de palavras) -- cópia em bloco por segmento"""
+        for base, words in segmentos:
+            fim = base + len(words)
+            if base < 0 or fim > MEM_SIZE:
+                raise IndexError("Endereço de programa fora do alcance")
+            if words.typecode != WORD_TYPECODE:
+                words = array(WORD_TYPECODE, words)
+            self._mem[base:fim] = words
+            self._delta.update(range(base, fim))
+            if self._code:
+                for addr in [a for a in self._code if base <= a < fim]:
+                    self._invalidate_code(addr)
 
     def read(self, addr: int) -> int:
         if addr < 0 or addr >= MEM_SIZE:
@@ -23,7 +94,216 @@ class Memoria:
         if addr < 0 or addr >= MEM_SIZE:
             raise IndexError("Escrita fora do intervalo de memoria")
         self._mem[addr] = value & 0xFFFFFFFF
+        self._delta.add(addr)
+        if addr in self._code:
+            # Código auto-modificável: descarta a decodificação em cache
+            self._invalidate_code(addr)
+
+    # Caminho rápido sem verificação de limites, para motores que já garantiram
+    # que addr está em 0..MEM_SIZE-1 (ex.: endereço mascarado com 0xFFFF).
+    # read/write continuam sendo a API verificada, útil para depuração.
+    def read_unchecked(self, addr: int) -> int:
+        return self._mem[addr]
+
+    def write_unchecked(self, addr: int, value: int):
+        self._mem[addr] = value & 0xFFFFFFFF
+        self._delta.add(addr)
+        if addr in self._code:
+            self._invalidate_code(addr)
+
+    def add_watch(self, inicio: int, fim: int, callback, leitura=False, escrita=True):
+        """
+        Chama callback(addr, valor, escrita) nos acessos feitos por instruções
+        (read_unchecked/write_unchecked) a inicio..fim-1; escritas são avisadas
+        depois de feitas. Retorna o identificador para remove_watch().
+        Enquanto houver vigias a memória vira MemoriaVigiada; sem elas, os
+        acessos não pagam nada.
+        """
+        if not 0 <= inicio < fim <= MEM_SIZE:
+            raise IndexError("Intervalo de vigia fora da memoria")
+        vigia = (inicio, fim, leitura, escrita, callback)
+        for pagina in range(inicio >> PAGE_BITS, ((fim - 1) >> PAGE_BITS) + 1):
+            self._vigias.setdefault(pagina, []).append(vigia)
+        self._atualizar_classe()
+        return vigia
+
+    def remove_watch(self, vigia):
+        inicio, fim = vigia[0], vigia[1]
+        for pagina in range(inicio >> PAGE_BITS, ((fim - 1) >> PAGE_BITS) + 1):
+            vigias = self._vigias.get(pagina)
+            if vigias and vigia in vigias:
+                vigias.remove(vigia)
+                if not vigias:
+                    del self._vigias[pagina]
+        self._atualizar_classe()
+
+    def map_device(self, inicio: int, dispositivo):
+        """
+        Mapeia dispositivo (com .tamanho palavras, ler(deslocamento) e
+        escrever(deslocamento, valor)) em inicio..inicio+tamanho-1, dentro da
+        janela de E/S. Loads, stores e faa nesses endereços vão ao dispositivo;
+        read/write (carga de programa, depurador) continuam vendo a RAM.
+        """
+        fim = inicio + dispositivo.tamanho
+        if not BASE_DE_E_S <= inicio < fim <= MEM_SIZE:
+            raise IndexError(f"Dispositivo fora da janela de E/S ({BASE_DE_E_S}..{MEM_SIZE - 1})")
+        if any(addr in self._dispositivos for addr in range(inicio, fim)):
+            raise ValueError(f"Dispositivo sobreposto a outro em {inicio}..{fim - 1}")
+        for addr in range(inicio, fim):
+            self._dispositivos[addr] = (dispositivo, addr - inicio)
+        self._atualizar_classe()
+
+    def unmap_device(self, dispositivo):
+        for addr in [a for a, (d, _) in self._dispositivos.items() if d is dispositivo]:
+            del self._dispositivos[addr]
+        self._atualizar_classe()
+
+    def _atualizar_classe(self):
+        # Sem vigias nem dispositivos os acessos não pagam nada
+        if self._dispositivos:
+            self.__class__ = MemoriaMapeada
+        elif self._vigias:
+            self.__class__ = MemoriaVigiada
+        else:
+            self.__class__ = Memoria
+
+    def _invalidate_code(self, addr: int):
+        self._code.discard(addr)
+        for fn in self._code_listeners:
+            fn(addr)
+
+    def checkpoint(self):
+        """
+        Fecha o delta atual: retorna changes_since_checkpoint() e começa um
+        novo delta vazio. Custo proporcional ao número de endereços escritos.
+        """
+        changes = self.changes_since_checkpoint()
+        paginas = {addr >> PAGE_BITS for addr in self._delta}
+        self._paginas_sujas |= paginas
+        self._paginas_novas |= paginas
+        self._delta = set()
+        self._pendente = set()
+        return changes
+
+    def changes_since_checkpoint(self):
+        """Pares (addr, valor atual), ordenados, dos endereços escritos desde o último checkpoint()."""
+        mem = self._mem
+        return [(addr, mem[addr]) for addr in sorted(self._pendente | self._delta)]
+
+    def snapshot_pages(self):
+        """
+        Tupla imutável com as N_PAGES páginas da memória (bytes). Só as páginas
+        escritas desde o snapshot/restore anterior são copiadas; as demais são
+        os mesmos objetos do anterior (compartilhadas, copy-on-write).
+        """
+        delta = {addr >> PAGE_BITS for addr in self._delta}
+        self._paginas_sujas |= delta
+        alteradas = self._paginas_novas | delta
+        paginas = list(self._paginas_base)
+        mem = self._mem
+        for pagina in alteradas:
+            base = pagina << PAGE_BITS
+            paginas[pagina] = mem[base:base + PAGE_SIZE].tobytes()
+        paginas = tuple(paginas)
+        self._paginas_base = paginas
+        self._paginas_novas = set()
+        self._pendente |= self._delta
+        self._delta = set()
+        return paginas
+
+    def restore_pages(self, paginas):
+        """
+        Restaura a memória a partir de uma tupla de snapshot_pages(). Copia só
+        as páginas que podem diferir do estado atual. Conta como checkpoint().
+        """
+        if len(paginas) != N_PAGES:
+            raise ValueError("Snapshot de memória com número de páginas inválido")
+        anterior = self._paginas_base
+        alteradas = self._paginas_novas | {addr >> PAGE_BITS for addr in self._delta}
+        alteradas.update(i for i in range(N_PAGES) if paginas[i] is not anterior[i])
+        mem = self._mem
+        for pagina in alteradas:
+            base = pagina << PAGE_BITS
+            mem[base:base + PAGE_SIZE] = array(WORD_TYPECODE, paginas[pagina])
+        if self._code:
+            for addr in [a for a in self._code if a >> PAGE_BITS in alteradas]:
+                self._invalidate_code(addr)
+        self._paginas_base = paginas
+        self._paginas_novas = set()
+        self._paginas_sujas = {i for i in range(N_PAGES) if paginas[i] is not PAGINA_ZERO}
+        self._delta = set()
+        self._pendente = set()
 
     def dump_modified(self):
         """Retorna pares (addr, value) para posições que não são zero (útil para saída)"""
-        return [(i, v) for i, v in enumerate(self._mem) if v != 0]
+        # Só varre as páginas que já receberam alguma escrita
+        mem = self._mem
+        paginas = self._paginas_sujas | {addr >> PAGE_BITS for addr in self._delta}
+        modified = []
+        for pagina in sorted(paginas):
+            base = pagina << PAGE_BITS
+            modified.extend(
+                (base + i, v) for i, v in enumerate(mem[base:base + PAGE_SIZE]) if v != 0
+            )
+        return modified
+
+
+def exigir_memoria(mem, recurso):
+    """
+    Snapshots, vigias e dispositivos dependem das páginas fixas de Memoria;
+    com outra memória (memoria_esparsa.MemoriaEsparsa) recurso é recusado.
+    """
+    if not isinstance(mem, Memoria):
+        raise ValueError(f"{recurso} requer a Memoria de 16 bits "
+                         f"(não suportado com {type(mem).__name__})")
+
+
+class MemoriaVigiada(Memoria):
+    """Memoria com vigias ativas: acessos de instruções às páginas vigiadas chamam os ganchos."""
+    __slots__ = ()
+
+    def read_unchecked(self, addr: int) -> int:
+        value = self._mem[addr]
+        vigias = self._vigias.get(addr >> PAGE_BITS)
+        if vigias:
+            for inicio, fim, leitura, _, callback in vigias:
+                if leitura and inicio <= addr < fim:
+                    callback(addr, value, False)
+        return value
+
+    def write_unchecked(self, addr: int, value: int):
+        Memoria.write_unchecked(self, addr, value)
+        vigias = self._vigias.get(addr >> PAGE_BITS)
+        if vigias:
+            for inicio, fim, _, escrita, callback in vigias:
+                if escrita and inicio <= addr < fim:
+                    callback(addr, self._mem[addr], True)
+
+
+class MemoriaMapeada(MemoriaVigiada):
+    """
+    Memoria com dispositivos na janela de E/S: acessos de instruções abaixo de
+    BASE_DE_E_S pagam só a comparação do endereço; os da janela vão ao dispositivo.
+    """
+    __slots__ = ()
+
+    def read_unchecked(self, addr: int) -> int:
+        if addr < BASE_DE_E_S:
+            if self._vigias:
+                return MemoriaVigiada.read_unchecked(self, addr)
+            return self._mem[addr]
+        mapeado = self._dispositivos.get(addr)
+        if mapeado is None:
+            return MemoriaVigiada.read_unchecked(self, addr)
+        dispositivo, deslocamento = mapeado
+        return dispositivo.ler(deslocamento) & 0xFFFFFFFF
+
+    def write_unchecked(self, addr: int, value: int):
+        if addr < BASE_DE_E_S or addr not in self._dispositivos:
+            if self._vigias:
+                MemoriaVigiada.write_unchecked(self, addr, value)
+            else:
+                Memoria.write_unchecked(self, addr, value)
+            return
+        dispositivo, deslocamento = self._dispositivos[addr]
+        dispositivo.escrever(deslocamento, value & 0xFFFFFFFF)
@@ -0,0 +1,184 @@
+# memoria_esparsa.py
+# Memória esparsa paginada para o espaço de endereçamento de 24 bits (o alcance
+# de j/jal) ou de 32 bits. Páginas de PAGINA_SIZE palavras só são alocadas na
+# primeira escrita; leituras de páginas nunca escritas devolvem 0 sem alocar.
+# Um programa pequeno ocupa poucas páginas em vez das 65536 palavras de Memoria.
+#
+# Mesma interface de Memoria usada pelos motores (read/write verificados,
+# read_unchecked/write_unchecked, carga de programa, ouvintes de código,
+# checkpoint e dump_modified), mais tamanho e mascara: com ela a CPU usa
+# despacho.tabela_de_despacho(mascara), e load/store/faa passam a endereçar os
+# 24 (ou 32) bits. loadi e storei continuam limitados aos seus imediatos.
+#
+# Não suportado aqui: CPU.snapshot/restore (e a volta no tempo do depurador),
+# vigias e dispositivos mapeados, que dependem das páginas fixas de Memoria;
+# eles recusam esta memória com ValueError (memoria.exigir_memoria).
+#
+# Uso:
+#   from src.simulador.memoria_esparsa import MemoriaEsparsa
+#   cpu = CPU("programa.txt", mem=MemoriaEsparsa(bits=24))
+#   python -m src.simulador.memoria_esparsa <programa> [--bits 16|24|32]
+#          [--engine run|run_fast|run_fused|run_blocks] [--max-instructions N]
+
+from array import array
+
+from src.simulador.memoria import WORD_TYPECODE
+
+# Páginas de 1024 palavras (4 KiB)
+PAGINA_BITS = 10
+PAGINA_SIZE = 1 << PAGINA_BITS
+PAGINA_MASCARA = PAGINA_SIZE - 1
+
+_BYTES_POR_PAGINA = PAGINA_SIZE * array(WORD_TYPECODE).itemsize
+
+
+class MemoriaEsparsa:
+    __slots__ = ("tamanho", "mascara", "_paginas", "_code", "_code_listeners", "_delta")
+
+    def __init__(self, bits=24):
+        if bits not in (16, 24, 32):
+            raise ValueError(f"Espaço de endereçamento de {bits} bits não suportado (16, 24 ou 32)")
+        self.tamanho = 1 << bits
+        self.mascara = self.tamanho - 1
+        # Número da página -> array de PAGINA_SIZE palavras
+        self._paginas = {}
+        # Como em Memoria: endereços de código decodificado e quem avisar
+        self._code = set()
+        self._code_listeners = []
+        # Endereços escritos desde o último checkpoint()
+        self._delta = set()
+
+    @property
+    def paginas_residentes(self):
+        return len(self._paginas)
+
+    @property
+    def bytes_residentes(self):
+        """Bytes ocupados pelas páginas alocadas."""
+        return len(self._paginas) * _BYTES_POR_PAGINA
+
+    def _alocar(self, numero):
+        pagina = array(WORD_TYPECODE, [0]) * PAGINA_SIZE
+        self._paginas[numero] = pagina
+        return pagina
+
+    def add_code_listener(self, fn):
+        """Registra fn(addr), chamada quando uma escrita invalida um endereço de código."""
+        self._code_listeners.append(fn)
+
+    def mark_code(self, addr: int):
+        self._code.add(addr)
+
+    def _invalidate_code(self, addr: int):
+        self._code.discard(addr)
+        for fn in self._code_listeners:
+            fn(addr)
+
+    def load_program(self, mem_map):
+        """mem_map: dict endereco->instricao_binaria_string(32)"""
+        for addr, bits in mem_map.items():
+            if addr < 0 or addr >= self.tamanho:
+                raise IndexError("Endereço de programa fora do alcance")
+            self.write(addr, int(bits, 2))
+
+    def load_segments(self, segmentos):
+        """segmentos: lista de (endereco_base, array de palavras) -- cópia por página"""
+        for base, words in segmentos:
+            fim = base + len(words)
+            if base < 0 or fim > self.tamanho:
+                raise IndexError("Endereço de programa fora do alcance")
+            if words.typecode != WORD_TYPECODE:
+                words = array(WORD_TYPECODE, words)
+            addr = base
+            while addr < fim:
+                numero, inicio = addr >> PAGINA_BITS, addr & PAGINA_MASCARA
+                n = min(PAGINA_SIZE - inicio, fim - addr)
+                pagina = self._paginas.get(numero)
+                if pagina is None:
+                    pagina = self._alocar(numero)
+                pagina[inicio:inicio + n] = words[addr - base:addr - base + n]
+                addr += n
+            self._delta.update(range(base, fim))
+            if self._code:
+                for addr in [a for a in self._code if base <= a < fim]:
+                    self._invalidate_code(addr)
+
+    def read(self, addr: int) -> int:
+        if addr < 0 or addr >= self.tamanho:
+            raise IndexError("Leitura fora do intervalo de memoria")
+        pagina = self._paginas.get(addr >> PAGINA_BITS)
+        return pagina[addr & PAGINA_MASCARA] if pagina is not None else 0
+
+    def write(self, addr: int, value: int):
+        if addr < 0 or addr >= self.tamanho:
+            raise IndexError("Escrita fora do intervalo de memoria")
+        self.write_unchecked(addr, value)
+
+    # Caminho rápido: o endereço já foi mascarado com self.mascara. A página é
+    # buscada direto no dict; só a primeira escrita numa página a aloca.
+    def read_unchecked(self, addr: int) -> int:
+        try:
+            return self._paginas[addr >> 10][addr & 0x3FF]  # PAGINA_BITS, PAGINA_MASCARA
+        except KeyError:
+            return 0
+
+    def write_unchecked(self, addr: int, value: int):
+        try:
+            self._paginas[addr >> 10][addr & 0x3FF] = value & 0xFFFFFFFF
+        except KeyError:
+            self._alocar(addr >> PAGINA_BITS)[addr & PAGINA_MASCARA] = value & 0xFFFFFFFF
+        self._delta.add(addr)
+        if addr in self._code:
+            self._invalidate_code(addr)
+
+    def checkpoint(self):
+        """Como Memoria.checkpoint: devolve o delta desde o anterior e começa outro."""
+        changes = self.changes_since_checkpoint()
+        self._delta = set()
+        return changes
+
+    def changes_since_checkpoint(self):
+        return [(addr, self.read_unchecked(addr)) for addr in sorted(self._delta)]
+
+    def dump_modified(self):
+        """Pares (addr, value) das posições não nulas, em ordem de endereço."""
+        modified = []
+        for numero in sorted(self._paginas):
+            base = numero << PAGINA_BITS
+            modified.extend((base + i, v) for i, v in enumerate(self._paginas[numero]) if v != 0)
+        return modified
+
+
+def main(argv=None):
+    import argparse
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.memoria_esparsa",
+                                     description="Executa um programa sobre a memória esparsa "
+                                                 "e mostra a memória residente.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--bits", type=int, choices=(16, 24, 32), default=24)
+    parser.add_argument("--engine", choices=("run", "run_fast", "run_fused", "run_blocks"),
+                        default="run_fast")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    args = parser.parse_args(argv)
+
+    mem = MemoriaEsparsa(args.bits)
+    cpu = CPU(args.programa, mem=mem)
+    if args.engine == "run":
+        cpu.run(max_cycles=4 * args.max_instructions, verbose=False)
+    else:
+        getattr(cpu, args.engine)(args.max_instructions)
+    denso = 65536 * array(WORD_TYPECODE).itemsize
+    print(f"Espaço de {args.bits} bits ({mem.tamanho} palavras), {cpu.cycle} ciclos, "
+          f"{'HALT' if cpu.halted else 'limite de instruções'}")
+    print(f"Páginas residentes: {mem.paginas_residentes} x {PAGINA_SIZE} palavras = "
+          f"{mem.bytes_residentes} bytes (Memoria de 16 bits: {denso} bytes)")
+    print("Registers non-zero:", cpu.rf.dump_nonzero())
+    print("Mem (non-zero small sample):", mem.dump_modified()[:10])
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
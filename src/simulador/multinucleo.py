@@ -0,0 +1,178 @@
+# multinucleo.py
+# Simulação de N núcleos UFLA-RISC com uma única Memoria compartilhada. Cada
+# núcleo é uma CPU com seus registradores, flags, PC e caches de decodificação;
+# escritas de um núcleo em código invalidam as decodificações de todos (os
+# ouvintes de código ficam na Memoria compartilhada).
+#
+# Escalonamento determinístico: os núcleos se revezam em fatias de até
+# `quantum` instruções, executadas pelo motor escolhido (run_fast por padrão).
+# Sem semente, a ordem é circular com fatias de exatamente `quantum`; com
+# semente, o próximo núcleo e o tamanho da fatia (1..quantum) são sorteados
+# por um random.Random(semente), então a mesma semente reproduz o mesmo
+# entrelaçamento. Cada instrução é indivisível: a troca de núcleo só acontece
+# entre instruções, e faa (fetch-and-add) lê e escreve a memória na mesma.
+#
+# Todos os núcleos começam no PC 0 com r30 = número do núcleo e r29 = núcleos - 1;
+# com um só núcleo os registradores ficam zerados e o programa roda como numa CPU.
+# O tempo paralelo estimado é o maior número de ciclos entre os núcleos.
+#
+# Uso:
+#   python -m src.simulador.multinucleo <programa> [--nucleos N] [--quantum Q]
+#          [--semente S] [--engine run_fast|run_fused|run_blocks] [--max-instructions N]
+#          [--escala 1,2,4,8]
+
+import random
+
+from src.simulador.unidade_de_controle import CPU
+
+ENGINES = ("run_fast", "run_fused", "run_blocks")
+
+# Registradores iniciados pelo escalonador
+REGISTRADOR_DO_NUCLEO = 30
+REGISTRADOR_DE_NUCLEOS = 29
+
+
+class Multinucleo:
+    """N CPUs sobre uma Memoria, entrelaçadas por fatias de instruções."""
+
+    def __init__(self, program_path, nucleos=2, quantum=100, semente=None,
+                 engine="run_fast", cache_de_montagem=None):
+        if nucleos < 1:
+            raise ValueError(f"Número de núcleos inválido: {nucleos}")
+        if quantum < 1:
+            raise ValueError(f"Quantum inválido: {quantum}")
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconhecido: '{engine}'")
+        primeiro = CPU(program_path, cache_de_montagem)
+        self.mem = primeiro.mem
+        self.nucleos = [primeiro] + [CPU(None, mem=self.mem) for _ in range(nucleos - 1)]
+        for i, cpu in enumerate(self.nucleos):
+            cpu.rf.regs[REGISTRADOR_DO_NUCLEO] = i
+            cpu.rf.regs[REGISTRADOR_DE_NUCLEOS] = nucleos - 1
+        self.quantum = quantum
+        self.semente = semente
+        self.engine = engine
+        self._rng = random.Random(semente) if semente is not None else None
+        self._proximo = 0
+        # Por núcleo: instruções executadas e fatias recebidas
+        self.instrucoes = [0] * nucleos
+        self.fatias = [0] * nucleos
+
+    @property
+    def halted(self):
+        return all(cpu.halted for cpu in self.nucleos)
+
+    @property
+    def ciclos_paralelos(self):
+        """Ciclos se os núcleos executassem ao mesmo tempo (o mais lento define)."""
+        return max(cpu.cycle for cpu in self.nucleos)
+
+    def _escolher(self, vivos):
+        if self._rng is None:
+            # Circular: o primeiro núcleo vivo a partir de _proximo
+            n = len(self.nucleos)
+            for k in range(n):
+                i = (self._proximo + k) % n
+                if i in vivos:
+                    self._proximo = i + 1
+                    return i, self.quantum
+        return self._rng.choice(vivos), self._rng.randint(1, self.quantum)
+
+    def executar(self, max_instructions=10000000):
+        """
+        Executa até todos os núcleos pararem (HALT) ou max_instructions no total.
+        Chamadas seguidas continuam o mesmo entrelaçamento.
+        Retorna o número de instruções executadas nesta chamada.
+        """
+        total = 0
+        while total < max_instructions:
+            vivos = [i for i, cpu in enumerate(self.nucleos) if not cpu.halted]
+            if not vivos:
+                break
+            i, n = self._escolher(vivos)
+            n = min(n, max_instructions - total)
+            try:
+                executadas = getattr(self.nucleos[i], self.engine)(n)
+            except Exception as e:
+                raise type(e)(f"núcleo {i}: {e}") from e
+            self.instrucoes[i] += executadas
+            self.fatias[i] += 1
+            total += executadas
+        return total
+
+    def estatisticas(self):
+        """Lista com um dict por núcleo: instruções, ciclos, fatias, PC e se parou."""
+        return [{"core": i, "instructions": self.instrucoes[i], "cycles": cpu.cycle,
+                 "slices": self.fatias[i], "pc": cpu.PC, "halted": cpu.halted}
+                for i, cpu in enumerate(self.nucleos)]
+
+    def relatorio(self):
+        total = sum(self.instrucoes)
+        linhas = [f"{len(self.nucleos)} núcleo(s), quantum {self.quantum}, "
+                  f"{'semente ' + str(self.semente) if self.semente is not None else 'circular'}, "
+                  f"motor {self.engine}",
+                  f"Instruções: {total}",
+                  f"Ciclos paralelos: {self.ciclos_paralelos} (sequencial: {4 * total})",
+                  "",
+                  f"  {'núcleo':>6s} {'instruções':>12s} {'ciclos':>12s} {'fatias':>8s} {'PC':>8s}  estado"]
+        for e in self.estatisticas():
+            linhas.append(f"  {e['core']:6d} {e['instructions']:12d} {e['cycles']:12d}"
+                          f" {e['slices']:8d} {e['pc']:8d}  {'halt' if e['halted'] else 'executando'}")
+        return "\n".join(linhas)
+
+
+def escala(program_path, contagens, quantum=100, semente=None, engine="run_fast",
+           max_instructions=10000000):
+    """
+    Executa o programa com cada número de núcleos em contagens. Devolve uma
+    lista de (núcleos, instruções, ciclos paralelos, aceleração em relação à
+    primeira contagem).
+    """
+    linhas = []
+    base = None
+    for n in contagens:
+        sistema = Multinucleo(program_path, n, quantum, semente, engine)
+        sistema.executar(max_instructions)
+        ciclos = sistema.ciclos_paralelos
+        if base is None:
+            base = ciclos
+        linhas.append((n, sum(sistema.instrucoes), ciclos, base / ciclos if ciclos else 0.0))
+    return linhas
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.multinucleo",
+                                     description="Executa um programa em N núcleos com memória compartilhada.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--nucleos", type=int, default=2)
+    parser.add_argument("--quantum", type=int, default=100,
+                        help="instruções por fatia (máximo, com semente; padrão: 100)")
+    parser.add_argument("--semente", type=int, default=None,
+                        help="sorteia núcleo e tamanho da fatia (reproduzível)")
+    parser.add_argument("--engine", choices=ENGINES, default="run_fast")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções somando todos os núcleos (padrão: 10000000)")
+    parser.add_argument("--escala", default=None,
+                        help="números de núcleos separados por vírgula: tabela de aceleração")
+    args = parser.parse_args(argv)
+
+    if args.escala:
+        contagens = [int(n) for n in args.escala.split(",") if n]
+        print(f"  {'núcleos':>7s} {'instruções':>12s} {'ciclos':>12s} {'aceleração':>10s}")
+        for n, instrucoes, ciclos, aceleracao in escala(args.programa, contagens, args.quantum,
+                                                        args.semente, args.engine,
+                                                        args.max_instructions):
+            print(f"  {n:7d} {instrucoes:12d} {ciclos:12d} {aceleracao:10.2f}")
+        return 0
+
+    sistema = Multinucleo(args.programa, args.nucleos, args.quantum, args.semente, args.engine)
+    sistema.executar(args.max_instructions)
+    print(sistema.relatorio())
+    print("Memória (não nula, amostra):", sistema.mem.dump_modified()[:10])
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# perfilador.py
+# Perfilador de execução opcional: histograma de opcodes, contagem por PC,
+# desvios tomados/não tomados por beq/bne e histogramas de endereços de load/store
+# (faa conta nos dois).
+#
+# Não há nenhum "if perfilando" no laço de execução: CPU.run/run_fast trocam
+# cpu.handlers por uma tabela instrumentada (instrumentar()) só durante a
+# execução perfilada. Sem perfilador, a tabela é a de despacho original.
+
+from collections import Counter
+import json
+
+from src.interpretador.interpretador_de_instrucoes import OPCODES
+
+
+class Perfilador:
+    def __init__(self):
+        self.opcodes = Counter()     # mnemonic -> execuções
+        self.pcs = Counter()         # endereço -> execuções
+        self.desvios = {}            # endereço do beq/bne -> [tomados, não tomados]
+        self.loads = Counter()       # endereço lido -> acessos (load/loadi/faa)
+        self.stores = Counter()      # endereço escrito -> acessos (store/storei/faa)
+        self.mnemonicos = {}         # endereço -> mnemonic (para o relatório)
+
+    @property
+    def total(self):
+        return sum(self.opcodes.values())
+
+    def instrumentar(self, handlers):
+        """Retorna uma cópia da tabela de despacho com cada handler envolvido por contadores."""
+        # Entradas além dos 256 opcodes (ex.: pontos de parada do depurador)
+        # passam adiante sem instrumentação
+        return [self._envolver(opcode, handler)
+                for opcode, handler in enumerate(handlers[:256])] + list(handlers[256:])
+
+    def _envolver(self, opcode, handler):
+        mnemonic = OPCODES.get(opcode, "unknown")
+        opcodes = self.opcodes
+        pcs = self.pcs
+        mnemonicos = self.mnemonicos
+
+        if mnemonic in ("beq", "bne"):
+            desvios = self.desvios
+            igual = mnemonic == "beq"
+            def perfilado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                opcodes[mnemonic] += 1
+                pcs[pc] += 1
+                mnemonicos[pc] = mnemonic
+                site = desvios.get(pc)
+                if site is None:
+                    site = desvios[pc] = [0, 0]
+                # Tomado pela condição (um offset 0 também conta como tomado)
+                site[0 if (ra_val == rb_val) == igual else 1] += 1
+                return handler(cpu, d, ra_val, rb_val, rc_val)
+            return perfilado
+
+        if mnemonic in ("load", "loadi", "store", "storei"):
+            histograma = self.loads if mnemonic.startswith("load") else self.stores
+            # Endereços por registrador usam a máscara da memória (16, 24 ou 32 bits)
+            if mnemonic == "load":
+                endereco = lambda cpu, d, ra_val, rc_val: ra_val & cpu.mem.mascara
+            elif mnemonic == "loadi":
+                endereco = lambda cpu, d, ra_val, rc_val: d.end24 & 0xFFFF
+            elif mnemonic == "store":
+                endereco = lambda cpu, d, ra_val, rc_val: rc_val & cpu.mem.mascara
+            else:
+                endereco = lambda cpu, d, ra_val, rc_val: d.rc & 0xFFFF
+            def perfilado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                opcodes[mnemonic] += 1
+                pcs[pc] += 1
+                mnemonicos[pc] = mnemonic
+                histograma[endereco(cpu, d, ra_val, rc_val)] += 1
+                return handler(cpu, d, ra_val, rb_val, rc_val)
+            return perfilado
+
+        if mnemonic == "faa":
+            # faa lê e escreve MEM[rb]: conta nos dois histogramas
+            loads, stores = self.loads, self.stores
+            def perfilado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                opcodes[mnemonic] += 1
+                pcs[pc] += 1
+                mnemonicos[pc] = mnemonic
+                addr = rb_val & cpu.mem.mascara
+                loads[addr] += 1
+                stores[addr] += 1
+                return handler(cpu, d, ra_val, rb_val, rc_val)
+            return perfilado
+
+        def perfilado(cpu, d, ra_val, rb_val, rc_val):
+            pc = cpu.PC - 1
+            opcodes[mnemonic] += 1
+            pcs[pc] += 1
+            mnemonicos[pc] = mnemonic
+            return handler(cpu, d, ra_val, rb_val, rc_val)
+        return perfilado
+
+    def to_dict(self):
+        """Resultado em formato serializável (JSON)."""
+        return {
+            "instructions": self.total,
+            "opcodes": dict(self.opcodes.most_common()),
+            "pcs": {str(pc): n for pc, n in sorted(self.pcs.items())},
+            "branches": {
+                str(pc): {"taken": t, "not_taken": nt}
+                for pc, (t, nt) in sorted(self.desvios.items())
+            },
+            "loads": {str(a): n for a, n in sorted(self.loads.items())},
+            "stores": {str(a): n for a, n in sorted(self.stores.items())},
+        }
+
+    def salvar(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def relatorio(self, top=10):
+        """Tabela resumida: opcodes, PCs mais executados, desvios e endereços mais acessados."""
+        total = self.total or 1
+        linhas = [f"Instruções executadas: {self.total}", "", "Opcodes:"]
+        for mnemonic, n in self.opcodes.most_common():
+            linhas.append(f"  {mnemonic:10s} {n:12d}  {100 * n / total:6.2f}%")
+
+        linhas += ["", f"PCs mais executados (top {top}):"]
+        for pc, n in self.pcs.most_common(top):
+            linhas.append(f"  {pc:6d}  {self.mnemonicos.get(pc, '?'):10s} {n:12d}  {100 * n / total:6.2f}%")
+
+        if self.desvios:
+            linhas += ["", "Desvios (tomados / não tomados):"]
+            for pc, (t, nt) in sorted(self.desvios.items(), key=lambda x: -sum(x[1]))[:top]:
+                linhas.append(f"  {pc:6d}  {self.mnemonicos.get(pc, '?'):4s} {t:10d} / {nt:<10d}"
+                              f"  {100 * t / (t + nt):6.2f}% tomados")
+
+        for titulo, histograma in (("Loads", self.loads), ("Stores", self.stores)):
+            if histograma:
+                linhas += ["", f"{titulo}: {sum(histograma.values())} acessos, "
+                               f"{len(histograma)} endereços (top {top}):"]
+                for addr, n in histograma.most_common(top):
+                    linhas.append(f"  {addr:6d} {n:12d}")
+        return "\n".join(linhas)
+
+
+def main(argv=None):
+    import argparse
+    import sys
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.perfilador",
+                                     description="Perfila a execução de um programa UFLA-RISC.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    parser.add_argument("--top", type=int, default=10, help="linhas por seção do relatório")
+    parser.add_argument("--json", default=None, help="grava o perfil completo em JSON")
+    args = parser.parse_args(argv)
+
+    perfilador = Perfilador()
+    cpu = CPU(args.programa)
+    cpu.run_fast(args.max_instructions, profiler=perfilador)
+    sys.stdout.write(perfilador.relatorio(args.top) + "\n")
+    if args.json:
+        perfilador.salvar(args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
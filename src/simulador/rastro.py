@@ -0,0 +1,239 @@
+# rastro.py
+# Rastro binário de execução: um registro de tamanho fixo por instrução,
+# gravado em buffer (sem print nem varredura da memória a cada passo).
+#
+# Formato do arquivo (little-endian):
+#   cabeçalho "<4sHH": MAGIC, VERSAO, tamanho do registro
+#   registros "<IIBBHIII":
+#     pc, palavra da instrução,
+#     registrador escrito (SEM_REGISTRADOR se nenhum), flags (bits neg|zero|carry|overflow),
+#     reservado, valor escrito no registrador,
+#     endereço escrito na memória (SEM_ENDERECO se nenhum), valor escrito na memória
+#
+# Assim como o perfilador, o gravador entra trocando cpu.handlers por uma
+# tabela instrumentada (CPU.run/run_fast com trace=); sem rastro não há custo.
+#
+# Uso:
+#   python -m src.simulador.rastro gravar <programa> <saida.trc> [--max-instructions N]
+#   python -m src.simulador.rastro ler <saida.trc> [--limite N]
+
+from collections import namedtuple
+import struct
+
+from src.interpretador.interpretador_de_instrucoes import OPCODES
+from src.simulador.alu import FLAG_NAMES
+
+MAGIC = b"URTR"
+VERSAO = 1
+
+_CABECALHO = struct.Struct("<4sHH")
+_REGISTRO = struct.Struct("<IIBBHIII")
+
+SEM_REGISTRADOR = 0xFF
+SEM_ENDERECO = 0xFFFFFFFF
+
+# Registros acumulados antes de cada escrita no arquivo
+REGISTROS_POR_BLOCO = 4096
+
+RegistroDeRastro = namedtuple(
+    "RegistroDeRastro", ["pc", "word", "reg", "flags", "reg_value", "mem_addr", "mem_value"]
+)
+
+
+def _palavra(d):
+    # Os campos decodificados cobrem os 32 bits da instrução
+    return (d.opcode << 24) | (d.ra << 16) | (d.rb << 8) | d.rc
+
+
+def _bits_das_flags(flags):
+    valores = flags.as_dict()
+    bits = 0
+    for i, nome in enumerate(FLAG_NAMES):
+        if valores[nome]:
+            bits |= 1 << i
+    return bits
+
+
+class GravadorDeRastro:
+    """Grava o rastro em path. Use como context manager ou chame fechar()."""
+
+    def __init__(self, path, registros_por_bloco=REGISTROS_POR_BLOCO):
+        self._arquivo = open(path, "wb")
+        self._arquivo.write(_CABECALHO.pack(MAGIC, VERSAO, _REGISTRO.size))
+        self._buffer = bytearray()
+        self._limite = registros_por_bloco * _REGISTRO.size
+        self.registros = 0
+        # Última operação da ALU vista e suas flags já convertidas em bits
+        self._flags_chave = None
+        self._flags_bits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def flush(self):
+        if self._buffer:
+            self._arquivo.write(self._buffer)
+            self._buffer = bytearray()
+        self._arquivo.flush()
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self.flush()
+            self._arquivo.close()
+
+    def _flags(self, flags):
+        chave = (flags.op, flags.a, flags.b, flags.result)
+        if chave != self._flags_chave:
+            self._flags_chave = chave
+            self._flags_bits = _bits_das_flags(flags)
+        return self._flags_bits
+
+    def instrumentar(self, handlers):
+        """Retorna uma cópia da tabela de despacho que grava um registro por instrução."""
+        # Entradas além dos 256 opcodes (ex.: pontos de parada do depurador)
+        # passam adiante sem instrumentação
+        return [self._envolver(opcode, handler)
+                for opcode, handler in enumerate(handlers[:256])] + list(handlers[256:])
+
+    def _envolver(self, opcode, handler):
+        mnemonic = OPCODES.get(opcode)
+        pack = _REGISTRO.pack
+        gravador = self
+
+        if mnemonic in ("store", "storei"):
+            # Endereços por registrador usam a máscara da memória (16, 24 ou 32 bits)
+            if mnemonic == "store":
+                endereco = lambda cpu, d, rc_val: rc_val & cpu.mem.mascara
+            else:
+                endereco = lambda cpu, d, rc_val: d.rc & 0xFFFF
+            def rastreado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                wb = handler(cpu, d, ra_val, rb_val, rc_val)
+                gravador._gravar(pack(pc & 0xFFFFFFFF, _palavra(d), SEM_REGISTRADOR,
+                                      gravador._flags(cpu.flags), 0, 0,
+                                      endereco(cpu, d, rc_val), ra_val & 0xFFFFFFFF))
+                return wb
+            return rastreado
+
+        if mnemonic == "faa":
+            # faa escreve no registrador e na memória
+            def rastreado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                wb = handler(cpu, d, ra_val, rb_val, rc_val)
+                addr = rb_val & cpu.mem.mascara
+                reg, valor = wb if wb[0] < 32 else (SEM_REGISTRADOR, 0)
+                gravador._gravar(pack(pc & 0xFFFFFFFF, _palavra(d), reg,
+                                      gravador._flags(cpu.flags), 0, valor & 0xFFFFFFFF,
+                                      addr, cpu.mem.read_unchecked(addr)))
+                return wb
+            return rastreado
+
+        if mnemonic == "jal":
+            # jal escreve r31 direto no banco (não volta pelo WB)
+            def rastreado(cpu, d, ra_val, rb_val, rc_val):
+                pc = cpu.PC - 1
+                retorno = cpu.PC
+                wb = handler(cpu, d, ra_val, rb_val, rc_val)
+                gravador._gravar(pack(pc & 0xFFFFFFFF, _palavra(d), 31,
+                                      gravador._flags(cpu.flags), 0, retorno & 0xFFFFFFFF,
+                                      SEM_ENDERECO, 0))
+                return wb
+            return rastreado
+
+        def rastreado(cpu, d, ra_val, rb_val, rc_val):
+            pc = cpu.PC - 1
+            wb = handler(cpu, d, ra_val, rb_val, rc_val)
+            if wb is not None and wb[0] < 32:
+                reg, valor = wb[0], wb[1] & 0xFFFFFFFF
+            else:
+                reg, valor = SEM_REGISTRADOR, 0
+            gravador._gravar(pack(pc & 0xFFFFFFFF, _palavra(d), reg,
+                                  gravador._flags(cpu.flags), 0, valor, SEM_ENDERECO, 0))
+            return wb
+        return rastreado
+
+    def _gravar(self, registro):
+        buffer = self._buffer
+        buffer += registro
+        self.registros += 1
+        if len(buffer) >= self._limite:
+            self._arquivo.write(buffer)
+            self._buffer = bytearray()
+
+
+def ler_rastro(path):
+    """Gera os RegistroDeRastro de um arquivo de rastro."""
+    with open(path, "rb") as f:
+        cabecalho = f.read(_CABECALHO.size)
+        if len(cabecalho) < _CABECALHO.size:
+            raise ValueError(f"{path}: rastro truncado")
+        magic, versao, tamanho = _CABECALHO.unpack(cabecalho)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: não é um arquivo de rastro")
+        if versao != VERSAO or tamanho != _REGISTRO.size:
+            raise ValueError(f"{path}: versão de rastro não suportada ({versao})")
+        while True:
+            bloco = f.read(REGISTROS_POR_BLOCO * tamanho)
+            if not bloco:
+                break
+            completo = len(bloco) - len(bloco) % tamanho
+            for campos in _REGISTRO.iter_unpack(bloco[:completo]):
+                pc, word, reg, flags, _, reg_value, mem_addr, mem_value = campos
+                yield RegistroDeRastro(pc, word, reg, flags, reg_value, mem_addr, mem_value)
+            if completo != len(bloco):
+                raise ValueError(f"{path}: registro final incompleto")
+
+
+def formatar(registro):
+    """Uma linha de texto legível para um registro."""
+    mnemonic = OPCODES.get(registro.word >> 24, "unknown")
+    partes = [f"{registro.pc:6d}: {registro.word:08x} {mnemonic:8s}"]
+    if registro.reg != SEM_REGISTRADOR:
+        partes.append(f"r{registro.reg} <- {registro.reg_value}")
+    if registro.mem_addr != SEM_ENDERECO:
+        partes.append(f"mem[{registro.mem_addr}] <- {registro.mem_value}")
+    flags = "".join(nome[0].upper() if registro.flags >> i & 1 else "-"
+                    for i, nome in enumerate(FLAG_NAMES))
+    partes.append(f"[{flags}]")
+    return "  ".join(partes)
+
+
+def main(argv=None):
+    import argparse
+    import itertools
+    import sys
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.rastro",
+                                     description="Grava e lê rastros binários de execução.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    gravar = sub.add_parser("gravar", help="executa um programa gravando o rastro")
+    gravar.add_argument("programa")
+    gravar.add_argument("saida")
+    gravar.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    ler = sub.add_parser("ler", help="converte um rastro em texto")
+    ler.add_argument("rastro")
+    ler.add_argument("--limite", type=int, default=None, help="número máximo de registros")
+    args = parser.parse_args(argv)
+
+    if args.comando == "gravar":
+        from src.simulador.unidade_de_controle import CPU
+        cpu = CPU(args.programa)
+        with GravadorDeRastro(args.saida) as gravador:
+            cpu.run_fast(args.max_instructions, trace=gravador)
+        print(f"{gravador.registros} registros gravados em {args.saida}")
+        return 0
+
+    try:
+        for registro in itertools.islice(ler_rastro(args.rastro), args.limite):
+            sys.stdout.write(formatar(registro) + "\n")
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
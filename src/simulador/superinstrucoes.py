@@ -0,0 +1,290 @@
+# superinstrucoes.py
+# Superinstruções: sequências frequentes de instruções executadas por um único
+# handler fundido, economizando as rodadas de despacho (busca no cache de
+# decodificação, atualização do PC, desempacotamento) das instruções internas.
+#
+# Padrões reconhecidos:
+#   lcl_msb rX + lcl_lsb rX       -> constante de 32 bits num passo só
+#   inc/dec rX + bne/beq          -> contador de laço e desvio
+#   load + op da ALU + store      -> ler, operar e gravar
+#
+# A análise (pré-decodificação) é feita na primeira vez que o PC chega a um
+# endereço e fica em cache pelo PC de entrada, como no tradutor de blocos.
+# Um salto para o meio de uma sequência cai num endereço com entrada própria,
+# então executa só a partir dali. Escritas em código fundido invalidam a entrada.
+# Cada instrução fundida continua contando 4 ciclos.
+#
+# Cada fusão é um handler com opcode próprio (acima dos 256 da ISA) na tabela de
+# despacho: o laço é o de CPU.run_fast, e o código sem fusão não paga nenhum
+# teste a mais por instrução.
+#
+# Uso:
+#   python -m src.simulador.superinstrucoes <programa> [--max-instructions N]
+
+from collections import Counter, namedtuple
+
+from src.simulador.despacho import HANDLERS
+from src.simulador.tradutor import _ALU, _sign_extend_8_to_32
+import src.simulador.alu as alu
+
+# Handlers das fusões ficam na tabela de despacho a partir deste índice, um por sítio
+_PRIMEIRO_OPCODE = 256
+
+# Registrador de WB que marca o retorno de uma fusão: o valor é o número de
+# instruções internas (n - 1), somado pelo laço de executar
+_INTERNAS = 256
+
+# Entrada fundida; desempacota como InstrucaoDecodificada (opcode, mnemonic, ra,
+# rb, rc, ...), com operandos r0 e o opcode do handler do sítio (funcao). ultimo
+# é o endereço da última instrução fundida.
+Fusao = namedtuple("Fusao", ["opcode", "padrao", "ra", "rb", "rc", "funcao", "n", "ultimo"])
+
+
+class Superinstrucoes:
+    """
+    Cache de superinstruções de uma CPU, indexado pelo PC de entrada.
+    Cada valor é uma Fusao ou a própria InstrucaoDecodificada quando não há
+    fusão começando ali.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.entradas = {}
+        self._por_endereco = {}   # endereço -> PCs de entrada das fusões que o contêm
+        self.sitios = Counter()   # padrão -> fusões criadas
+        self.execucoes = Counter()  # padrão -> vezes que a fusão executou
+        self.instrucoes = 0       # instruções executadas (fundidas ou não)
+        self.invalidadas = 0
+        # Handler de cada sítio (opcode _PRIMEIRO_OPCODE + k) e posições livres
+        self._fusoes = []
+        self._livres = []
+        # cpu.handlers[:256] seguida de _fusoes (ver _tabela)
+        self._base = None
+        self._handlers = None
+        cpu.mem.add_code_listener(self._invalidar)
+
+    def _tabela(self):
+        handlers = self.cpu.handlers
+        if handlers is not self._base:
+            self._base = handlers
+            self._handlers = list(handlers[:_PRIMEIRO_OPCODE]) + self._fusoes
+        return self._handlers
+
+    def _invalidar(self, addr):
+        # Instrução isolada decodificada em addr
+        entrada = self.entradas.get(addr)
+        if entrada is not None and type(entrada) is not Fusao:
+            del self.entradas[addr]
+        for pc in self._por_endereco.pop(addr, ()):
+            entrada = self.entradas.pop(pc, None)
+            if type(entrada) is Fusao:
+                self.invalidadas += 1
+                self._livres.append(entrada.opcode)
+
+    def _decodificar(self, addr):
+        cpu = self.cpu
+        return cpu.decode_at(addr, cpu.mem.read(addr))
+
+    def _registrar(self, funcao):
+        # Opcode do handler funcao: uma posição livre ou uma nova no fim da tabela
+        if self._livres:
+            opcode = self._livres.pop()
+            self._fusoes[opcode - _PRIMEIRO_OPCODE] = funcao
+            if self._handlers is not None:
+                self._handlers[opcode] = funcao
+        else:
+            opcode = _PRIMEIRO_OPCODE + len(self._fusoes)
+            self._fusoes.append(funcao)
+            if self._handlers is not None:
+                self._handlers.append(funcao)
+        return opcode
+
+    def preparar(self, pc):
+        """Analisa a sequência que começa em pc; guarda e devolve a entrada."""
+        d0 = self._decodificar(pc)
+        fusao = None
+        tamanho = self.cpu.mem.tamanho
+        if pc + 1 < tamanho:
+            d1 = self._decodificar(pc + 1)
+            fusao = _fundir_par(self.cpu, pc, d0, d1, self.execucoes)
+            if fusao is None and pc + 2 < tamanho and d0.mnemonic == "load" \
+                    and d1.mnemonic in _ALU:
+                fusao = _fundir_trio(self.cpu, pc, d0, d1, self._decodificar(pc + 2),
+                                     self.execucoes)
+        if fusao is None:
+            self.entradas[pc] = d0
+            return d0
+        funcao, n, padrao = fusao
+        entrada = Fusao(self._registrar(funcao), padrao, 0, 0, 0, funcao, n, pc + n - 1)
+        self.entradas[pc] = entrada
+        for addr in range(pc, pc + n):
+            self._por_endereco.setdefault(addr, set()).add(pc)
+        self.sitios[padrao] += 1
+        return entrada
+
+    def executar(self, max_instructions):
+        """Executa até HALT ou max_instructions. Retorna instruções executadas."""
+        cpu = self.cpu
+        entradas = self.entradas
+        preparar = self.preparar
+        handlers = self._tabela()
+        regs = cpu.rf.regs
+        # Antes deste limite qualquer fusão (até 3 instruções) cabe em max_instructions
+        limite = max_instructions - 2
+        executed = 0
+        pc = None
+        d = None
+        try:
+            # Mesmo laço de CPU.run_fast; só o WB de uma fusão cai no elif
+            while not cpu.halted and executed < limite:
+                pc = cpu.PC
+                d = entradas.get(pc)
+                if d is None:
+                    d = preparar(pc)
+                cpu.PC = pc + 1
+                opcode, _, ra, rb, rc, _, _, _ = d
+                wb = handlers[opcode](
+                    cpu, d,
+                    regs[ra] if ra < 32 else 0,
+                    regs[rb] if rb < 32 else 0,
+                    regs[rc] if rc < 32 else 0,
+                )
+                if wb is not None:
+                    reg_idx, value = wb
+                    if reg_idx < 32:
+                        regs[reg_idx] = value
+                    elif reg_idx == _INTERNAS:
+                        executed += value
+                executed += 1
+        finally:
+            cpu.cycle += 4 * executed
+            self.instrucoes += executed
+        if executed:
+            if type(d) is Fusao:
+                pc = d.ultimo
+                d = self._decodificar(pc)
+            cpu.IR_addr = pc
+            cpu.IR = cpu.mem.read(pc)
+            cpu.decoded = d
+            cpu.writeback_info = None
+        # Últimas instruções até o limite, onde uma fusão poderia passar dele
+        if executed < max_instructions and not cpu.halted:
+            resto = cpu.run_fast(max_instructions - executed)
+            self.instrucoes += resto
+            executed += resto
+        return executed
+
+    def relatorio(self):
+        """Texto com as fusões criadas e executadas por padrão."""
+        fundidas = sum(self.execucoes[p] * (p.count("+") + 1) for p in self.execucoes)
+        total = self.instrucoes
+        linhas = [f"Instruções executadas: {total}",
+                  f"Instruções em superinstruções: {fundidas}"
+                  f" ({100.0 * fundidas / total if total else 0.0:.1f}%)",
+                  f"Despachos economizados: {fundidas - sum(self.execucoes.values())}",
+                  f"Fusões invalidadas: {self.invalidadas}",
+                  "",
+                  f"{'padrão':24s} {'sítios':>8s} {'execuções':>12s}"]
+        for padrao, vezes in self.execucoes.most_common():
+            linhas.append(f"{padrao:24s} {self.sitios[padrao]:8d} {vezes:12d}")
+        for padrao in sorted(set(self.sitios) - set(self.execucoes)):
+            linhas.append(f"{padrao:24s} {self.sitios[padrao]:8d} {0:12d}")
+        return "\n".join(linhas)
+
+
+def _fundir_par(cpu, pc, d0, d1, execucoes):
+    # As fusões são handlers (mesma assinatura da tabela de despacho) que contam
+    # a execução em execucoes e devolvem (_INTERNAS, n - 1) ao laço
+    regs = cpu.rf.regs
+    m0, m1 = d0.mnemonic, d1.mnemonic
+
+    if m0 == "lcl_msb" and m1 == "lcl_lsb" and d0.rc == d1.rc and d0.rc < 32:
+        # O resultado não depende do valor anterior do registrador
+        idx = d0.rc
+        valor = ((d0.const16 << 16) & 0xFFFF0000) | (d1.const16 & 0xFFFF)
+        seguinte = pc + 2
+        padrao = "lcl_msb+lcl_lsb"
+        internas = (_INTERNAS, 1)
+
+        def fundida(cpu, d, ra_val, rb_val, rc_val):
+            regs[idx] = valor
+            cpu.PC = seguinte
+            execucoes[padrao] += 1
+            return internas
+        return (fundida, 2, padrao)
+
+    if m0 in ("inc", "dec") and m1 in ("bne", "beq") \
+            and d0.ra < 32 and d1.ra < 32 and d1.rb < 32:
+        idx, x, y = d0.ra, d1.ra, d1.rb
+        passo = 1 if m0 == "inc" else 0xFFFFFFFF
+        flags = cpu.flags
+        logica = alu.FLAGS_LOGIC
+        seguinte = pc + 2
+        alvo = (seguinte + _sign_extend_8_to_32(d1.const8)) & 0xFFFFFFFF
+        # bne desvia quando diferente; beq quando igual
+        alvo_se_diferente = alvo if m1 == "bne" else seguinte
+        alvo_se_igual = seguinte if m1 == "bne" else alvo
+        padrao = f"{m0}+{m1}"
+        internas = (_INTERNAS, 1)
+
+        def fundida(cpu, d, ra_val, rb_val, rc_val):
+            r = (regs[idx] + passo) & 0xFFFFFFFF
+            regs[idx] = r
+            flags.record(logica, 0, 0, r)
+            cpu.PC = alvo_se_diferente if regs[x] != regs[y] else alvo_se_igual
+            execucoes[padrao] += 1
+            return internas
+        return (fundida, 2, padrao)
+
+    return None
+
+
+def _fundir_trio(cpu, pc, d0, d1, d2, execucoes):
+    if d2.mnemonic != "store":
+        return None
+    if max(d0.ra, d0.rc, d1.ra, d1.rb, d1.rc, d2.ra, d2.rc) >= 32:
+        return None
+    regs = cpu.rf.regs
+    origem, destino_load = d0.ra, d0.rc
+    operacao = HANDLERS[d1.opcode]
+    ra1, rb1, rc1 = d1.ra, d1.rb, d1.rc
+    valor, endereco = d2.ra, d2.rc
+    seguinte = pc + 3
+    mascara = cpu.mem.mascara
+    padrao = f"load+{d1.mnemonic}+store"
+    internas = (_INTERNAS, 2)
+
+    def fundida(cpu, d, ra_val, rb_val, rc_val):
+        mem = cpu.mem
+        regs[destino_load] = mem.read_unchecked(regs[origem] & mascara)
+        wb = operacao(cpu, d1, regs[ra1], regs[rb1], regs[rc1])
+        if wb is not None:
+            regs[wb[0]] = wb[1]
+        mem.write_unchecked(regs[endereco] & mascara, regs[valor])
+        cpu.PC = seguinte
+        execucoes[padrao] += 1
+        return internas
+    return (fundida, 3, padrao)
+
+
+def main(argv=None):
+    import argparse
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.superinstrucoes",
+                                     description="Executa um programa com superinstruções "
+                                                 "e mostra as estatísticas de fusão.")
+    parser.add_argument("programa")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    args = parser.parse_args(argv)
+
+    cpu = CPU(args.programa)
+    fusao = Superinstrucoes(cpu)
+    fusao.executar(args.max_instructions)
+    print(fusao.relatorio())
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# temporizacao.py
+# Modelo de temporização de um núcleo com pipeline (4 ou 5 estágios), calculado
+# como anotação sobre o simulador funcional: a execução continua instrução a
+# instrução (CPU.run/run_fast/run_fused com timing=) e, para cada instrução, o
+# modelo calcula em que ciclo ela entra no EX a partir de quando seus operandos
+# ficam prontos. Não há simulação estágio a estágio.
+#
+# Estágios:
+#   5: IF ID EX MEM WB     (load entrega o valor no fim do MEM)
+#   4: IF ID EX/MEM WB     (mesma divisão de unidade_de_controle; load entrega no EX/MEM)
+#
+# Regras do modelo (emissão em ordem, uma instrução por ciclo):
+#   - RAW: a instrução espera no ID até os registradores lidos estarem disponíveis.
+#     Com forwarding, um resultado da ALU vai direto para o EX seguinte e um load
+#     (5 estágios) custa 1 bolha (load-use); sem forwarding, o valor só é lido no
+#     ID no ciclo do WB do produtor (escrita na 1ª metade, leitura na 2ª).
+#   - store só precisa do dado no MEM (5 estágios com forwarding).
+#   - Desvios: previsão "não tomado"; beq/bne e jr resolvem no EX
+#     (penalidade_desvio ciclos quando desviam), j/jal no ID (penalidade_salto).
+#
+# Uso:
+#   python -m src.simulador.temporizacao <programa> [--estagios 4|5] [--sem-forwarding]
+
+from collections import Counter
+import json
+
+from src.interpretador.interpretador_de_instrucoes import OPCODES
+
+# Campos de registrador na InstrucaoDecodificada (opcode, mnemonic, ra, rb, rc, ...)
+_RA, _RB, _RC = 2, 3, 4
+
+# Registradores lidos por instrução; as não listadas (ex.: registradas via
+# despacho.registrar_instrucao) leem os três campos, por segurança
+_FONTES = {
+    "add": (_RB, _RC), "sub": (_RB, _RC), "xor": (_RB, _RC), "or": (_RB, _RC),
+    "and": (_RB, _RC), "asl": (_RB, _RC), "lsl": (_RB, _RC), "asr": (_RB, _RC),
+    "lsr": (_RB, _RC), "mul": (_RB, _RC), "div": (_RB, _RC), "mod": (_RB, _RC),
+    "zeros": (), "passnota": (_RA,), "passa": (_RA,), "neg": (_RA,),
+    "inc": (_RA,), "dec": (_RA,),
+    "lcl_msb": (_RC,), "lcl_lsb": (_RC,),
+    "load": (_RA,), "loadi": (), "faa": (_RB, _RC),
+    "store": (_RC, _RA), "storei": (_RA,),
+    "beq": (_RA, _RB), "bne": (_RA, _RB), "jr": (_RA,),
+    "jal": (), "j": (), "halt": (),
+}
+
+# Categorias de bolha
+DADOS, LOAD_USO, DESVIO, SALTO = range(4)
+CATEGORIAS = ("dados", "load_uso", "desvio", "salto")
+
+# Folga que torna um operando sempre disponível (preenche o teste rápido)
+_SEM_DEPENDENCIA = 1 << 62
+
+
+class ModeloDePipeline:
+    """
+    Acumula o tempo do programa no pipeline. Use como em
+    cpu.run_fast(n, timing=modelo); execuções seguidas continuam a mesma linha do tempo.
+    """
+
+    def __init__(self, estagios=5, forwarding=True, penalidade_desvio=2, penalidade_salto=1):
+        if estagios not in (4, 5):
+            raise ValueError(f"Modelo de pipeline com {estagios} estágios não suportado (4 ou 5)")
+        self.estagios = estagios
+        self.forwarding = forwarding
+        self.penalidade_desvio = penalidade_desvio
+        self.penalidade_salto = penalidade_salto
+        # Ciclos entre o EX e o fim do pipeline (MEM/WB)
+        self._depois_do_ex = estagios - 3
+        # Diferença mínima entre o EX do produtor e o EX de quem usa o resultado
+        if forwarding:
+            self._latencia_alu = 1
+            self._latencia_load = 2 if estagios == 5 else 1
+        else:
+            self._latencia_alu = self._latencia_load = self._depois_do_ex + 1
+        # Dado do store só é necessário no MEM (um ciclo depois do EX)
+        self._folga_store = 1 if forwarding and estagios == 5 else 0
+
+        # Linha do tempo: ciclos numerados a partir de 1; a primeira instrução
+        # faz IF no ciclo 1, ID no 2 e EX no 3.
+        # _estado[0]: EX mais cedo da próxima instrução; _estado[1]: EX da última
+        self._estado = [3, 0]
+        # Por registrador (256: índices >= 32 leem 0 e nunca criam dependência):
+        # EX mais cedo de quem lê o valor e se o produtor foi um load
+        self._pronto = [0] * 256
+        self._de_load = [False] * 256
+        self._bolhas = [0] * len(CATEGORIAS)
+        # mnemonic -> [execuções, ciclos esperando operandos, bolhas de controle causadas]
+        self._por_instrucao = {}
+
+    @property
+    def instrucoes(self):
+        return sum(c[0] for c in self._por_instrucao.values())
+
+    @property
+    def ciclos(self):
+        """Ciclos até o WB da última instrução executada."""
+        return self._estado[1] + self._depois_do_ex if self.instrucoes else 0
+
+    @property
+    def cpi(self):
+        n = self.instrucoes
+        return self.ciclos / n if n else 0.0
+
+    @property
+    def bolhas(self):
+        return dict(zip(CATEGORIAS, self._bolhas))
+
+    def instrumentar(self, handlers):
+        """Retorna uma cópia da tabela de despacho que anota o tempo de cada instrução."""
+        # Entradas além dos 256 opcodes (ex.: pontos de parada do depurador)
+        # passam adiante sem instrumentação
+        return [self._envolver(opcode, handler)
+                for opcode, handler in enumerate(handlers[:256])] + list(handlers[256:])
+
+    def _envolver(self, opcode, handler):
+        mnemonic = OPCODES.get(opcode, "unknown")
+        fontes = tuple((campo, self._folga_store if mnemonic == "store" and campo == _RA else 0)
+                       for campo in _FONTES.get(mnemonic, (_RA, _RB, _RC)))
+        estado = self._estado
+        pronto = self._pronto
+        de_load = self._de_load
+        bolhas = self._bolhas
+        eh_load = mnemonic in ("load", "loadi", "faa")
+        latencia = self._latencia_load if eh_load else self._latencia_alu
+        conta = self._por_instrucao.setdefault(mnemonic, [0, 0, 0])
+
+        def esperar(d, ex):
+            # Instrução parada no ID até todos os operandos estarem disponíveis
+            inicio = ex
+            carga = False
+            for campo, folga in fontes:
+                p = pronto[d[campo]] - folga
+                if p > ex:
+                    ex = p
+                    carga = de_load[d[campo]]
+            if ex != inicio:
+                bolhas[LOAD_USO if carga else DADOS] += ex - inicio
+                conta[1] += ex - inicio
+            return ex
+
+        # Teste rápido de até dois operandos no caminho sem bolha; com mais
+        # operandos, esperar() é sempre chamado
+        if len(fontes) <= 2:
+            (c1, f1), (c2, f2) = (fontes + ((_RA, _SEM_DEPENDENCIA),) * 2)[:2]
+        else:
+            (c1, f1), (c2, f2) = ((_RA, -_SEM_DEPENDENCIA),) * 2
+
+        if mnemonic in ("beq", "bne", "jr", "j", "jal"):
+            penalidade = self.penalidade_salto if mnemonic in ("j", "jal") else self.penalidade_desvio
+            categoria = DESVIO if mnemonic in ("beq", "bne") else SALTO
+            igual = mnemonic == "beq"
+            condicional = mnemonic in ("beq", "bne")
+            escreve_r31 = mnemonic == "jal"
+            latencia_r31 = self._latencia_alu
+
+            def anotado(cpu, d, ra_val, rb_val, rc_val):
+                ex = estado[0]
+                if pronto[d[c1]] - f1 > ex or pronto[d[c2]] - f2 > ex:
+                    ex = esperar(d, ex)
+                wb = handler(cpu, d, ra_val, rb_val, rc_val)
+                conta[0] += 1
+                if escreve_r31:
+                    pronto[31] = ex + latencia_r31
+                    de_load[31] = False
+                estado[1] = ex
+                # Tomado pela condição (um offset 0 também esvazia o pipeline)
+                if not condicional or (ra_val == rb_val) == igual:
+                    estado[0] = ex + 1 + penalidade
+                    bolhas[categoria] += penalidade
+                    conta[2] += penalidade
+                else:
+                    estado[0] = ex + 1
+                return wb
+            return anotado
+
+        def anotado(cpu, d, ra_val, rb_val, rc_val):
+            ex = estado[0]
+            if pronto[d[c1]] - f1 > ex or pronto[d[c2]] - f2 > ex:
+                ex = esperar(d, ex)
+            wb = handler(cpu, d, ra_val, rb_val, rc_val)
+            conta[0] += 1
+            if wb is not None and wb[0] < 32:
+                pronto[wb[0]] = ex + latencia
+                de_load[wb[0]] = eh_load
+            estado[0] = ex + 1
+            estado[1] = ex
+            return wb
+        return anotado
+
+    def to_dict(self):
+        """Resultado em formato serializável (JSON)."""
+        return {
+            "stages": self.estagios,
+            "forwarding": self.forwarding,
+            "instructions": self.instrucoes,
+            "cycles": self.ciclos,
+            "cpi": self.cpi,
+            "stalls": self.bolhas,
+            "per_instruction": {
+                mnemonic: {"count": n, "latency": self.estagios + espera / n,
+                           "stall_cycles": espera, "control_penalty": controle}
+                for mnemonic, (n, espera, controle) in sorted(self._por_instrucao.items()) if n
+            },
+        }
+
+    def salvar(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def relatorio(self):
+        """Tabela com CPI, bolhas por categoria e latência média por instrução."""
+        n = self.instrucoes
+        ciclos = self.ciclos
+        linhas = [f"Pipeline de {self.estagios} estágios, "
+                  f"{'com' if self.forwarding else 'sem'} forwarding",
+                  f"Instruções: {n}",
+                  f"Ciclos: {ciclos} (sem pipeline: {4 * n})",
+                  f"CPI: {self.cpi:.3f}",
+                  "",
+                  "Bolhas:"]
+        total = sum(self._bolhas)
+        for categoria, b in zip(CATEGORIAS, self._bolhas):
+            linhas.append(f"  {categoria:10s} {b:12d}  {100 * b / ciclos if ciclos else 0.0:6.2f}% dos ciclos")
+        linhas.append(f"  {'total':10s} {total:12d}")
+        linhas += ["", f"  {'instrução':10s} {'execuções':>12s} {'latência':>9s} {'espera':>10s} {'controle':>10s}"]
+        ordenadas = Counter({m: c[0] for m, c in self._por_instrucao.items() if c[0]})
+        for mnemonic, execucoes in ordenadas.most_common():
+            _, espera, controle = self._por_instrucao[mnemonic]
+            linhas.append(f"  {mnemonic:10s} {execucoes:12d} {self.estagios + espera / execucoes:9.2f}"
+                          f" {espera:10d} {controle:10d}")
+        return "\n".join(linhas)
+
+
+def main(argv=None):
+    import argparse
+    from src.simulador.unidade_de_controle import CPU
+    parser = argparse.ArgumentParser(prog="python -m src.simulador.temporizacao",
+                                     description="Estima o tempo de um programa num núcleo com pipeline.")
+    parser.add_argument("programa", help="programa (.txt, imagem ou .bin)")
+    parser.add_argument("--estagios", type=int, choices=(4, 5), default=5)
+    parser.add_argument("--sem-forwarding", action="store_true")
+    parser.add_argument("--penalidade-desvio", type=int, default=2,
+                        help="ciclos perdidos por beq/bne tomado e jr (padrão: 2)")
+    parser.add_argument("--penalidade-salto", type=int, default=1,
+                        help="ciclos perdidos por j/jal (padrão: 1)")
+    parser.add_argument("--max-instructions", type=int, default=10000000,
+                        help="limite de instruções (padrão: 10000000)")
+    parser.add_argument("--json", default=None, help="grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    cpu = CPU(args.programa)
+    modelo = ModeloDePipeline(args.estagios, not args.sem_forwarding,
+                              args.penalidade_desvio, args.penalidade_salto)
+    cpu.run_fast(args.max_instructions, timing=modelo)
+    print(modelo.relatorio())
+    if args.json:
+        modelo.salvar(args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# tradutor.py
+# Tradução dinâmica de blocos básicos: cada trecho linear de código terminado
+# em j/jal/jr/beq/bne/halt é traduzido uma vez para uma função Python gerada
+# (código-fonte + compile) e guardado em cache pelo PC de entrada.
+# Execução encadeia bloco a bloco; uma escrita em região traduzida invalida o bloco.
+
+from src.interpretador.interpretador_de_instrucoes import decode_word
+from src.simulador.despacho import tabela_de_despacho
+import src.simulador.alu as alu
+
+# Instruções que encerram um bloco básico
+TERMINADORES = {"j", "jal", "jr", "beq", "bne", "halt"}
+
+# Tamanho máximo de um bloco (instruções)
+MAX_BLOCO = 64
+
+# Operações da ALU: mnemonic -> (registrador destino, operandos, expressão do resultado)
+# Operandos: {a} = ra_val, {b} = rb_val, {c} = rc_val (já em locais, sem sinal)
+_ALU = {
+    "add":      ("ra", "bc", "({b} + {c}) & 0xFFFFFFFF"),
+    "sub":      ("ra", "bc", "({b} - {c}) & 0xFFFFFFFF"),
+    "xor":      ("ra", "bc", "{b} ^ {c}"),
+    "or":       ("ra", "bc", "{b} | {c}"),
+    "and":      ("ra", "bc", "{b} & {c}"),
+    "asl":      ("ra", "bc", "({b} << ({c} & 0x1F)) & 0xFFFFFFFF"),
+    "lsl":      ("ra", "bc", "({b} << ({c} & 0x1F)) & 0xFFFFFFFF"),
+    "asr":      ("ra", "bc", "((({b} ^ 0x80000000) - 0x80000000) >> ({c} & 0x1F)) & 0xFFFFFFFF"),
+    "lsr":      ("ra", "bc", "{b} >> ({c} & 0x1F)"),
+    "mul":      ("ra", "bc", "({b} * {c}) & 0xFFFFFFFF"),
+    "div":      ("ra", "bc", "({b} // {c}) if {c} else 0"),
+    "mod":      ("ra", "bc", "({b} % {c}) if {c} else 0"),
+    "zeros":    ("rc", "",   "0"),
+    "passnota": ("rc", "a",  "{a} ^ 0xFFFFFFFF"),
+    "passa":    ("rc", "a",  "{a}"),
+    "neg":      ("rc", "a",  "(-{a}) & 0xFFFFFFFF"),
+    "inc":      ("ra", "a",  "({a} + 1) & 0xFFFFFFFF"),
+    "dec":      ("ra", "a",  "({a} - 1) & 0xFFFFFFFF"),
+}
+
+def _reg(idx):
+    # campos de registrador têm 8 bits: índices >= 32 leem 0
+    return f"regs[{idx}]" if idx < 32 else "0"
+
+def _sign_extend_8_to_32(val_8_bit):
+    # Mesma extensão de CPU.sign_extend_8_to_32
+    if (val_8_bit & 0x80) != 0:
+        return val_8_bit | 0xFFFFFF00
+    return val_8_bit
+
+
+class TradutorDeBlocos:
+    """
+    Cache de blocos traduzidos de uma CPU. Cada bloco é (função, n_instruções);
+    a função executa o bloco inteiro e devolve o próximo PC.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.blocos = {}          # PC de entrada -> (função, n_instruções)
+        self._por_endereco = {}   # endereço -> PCs de entrada dos blocos que o contêm
+        # Sinalizadores compartilhados com o código gerado:
+        # _sujo[0]: uma escrita invalidou algum bloco durante a execução atual
+        # _parcial[0]: instruções executadas quando o bloco saiu antes do fim
+        self._sujo = [False]
+        self._parcial = [0]
+        self.traduzidos = 0
+        self.invalidados = 0
+        # Classe da memória quando os blocos foram gerados: o código gerado guarda
+        # os métodos de acesso, que mudam com vigias e dispositivos (ver memoria.py)
+        self._classe_da_memoria = type(cpu.mem)
+        # Handlers das instruções sem tradução própria, com a máscara de endereço da memória
+        self._handlers = tabela_de_despacho(cpu.mem.mascara)
+        cpu.mem.add_code_listener(self._invalidar)
+
+    def _invalidar(self, addr):
+        entradas = self._por_endereco.pop(addr, None)
+        if not entradas:
+            return
+        for entrada in entradas:
+            bloco = self.blocos.pop(entrada, None)
+            if bloco is not None:
+                self.invalidados += 1
+        self._sujo[0] = True
+
+    def _namespace(self):
+        cpu = self.cpu
+        return {
+            "cpu": cpu,
+            "regs": cpu.rf.regs,
+            # Endereços do código gerado são sempre mascarados com mem.mascara
+            "mem_read": cpu.mem.read_unchecked,
+            "mem_write": cpu.mem.write_unchecked,
+            "flags": cpu.flags,
+            "sujo": self._sujo,
+            "parcial": self._parcial,
+            "HANDLERS": self._handlers,
+        }
+
+    def traduzir(self, entrada):
+        """Traduz o bloco que começa em entrada e o guarda no cache."""
+        mem = self.cpu.mem
+        instrs = []
+        pc = entrada
+        while len(instrs) < MAX_BLOCO:
+            if pc >= mem.tamanho:
+                break
+            d = decode_word(mem.read(pc))
+            instrs.append((pc, d))
+            pc += 1
+            if d.mnemonic in TERMINADORES or d.mnemonic not in _TRADUZIVEIS:
+                break
+        if not instrs:
+            # Força o mesmo erro de busca do interpretador
+            mem.read(entrada)
+
+        fonte, constantes = _gerar_fonte(entrada, instrs, mem.mascara)
+        ns = self._namespace()
+        ns.update(constantes)
+        exec(compile(fonte, f"<bloco {entrada}>", "exec"), ns)
+        bloco = (ns["bloco"], len(instrs))
+
+        self.blocos[entrada] = bloco
+        for addr, _ in instrs:
+            self._por_endereco.setdefault(addr, set()).add(entrada)
+            mem.mark_code(addr)
+        self.traduzidos += 1
+        return bloco
+
+    def executar(self, max_instructions):
+        """Executa blocos encadeados até HALT ou max_instructions. Retorna instruções executadas."""
+        cpu = self.cpu
+        blocos = self.blocos
+        traduzir = self.traduzir
+        sujo = self._sujo
+        parcial = self._parcial
+        if type(cpu.mem) is not self._classe_da_memoria:
+            self._classe_da_memoria = type(cpu.mem)
+            self.invalidados += len(blocos)
+            blocos.clear()
+            self._por_endereco.clear()
+        executed = 0
+        resto = 0
+        try:
+            while not cpu.halted and executed < max_instructions:
+                pc = cpu.PC
+                bloco = blocos.get(pc)
+                if bloco is None:
+                    bloco = traduzir(pc)
+                fn, n = bloco
+                if executed + n > max_instructions:
+                    resto = max_instructions - executed
+                    break
+                sujo[0] = False
+                cpu.PC = fn()
+                if parcial[0]:
+                    executed += parcial[0]
+                    parcial[0] = 0
+                else:
+                    executed += n
+        finally:
+            cpu.cycle += 4 * executed
+        if resto:
+            # O último bloco não cabe no limite: termina instrução a instrução
+            executed += cpu.run_fast(resto)
+        return executed
+
+
+# Instruções com tradução própria; as demais (inclusive as registradas via
+# despacho.registrar_instrucao) viram chamada ao handler e encerram o bloco
+_TRADUZIVEIS = set(_ALU) | TERMINADORES | {"lcl_msb", "lcl_lsb", "load", "store", "storei", "loadi"}
+
+
+def _gerar_fonte(entrada, instrs, mascara=0xFFFF):
+    linhas = ["def bloco():"]
+    constantes = {}
+    ultima_alu = None  # código que registra nas flags a última operação da ALU
+
+    def sair(indent, proximo, k=None):
+        # k: instruções executadas se a saída for antecipada
+        if ultima_alu is not None:
+            linhas.append(indent + ultima_alu)
+        if k is not None:
+            linhas.append(f"{indent}parcial[0] = {k}")
+        linhas.append(f"{indent}return {proximo}")
+
+    for k, (pc, d) in enumerate(instrs):
+        m = d.mnemonic
+        ind = "    "
+        linhas.append(f"    # {pc}: {m} ra={d.ra} rb={d.rb} rc={d.rc}")
+        if m in _ALU:
+            destino, operandos, expr = _ALU[m]
+            if "a" in operandos:
+                linhas.append(f"{ind}a{k} = {_reg(d.ra)}")
+            if "b" in operandos:
+                linhas.append(f"{ind}b{k} = {_reg(d.rb)}")
+                linhas.append(f"{ind}c{k} = {_reg(d.rc)}")
+            linhas.append(f"{ind}r{k} = " + expr.format(a=f"a{k}", b=f"b{k}", c=f"c{k}"))
+            idx = d.ra if destino == "ra" else d.rc
+            if idx < 32:
+                linhas.append(f"{ind}regs[{idx}] = r{k}")
+            if m == "add":
+                ultima_alu = f"flags.record({alu.FLAGS_ADD}, b{k}, c{k}, r{k})"
+            elif m == "sub":
+                ultima_alu = f"flags.record({alu.FLAGS_SUB}, b{k}, c{k}, r{k})"
+            else:
+                # Demais operações: neg/zero do resultado, carry = overflow = 0
+                ultima_alu = f"flags.record({alu.FLAGS_LOGIC}, 0, 0, r{k})"
+
+        elif m == "lcl_msb":
+            if d.rc < 32:
+                linhas.append(f"{ind}regs[{d.rc}] = {(d.const16 << 16) & 0xFFFF0000} | (regs[{d.rc}] & 0x0000FFFF)")
+        elif m == "lcl_lsb":
+            if d.rc < 32:
+                linhas.append(f"{ind}regs[{d.rc}] = {d.const16 & 0xFFFF} | (regs[{d.rc}] & 0xFFFF0000)")
+        elif m == "load":
+            linhas.append(f"{ind}v{k} = mem_read({_reg(d.ra)} & {mascara:#x})")
+            if d.rc < 32:
+                linhas.append(f"{ind}regs[{d.rc}] = v{k}")
+        elif m == "loadi":
+            linhas.append(f"{ind}v{k} = mem_read({d.end24 & 0xFFFF})")
+            if d.ra < 32:
+                linhas.append(f"{ind}regs[{d.ra}] = v{k}")
+        elif m in ("store", "storei"):
+            endereco = f"{_reg(d.rc)} & {mascara:#x}" if m == "store" else str(d.rc & 0xFFFF)
+            linhas.append(f"{ind}mem_write({endereco}, {_reg(d.ra)})")
+            if k + 1 < len(instrs):
+                # Escrita em código traduzido: o restante do bloco pode estar obsoleto
+                linhas.append(f"{ind}if sujo[0]:")
+                sair(ind + "    ", pc + 1, k + 1)
+        elif m == "halt":
+            linhas.append(f"{ind}cpu.halted = True")
+            sair(ind, pc + 1)
+        elif m == "j":
+            sair(ind, d.end24)
+        elif m == "jal":
+            linhas.append(f"{ind}regs[31] = {pc + 1}")
+            sair(ind, d.end24)
+        elif m == "jr":
+            linhas.append(f"{ind}destino = {_reg(d.ra)}")
+            sair(ind, "destino")
+        elif m in ("beq", "bne"):
+            op = "==" if m == "beq" else "!="
+            alvo = (pc + 1 + _sign_extend_8_to_32(d.const8)) & 0xFFFFFFFF
+            linhas.append(f"{ind}if {_reg(d.ra)} {op} {_reg(d.rb)}:")
+            sair(ind + "    ", alvo)
+            sair(ind, pc + 1)
+        else:
+            # Instrução sem tradução própria: chama o handler da tabela de despacho
+            constantes[f"d{k}"] = d
+            if ultima_alu is not None:
+                linhas.append(f"{ind}{ultima_alu}")
+                ultima_alu = None
+            linhas.append(f"{ind}cpu.PC = {pc + 1}")
+            linhas.append(f"{ind}wb = HANDLERS[{d.opcode}](cpu, d{k}, {_reg(d.ra)}, {_reg(d.rb)}, {_reg(d.rc)})")
+            linhas.append(f"{ind}if wb is not None and wb[0] < 32:")
+            linhas.append(f"{ind}    regs[wb[0]] = wb[1]")
+            linhas.append(f"{ind}return cpu.PC")
+
+    ultimo = instrs[-1][1].mnemonic
+    if ultimo in _TRADUZIVEIS and ultimo not in TERMINADORES:
+        # Bloco cortado pelo tamanho máximo ou pelo fim da memória
+        sair("    ", instrs[-1][0] + 1)
+    return "\n".join(linhas) + "\n", constantes
+
+
+
+def comparar_motores(program_path, max_instructions=1000000):
+    """
+    Teste diferencial: executa o programa no interpretador (CPU.run) e nos
+    blocos traduzidos (CPU.run_blocks) e devolve a lista de diferenças no
+    estado final (vazia se os dois motores concordam).
+    """
+    from src.simulador.unidade_de_controle import CPU
+
+    referencia = CPU(program_path)
+    referencia.run(max_cycles=4 * max_instructions, verbose=False)
+    traduzida = CPU(program_path)
+    traduzida.run_blocks(max_instructions)
+
+    diferencas = []
+    for nome in ("PC", "cycle", "halted", "flags"):
+        esperado, obtido = getattr(referencia, nome), getattr(traduzida, nome)
+        if esperado != obtido:
+            diferencas.append(f"{nome}: {esperado} != {obtido}")
+    for i, (esperado, obtido) in enumerate(zip(referencia.rf.regs, traduzida.rf.regs)):
+        if esperado != obtido:
+            diferencas.append(f"r{i}: {esperado} != {obtido}")
+    if referencia.mem.dump_modified() != traduzida.mem.dump_modified():
+        diferencas.append("memória diferente")
+    return diferencas
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        sys.exit(1)
+    falhas = 0
+    for caminho in sys.argv[1:]:
+        diferencas = comparar_motores(caminho)
+        print(f"{caminho}: {'OK' if not diferencas else 'DIVERGE'}")
+        for linha in diferencas:
+            print("   ", linha)
+        falhas += bool(diferencas)
+    sys.exit(1 if falhas else 0)
@@ -2,283 +2,106 @@
 # Orquestra IF, ID, EX/MEM, WB em quatro rotinas por instrução
 # Usa interpretador_de_instrucoes, memoria, banco_de_registradores, alu
 
-from src.interpretador.interpretador_de_instrucoes import parse_program, asm_to_binary, decode_instruction
-from src.simulador.memoria import Memoria
+from array import array
+
+from src.interpretador.interpretador_de_instrucoes import parse_program, decode_word
+from src.interpretador.imagem import is_image, load_image
+from src.interpretador.cache_de_montagem import cache_padrao
+from src.simulador.memoria import Memoria, MemoriaMapeada, WORD_TYPECODE, exigir_memoria
 from src.simulador.banco_de_registradores import RegisterFile
-import src.simulador.alu as alu
-import os
+from src.simulador.despacho import tabela_de_despacho
+from src.simulador.alu import FlagsPreguicosas
+from src.simulador.tradutor import TradutorDeBlocos
+from src.simulador.superinstrucoes import Superinstrucoes
+from src.simulador.instantaneo import Instantaneo
+from src.simulador.dispositivos import SincronizadorDeCiclos
 
 class CPU:
-    def __init__(self, program_path):
-        # Se for .txt (assembly), converte para .bin
-        if program_path.endswith(".txt"):
-            bin_path = os.path.join("bin", os.path.basename(program_path).replace(".txt", ".bin"))
-            os.makedirs("bin", exist_ok=True)
-            asm_to_binary(program_path, bin_path)
-            program_path = bin_path
-        
-        self.mem = Memoria()
-        parsed = parse_program(program_path)
-        self.mem.load_program(parsed)
+    def __init__(self, program_path, cache_de_montagem=None, mem=None):
+        # mem: Memoria compartilhada com outros núcleos (ver multinucleo.py) ou
+        # outra implementação, como memoria_esparsa.MemoriaEsparsa
+        self.mem = mem if mem is not None else Memoria()
+        if program_path is None:
+            # Memória vazia (ex.: CPU.from_snapshot)
+            pass
+        elif program_path.endswith(".txt"):
+            # Assembly: usa a imagem do cache de montagem (monta só se o fonte mudou)
+            cache = cache_de_montagem or cache_padrao()
+            self.mem.load_segments(cache.carregar(program_path))
+        elif is_image(program_path):
+            self.mem.load_segments(load_image(program_path))
+        else:
+            # .bin antigo em texto (uma palavra de 32 caracteres '0'/'1' por linha)
+            parsed = parse_program(program_path)
+            self.mem.load_program(parsed)
         self.rf = RegisterFile()
         self.PC = 0
         self.IR = None  # 32-bit value
-        self.flags = {"neg":0, "zero":0, "carry":0, "overflow":0}
+        self.IR_addr = None  # endereço de onde IR foi buscado
+        # neg/zero/carry/overflow, calculadas só quando lidas (ver alu.FlagsPreguicosas)
+        self.flags = FlagsPreguicosas()
         self.halted = False
 
         self.decoded = None
+        self.operands = (0, 0, 0)  # valores de ra, rb, rc lidos no ID
         self.exec_result = None
         self.writeback_info = None
         self.cycle = 0
 
+        # Tabela de despacho por opcode. O perfilador e o rastro trocam por uma
+        # tabela instrumentada só durante a execução (ver perfilador.py e rastro.py).
+        # Os endereços de load/store seguem o espaço de endereçamento da memória.
+        self.handlers = tabela_de_despacho(self.mem.mascara)
+
+        # Cache de decodificação: endereço -> InstrucaoDecodificada.
+        # A memória avisa quando uma escrita atinge um endereço em cache.
+        self._decode_cache = {}
+        self.mem.add_code_listener(self._invalidate_decoded)
+        # Tradutor de blocos básicos, criado no primeiro run_blocks()
+        self._tradutor = None
+        # Cache de superinstruções, criado no primeiro run_fused()
+        self._superinstrucoes = None
+
+    def _invalidate_decoded(self, addr):
+        self._decode_cache.pop(addr, None)
+
+    def decode_at(self, addr, instr_word):
+        """Decodifica instr_word (buscada em addr) usando o cache de decodificação."""
+        decoded = self._decode_cache.get(addr)
+        if decoded is None:
+            decoded = decode_word(instr_word)
+            self._decode_cache[addr] = decoded
+            self.mem.mark_code(addr)
+        return decoded
+
     def if_stage(self):
         instr_word = self.mem.read(self.PC)
-        instr_bits = format(instr_word & 0xFFFFFFFF, '032b')
-        self.IR = instr_bits
+        self.IR = instr_word
+        self.IR_addr = self.PC
         self.PC += 1
-        return instr_bits
+        return instr_word
 
-    def id_stage(self, instr_bits):
+    def id_stage(self, instr_word):
         # decode and read registers
-        decoded = decode_instruction(instr_bits)
+        decoded = self.decode_at(self.IR_addr, instr_word)
         self.decoded = decoded
-        ra = decoded["ra"]
-        rb = decoded["rb"]
-        rc = decoded["rc"]
-        
-        if 0 <= ra < 32:
-            decoded["ra_val"] = self.rf.read(ra)
-        else:
-            decoded["ra_val"] = 0
-        
-        if 0 <= rb < 32:
-            decoded["rb_val"] = self.rf.read(rb)
-        else:
-            decoded["rb_val"] = 0
-            
-        if 0 <= rc < 32:
-            decoded["rc_val"] = self.rf.read(rc)
-        else:
-            decoded["rc_val"] = 0
-            
-        
+        regs = self.rf.regs
+        # campos de registrador têm 8 bits: índices >= 32 leem 0
+        self.operands = (
+            regs[decoded.ra] if decoded.ra < 32 else 0,
+            regs[decoded.rb] if decoded.rb < 32 else 0,
+            regs[decoded.rc] if decoded.rc < 32 else 0,
+        )
         return decoded
 
     def ex_mem_stage(self):
         d = self.decoded
         if not d:
             return None
-        mnem = d["mnemonic"]
-        ra = d["ra"]
-        ra_val = d["ra_val"]
-        rb_val = d["rb_val"]
-        rc = d["rc"]
-        rc_val = d["rc_val"]
-        rc_idx = d["rc"]
-        result = None
-        wb = {"write_reg": None, "write_val": None, "mem_write": None, "mem_addr": None}
-        # Handle instructions
-        if mnem == "halt":
-            self.halted = True
-        elif mnem == "add":
-            # add r1, r2, r3 -> r1 = r2 + r3 (format: dest, src1, src2)
-            # ra = destination, rb = src1, rc = src2
-            res = alu.add_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "sub":
-            # sub r1, r2, r3 -> r1 = r2 - r3
-            res = alu.sub_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "zeros":
-            res = alu.zeros_op()
-            result = res
-            wb["write_reg"] = rc_idx
-            wb["write_val"] = res.result
-
-        elif mnem == "xor":
-            # xor r1, r2, r3 -> r1 = r2 xor r3
-            res = alu.xor_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "or":
-            # or r1, r2, r3 -> r1 = r2 or r3
-            res = alu.or_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "passnota":
-            res = alu.not_op(ra_val)
-            result = res
-            wb["write_reg"] = rc_idx
-            wb["write_val"] = res.result
-
-        elif mnem == "and":
-            # and r1, r2, r3 -> r1 = r2 and r3
-            res = alu.and_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "asl":
-            # asl r1, r2, r3 -> r1 = r2 << r3
-            res = alu.asl_op(rb_val, rc_val & 0x1F)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "asr":
-            # asr r1, r2, r3 -> r1 = r2 >> r3 (arithmetic)
-            res = alu.asr_op(rb_val, rc_val & 0x1F)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "lsl":
-            # lsl r1, r2, r3 -> r1 = r2 << r3 (logical)
-            res = alu.lsl_op(rb_val, rc_val & 0x1F)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "lsr":
-            # lsr r1, r2, r3 -> r1 = r2 >> r3 (logical)
-            res = alu.lsr_op(rb_val, rc_val & 0x1F)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "passa":
-            res = alu.passa_op(ra_val)
-            result = res
-            wb["write_reg"] = rc_idx
-            wb["write_val"] = res.result
-
-        elif mnem == "lcl_msb":
-            const16 = d["const16"]  # bits 23..8
-            # rc = (const16 << 16) | (rc & 0x0000ffff)
-            old = d["rc_val"]
-            new = ((const16 << 16) & 0xFFFF0000) | (old & 0x0000FFFF)
-            wb["write_reg"] = d["rc"]
-            wb["write_val"] = new
-
-        elif mnem == "lcl_lsb":
-            const16 = d["const16"]
-            old = d["rc_val"]
-            new = (const16 & 0xFFFF) | (old & 0xFFFF0000)
-            wb["write_reg"] = d["rc"]
-            wb["write_val"] = new
-
-        elif mnem == "load":
-            # load rc, ra  → rc = MEM[ ra ]
-            addr = d["ra_val"] & 0xFFFF
-            val = self.mem.read(addr)
-
-            wb["write_reg"] = d["rc"]
-            wb["write_val"] = val
-
-
-        elif mnem == "store":
-            # store rc, ra  → MEM[ rc ] = ra
-            addr = d["rc_val"] & 0xFFFF
-            data = d["ra_val"]
-
-            self.mem.write(addr, data)
-
-        elif mnem == "storei":
-            # storei ra, imm8 → mem[imm8] = ra_val
-            address = d["rc"]
-            value = d["ra_val"]
-            self.mem.write(address & 0xFFFF, value)
-            wb = {}
-
-        elif mnem == "loadi":
-            addr = d["end24"] & 0xFFFF
-            val  = self.mem.read(addr)
-            wb["write_reg"] = d["rc"] 
-            wb["write_reg"] = d["ra"]
-            wb["write_val"] = val
-
-
-        elif mnem == "jal":
-            self.rf.write(31, self.PC)
-            self.PC = d["end24"]
-
-        elif mnem == "jr":
-            self.PC = d["ra_val"]
-
-        elif mnem == "beq":
-            offset = self.sign_extend_8_to_32(d["const8"])
-            
-            if d["ra_val"] == d["rb_val"]:
-                self.PC += offset
-
-        elif mnem == "bne":
-            offset = self.sign_extend_8_to_32(d["const8"])
-            
-            if d["ra_val"] != d["rb_val"]:
-                self.PC += offset
-
-        elif mnem == "j":
-            self.PC = d["end24"]
-
-        
-        elif mnem == "mul":
-            # mul r1, r2, r3 -> r1 = r2 * r3
-            res = alu.mul_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "div":
-            # div r1, r2, r3 -> r1 = r2 / r3
-            res = alu.div_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "mod":
-            # mod r1, r2, r3 -> r1 = r2 % r3
-            res = alu.mod_op(rb_val, rc_val)
-            result = res
-            wb["write_reg"] = ra
-            wb["write_val"] = res.result
-
-        elif mnem == "neg":
-            res = alu.neg_op(d["ra_val"])
-            result = res
-            wb["write_reg"] = d["rc"]
-            wb["write_val"] = res.result
-
-        elif mnem == "inc":
-            res = alu.inc_op(d["ra_val"])
-            result = res
-            wb["write_reg"] = d["ra"]  # incrementa o mesmo registrador
-            wb["write_val"] = res.result
-
-        elif mnem == "dec":
-            res = alu.dec_op(d["ra_val"])
-            result = res
-            wb["write_reg"] = d["ra"]  # decrementa o mesmo registrador
-            wb["write_val"] = res.result
-        else:
-            pass
-
-        # update flags if result produced by ALU operations
-        if result:
-            self.flags["neg"] = result.neg
-            self.flags["zero"] = result.zero
-            self.flags["carry"] = result.carry
-            self.flags["overflow"] = result.overflow
-
+        # Despacho pelo opcode inteiro (ver src/simulador/despacho.py).
+        # O handler devolve (reg, valor) para o WB ou None.
+        ra_val, rb_val, rc_val = self.operands
+        wb = self.handlers[d.opcode](self, d, ra_val, rb_val, rc_val)
         self.writeback_info = wb
         return wb
 
@@ -286,21 +109,39 @@ class CPU:
         wb = self.writeback_info
         if not wb:
             return
-        if wb.get("write_reg") is not None:
-            reg_idx = wb["write_reg"]
-            # Only write to valid register indices (0-31)
-            if 0 <= reg_idx < 32:
-                self.rf.write(reg_idx, wb["write_val"])
+        reg_idx, value = wb
+        # Only write to valid register indices (0-31)
+        if 0 <= reg_idx < 32:
+            self.rf.write(reg_idx, value)
         self.writeback_info = None
 
     
 
-    def run(self, max_cycles=10000, verbose=True):
+    def _instrumentado(self, instrumentos, executar, *args):
+        # Troca a tabela de despacho pela instrumentada só durante a execução
+        handlers = self.handlers
+        for instrumento in instrumentos:
+            if instrumento is not None:
+                self.handlers = instrumento.instrumentar(self.handlers)
+        try:
+            return executar(*args)
+        finally:
+            self.handlers = handlers
+
+    def run(self, max_cycles=10000, verbose=True,
+            profiler=None, trace=None, timing=None, caches=None):
         """
         Executa o processador em 4 estágios sequenciais (sem pipeline).
         Cada estágio consome 1 ciclo, totalizando 4 ciclos por instrução.
         A instrução HALT também executa seus 4 estágios.
+        Com profiler (perfilador.Perfilador), conta a execução nele; com
+        trace (rastro.GravadorDeRastro), grava um registro por instrução; com
+        timing (temporizacao.ModeloDePipeline), estima o tempo num pipeline; com
+        caches (caches.HierarquiaDeMemoria), passa buscas e acessos pelas L1.
         """
+        instrumentos = (profiler, trace, timing, caches)
+        if any(i is not None for i in instrumentos):
+            return self._instrumentado(instrumentos, self.run, max_cycles, verbose)
         if verbose:
             print("Iniciando simulação monociclo (4 estágios).")
             print()
@@ -308,19 +149,19 @@ class CPU:
         while not self.halted and self.cycle < max_cycles:
             # IF: Busca da instrução
             self.cycle += 1
-            instr_bits = self.if_stage()
+            instr_word = self.if_stage()
             if verbose:
                 print(f"--- Cycle {self.cycle} ---")
-                print(f"IF: PC -> {self.PC} ; IR = {instr_bits}")
+                print(f"IF: PC -> {self.PC} ; IR = {format(instr_word, '032b')}")
             if self.halted:
                 break
 
             # ID: Decodificação
             self.cycle += 1
-            decoded = self.id_stage(instr_bits)
+            decoded = self.id_stage(instr_word)
             if verbose:
                 print(f"--- Cycle {self.cycle} ---")
-                print(f"ID: decoded = {decoded['mnemonic']} ra={decoded['ra']} rb={decoded['rb']} rc={decoded['rc']}")
+                print(f"ID: decoded = {decoded.mnemonic} ra={decoded.ra} rb={decoded.rb} rc={decoded.rc}")
             if self.halted:
                 break
 
@@ -332,7 +173,7 @@ class CPU:
                 print(f"EX/MEM: flags = {self.flags}")
 
             # Se a instrução for HALT, marca mas continua até WB
-            is_halt = self.decoded["mnemonic"] == "halt" if self.decoded else False
+            is_halt = self.decoded.mnemonic == "halt" if self.decoded else False
 
             # WB: Escrita de resultados
             self.cycle += 1
@@ -350,6 +191,151 @@ class CPU:
                 if verbose:
                     print("HALT encountered. Stopping.")
                 break
+
+    def run_fast(self, max_instructions=10000000,
+                 profiler=None, trace=None, timing=None, caches=None):
+        """
+        Motor "turbo": IF, ID, EX/MEM e WB fundidos num único laço, sem
+        manter decoded/operands/writeback_info a cada instrução e sem saída.
+        O estado arquitetural final (registradores, memória, flags, PC) e a
+        contagem de ciclos (4 por instrução) são os mesmos de run().
+        profiler, trace, timing e caches: como em run().
+        Com dispositivos mapeados, o ciclo fica em dia a cada instrução (ver
+        _run_sincronizado).
+        Retorna o número de instruções executadas nesta chamada.
+        """
+        instrumentos = (profiler, trace, timing, caches)
+        if any(i is not None for i in instrumentos):
+            return self._instrumentado(instrumentos, self.run_fast, max_instructions)
+        if type(self.mem) is MemoriaMapeada:
+            return self._run_sincronizado(max_instructions)
+        return self._laco_rapido(max_instructions)
+
+    def _laco_rapido(self, max_instructions):
+        handlers = self.handlers
+        cache = self._decode_cache
+        decode_at = self.decode_at
+        mem_read = self.mem.read
+        regs = self.rf.regs
+        executed = 0
+        pc = None
+        d = None
+        try:
+            while not self.halted and executed < max_instructions:
+                pc = self.PC
+                d = cache.get(pc)
+                if d is None:
+                    d = decode_at(pc, mem_read(pc))
+                self.PC = pc + 1
+                opcode, _, ra, rb, rc, _, _, _ = d
+                wb = handlers[opcode](
+                    self, d,
+                    regs[ra] if ra < 32 else 0,
+                    regs[rb] if rb < 32 else 0,
+                    regs[rc] if rc < 32 else 0,
+                )
+                if wb is not None:
+                    reg_idx, value = wb
+                    if reg_idx < 32:
+                        regs[reg_idx] = value
+                executed += 1
+        finally:
+            self.cycle += 4 * executed
+        # Sincroniza o estado visível como se os 4 estágios tivessem rodado
+        if executed:
+            self.IR_addr = pc
+            self.IR = self.mem.read(pc)
+            self.decoded = d
+            self.writeback_info = None
+        return executed
+
+    def _run_sincronizado(self, max_instructions):
+        # Mesmo laço de run_fast, com cada handler envolvido por
+        # dispositivos.SincronizadorDeCiclos: self.cycle fica como em run()
+        # durante o EX/MEM, para os dispositivos lerem o ciclo exato
+        return self._instrumentado((SincronizadorDeCiclos(self.cycle),),
+                                   self._laco_rapido, max_instructions)
+
+    def run_blocks(self, max_instructions=10000000):
+        """
+        Motor de tradução dinâmica: executa blocos básicos traduzidos para
+        funções Python (ver src/simulador/tradutor.py), encadeados pelo PC.
+        Mesmo estado final e contagem de ciclos de run().
+        Com dispositivos mapeados executa via run_fast (ciclo exato para eles).
+        Retorna o número de instruções executadas nesta chamada.
+        """
+        if type(self.mem) is MemoriaMapeada:
+            return self.run_fast(max_instructions)
+        if self._tradutor is None:
+            self._tradutor = TradutorDeBlocos(self)
+        return self._tradutor.executar(max_instructions)
+
+    def run_fused(self, max_instructions=10000000,
+                  profiler=None, trace=None, timing=None, caches=None):
+        """
+        Como run_fast, mas sequências frequentes (lcl_msb+lcl_lsb, inc/dec+desvio,
+        load+ALU+store) executam como uma superinstrução (ver
+        src/simulador/superinstrucoes.py). Mesmo estado final e contagem de ciclos.
+        Com profiler, trace, timing ou caches, ou com dispositivos mapeados,
+        executa via run_fast, instrução a instrução.
+        Retorna o número de instruções executadas nesta chamada.
+        """
+        if (type(self.mem) is MemoriaMapeada
+                or any(i is not None for i in (profiler, trace, timing, caches))):
+            return self.run_fast(max_instructions, profiler, trace, timing, caches)
+        if self._superinstrucoes is None:
+            self._superinstrucoes = Superinstrucoes(self)
+        return self._superinstrucoes.executar(max_instructions)
+
+    def checkpoint(self):
+        """
+        Delta do estado desde o checkpoint anterior: {"registers": [(idx, valor)],
+        "memory": [(addr, valor)]}. Custo proporcional ao que mudou.
+        """
+        return {"registers": self.rf.checkpoint(), "memory": self.mem.checkpoint()}
+
+    def snapshot(self):
+        """
+        Captura PC, registradores, flags, memória, ciclos e halted num
+        instantaneo.Instantaneo imutável. Páginas de memória não escritas desde
+        o snapshot anterior são compartilhadas com ele.
+        """
+        exigir_memoria(self.mem, "snapshot()")
+        f = self.flags
+        a = dict(f.a) if isinstance(f.a, dict) else f.a
+        return Instantaneo(self.PC, self.cycle, self.halted, self.IR_addr,
+                           tuple(self.rf.regs), (f.op, a, f.b, f.result),
+                           self.mem.snapshot_pages())
+
+    def restore(self, snap):
+        """Volta ao estado de snap (de snapshot() ou instantaneo.carregar). Conta como checkpoint()."""
+        exigir_memoria(self.mem, "restore()")
+        self.mem.restore_pages(snap.paginas)
+        self.rf.regs[:] = array(WORD_TYPECODE, snap.regs)
+        self.rf.checkpoint()
+        op, a, b, result = snap.flags
+        self.flags.record(op, dict(a) if isinstance(a, dict) else a, b, result)
+        self.PC = snap.pc
+        self.cycle = snap.cycle
+        self.halted = snap.halted
+        self.IR_addr = snap.ir_addr
+        if snap.ir_addr is None:
+            self.IR = None
+            self.decoded = None
+        else:
+            self.IR = self.mem.read(snap.ir_addr)
+            self.decoded = self.decode_at(snap.ir_addr, self.IR)
+        self.operands = (0, 0, 0)
+        self.exec_result = None
+        self.writeback_info = None
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        """Nova CPU no estado de snap (fork: o snapshot pode ser reaplicado em várias CPUs)."""
+        cpu = cls(None)
+        cpu.restore(snap)
+        return cpu
+
     def sign_extend_8_to_32(self, val_8_bit):
         """Estende o sinal de um valor de 8 bits para 32 bits."""
         if (val_8_bit & 0x80) != 0:  # Verifica o bit de sinal (bit 7)
@@ -0,0 +1,308 @@
+# vetorial.py
+# Simulador vetorial em lockstep: N instâncias (lanes) do mesmo programa, cada uma
+# com seus registradores, memória e flags, executando cada instrução para todas
+# as lanes de uma vez com NumPy.
+#
+# - Registradores: array (N, 32) uint32.
+# - Memória: páginas de 256 palavras com copy-on-write. Todas as lanes começam
+#   apontando para as páginas da imagem do programa; a primeira escrita de uma
+#   lane numa página copia só aquela página para o pool da lane.
+# - Desvios divergentes: as lanes são reagrupadas por PC; a cada passo executa o
+#   grupo de menor PC (os caminhos voltam a se juntar quando os PCs coincidem).
+# - Semântica das operações: as funções *_result de alu.py, aplicadas a arrays
+#   uint32 (div/mod/asr têm versões vetoriais com o mesmo comportamento).
+#
+# NumPy é dependência opcional: só é necessária para usar este módulo.
+
+from src.interpretador.interpretador_de_instrucoes import decode_word
+from src.simulador.memoria import MEM_SIZE
+import src.simulador.alu as alu
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+PAGE_BITS = 8
+PAGE_WORDS = 1 << PAGE_BITS
+N_PAGES = MEM_SIZE // PAGE_WORDS
+
+
+def _div(b, c):
+    # alu.div_result: divisão sem sinal; divisão por zero dá 0
+    zero = c == 0
+    return np.where(zero, np.uint32(0), b // np.where(zero, np.uint32(1), c))
+
+def _mod(b, c):
+    zero = c == 0
+    return np.where(zero, np.uint32(0), b % np.where(zero, np.uint32(1), c))
+
+def _asr(b, c):
+    # alu.asr_result: deslocamento aritmético (propaga o bit de sinal)
+    return (b.view(np.int32) >> (c & 0x1F).astype(np.int32)).view(np.uint32)
+
+# mnemonic -> (função vetorial, registrador destino, tipo de flags, operandos)
+# operandos "bc": f(rb_val, rc_val); "a": f(ra_val)
+_ALU = {
+    "add":      (alu.add_result, "ra", alu.FLAGS_ADD, "bc"),
+    "sub":      (alu.sub_result, "ra", alu.FLAGS_SUB, "bc"),
+    "xor":      (alu.xor_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "or":       (alu.or_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "and":      (alu.and_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "asl":      (alu.asl_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "lsl":      (alu.lsl_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "asr":      (_asr, "ra", alu.FLAGS_LOGIC, "bc"),
+    "lsr":      (alu.lsr_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "mul":      (alu.mul_result, "ra", alu.FLAGS_LOGIC, "bc"),
+    "div":      (_div, "ra", alu.FLAGS_LOGIC, "bc"),
+    "mod":      (_mod, "ra", alu.FLAGS_LOGIC, "bc"),
+    "passnota": (alu.not_result, "rc", alu.FLAGS_LOGIC, "a"),
+    "passa":    (alu.passa_result, "rc", alu.FLAGS_LOGIC, "a"),
+    "neg":      (alu.neg_result, "rc", alu.FLAGS_LOGIC, "a"),
+    "inc":      (alu.inc_result, "ra", alu.FLAGS_LOGIC, "a"),
+    "dec":      (alu.dec_result, "ra", alu.FLAGS_LOGIC, "a"),
+}
+
+# Demais instruções com versão vetorial em CPUVetorial._executar ("unknown" não faz nada)
+_OUTRAS = frozenset(("zeros", "lcl_msb", "lcl_lsb", "load", "loadi", "store", "storei",
+                     "faa", "halt", "j", "jal", "jr", "beq", "bne", "unknown"))
+
+
+def _sign_extend_8_to_32(val_8_bit):
+    # Mesma extensão de CPU.sign_extend_8_to_32
+    if (val_8_bit & 0x80) != 0:
+        return val_8_bit | 0xFFFFFF00
+    return val_8_bit
+
+
+class CPUVetorial:
+    """
+    N cópias do mesmo programa executadas em lockstep.
+    Estado por lane: regs[lane], PC, ciclos (4 por instrução), halted, flags e memória.
+    """
+
+    def __init__(self, memoria, n_lanes):
+        if np is None:
+            raise ImportError("CPUVetorial requer NumPy (pip install numpy)")
+        self.n = n_lanes
+        self.regs = np.zeros((n_lanes, 32), dtype=np.uint32)
+        self.pc = np.zeros(n_lanes, dtype=np.int64)
+        self.instructions = np.zeros(n_lanes, dtype=np.int64)
+        self.halted = np.zeros(n_lanes, dtype=bool)
+        # Lane que buscou fora da memória (a CPU escalar levantaria IndexError)
+        self.faulted = np.zeros(n_lanes, dtype=bool)
+
+        # Flags preguiçosas por lane (mesmos campos de alu.FlagsPreguicosas)
+        self.flag_op = np.full(n_lanes, alu.FLAGS_NONE, dtype=np.uint8)
+        self.flag_a = np.zeros(n_lanes, dtype=np.uint32)
+        self.flag_b = np.zeros(n_lanes, dtype=np.uint32)
+        self.flag_result = np.zeros(n_lanes, dtype=np.uint32)
+
+        # Pool de páginas: as N_PAGES primeiras são a imagem compartilhada
+        imagem = np.zeros(MEM_SIZE, dtype=np.uint32)
+        for addr, value in memoria.dump_modified():
+            imagem[addr] = value
+        self._pool = imagem.reshape(N_PAGES, PAGE_WORDS).copy()
+        self._pool_usadas = N_PAGES
+        self.page_table = np.tile(np.arange(N_PAGES, dtype=np.int64), (n_lanes, 1))
+
+        self._decodificadas = {}
+
+    @classmethod
+    def from_program(cls, program_path, n_lanes):
+        """Carrega o programa como CPU(program_path) e cria n_lanes cópias."""
+        from src.simulador.unidade_de_controle import CPU
+        return cls(CPU(program_path).mem, n_lanes)
+
+    # Memória
+
+    def _alocar_paginas(self, n):
+        necessario = self._pool_usadas + n
+        if necessario > len(self._pool):
+            novo = max(necessario, 2 * len(self._pool))
+            pool = np.zeros((novo, PAGE_WORDS), dtype=np.uint32)
+            pool[:self._pool_usadas] = self._pool[:self._pool_usadas]
+            self._pool = pool
+        indices = np.arange(self._pool_usadas, necessario, dtype=np.int64)
+        self._pool_usadas = necessario
+        return indices
+
+    def _ler(self, lanes, addrs):
+        return self._pool[self.page_table[lanes, addrs >> PAGE_BITS], addrs & (PAGE_WORDS - 1)]
+
+    def _escrever(self, lanes, addrs, values):
+        paginas = addrs >> PAGE_BITS
+        indices = self.page_table[lanes, paginas]
+        compartilhadas = indices < N_PAGES
+        if compartilhadas.any():
+            # Copy-on-write: cada (lane, página) da imagem ganha sua cópia.
+            # Uma mesma lane escreve no máximo um endereço por instrução.
+            origem = indices[compartilhadas]
+            novas = self._alocar_paginas(len(origem))
+            self._pool[novas] = self._pool[origem]
+            self.page_table[lanes[compartilhadas], paginas[compartilhadas]] = novas
+            indices = self.page_table[lanes, paginas]
+        self._pool[indices, addrs & (PAGE_WORDS - 1)] = values
+
+    def write_memory(self, addr, values):
+        """Escreve values (escalar ou um valor por lane) em addr em todas as lanes."""
+        lanes = np.arange(self.n)
+        addrs = np.full(self.n, addr & 0xFFFF, dtype=np.int64)
+        self._escrever(lanes, addrs, np.broadcast_to(np.asarray(values, dtype=np.uint32), (self.n,)))
+
+    def read_memory(self, addr):
+        """Valor de addr em cada lane (array de N elementos)."""
+        lanes = np.arange(self.n)
+        return self._ler(lanes, np.full(self.n, addr & 0xFFFF, dtype=np.int64))
+
+    def dump_modified(self, lane):
+        """Pares (addr, valor) não nulos da memória de uma lane (como Memoria.dump_modified)."""
+        words = self._pool[self.page_table[lane]].reshape(-1)
+        nonzero = np.nonzero(words)[0]
+        return [(int(a), int(words[a])) for a in nonzero]
+
+    def flags(self, lane):
+        """Flags de uma lane como alu.FlagsPreguicosas."""
+        flags = alu.FlagsPreguicosas()
+        flags.record(int(self.flag_op[lane]), int(self.flag_a[lane]),
+                     int(self.flag_b[lane]), int(self.flag_result[lane]))
+        return flags
+
+    def cycles(self, lane):
+        return 4 * int(self.instructions[lane])
+
+    # Execução
+
+    def run(self, max_instructions=10000):
+        """
+        Executa todas as lanes até HALT, falha de busca ou max_instructions
+        instruções por lane. Retorna o total de instruções executadas (todas as lanes).
+        """
+        ativas = ~(self.halted | self.faulted) & (self.instructions < max_instructions)
+        grupos = {}
+        for pc in np.unique(self.pc[ativas]):
+            grupos[int(pc)] = np.nonzero(ativas & (self.pc == pc))[0]
+        total = 0
+
+        while grupos:
+            pc = min(grupos)
+            lanes = grupos.pop(pc)
+            if pc < 0 or pc >= MEM_SIZE:
+                self.faulted[lanes] = True
+                continue
+            words = self._ler(lanes, np.full(len(lanes), pc, dtype=np.int64))
+            primeira = words[0]
+            if (words != primeira).any():
+                # Código auto-modificável divergente: executa cada variante em separado
+                iguais = words == primeira
+                self._agrupar(grupos, lanes[~iguais], pc)
+                lanes = lanes[iguais]
+            proximo = self._executar(lanes, pc, int(primeira))
+            self.instructions[lanes] += 1
+            total += len(lanes)
+
+            continuam = ~self.halted[lanes] & (self.instructions[lanes] < max_instructions)
+            if isinstance(proximo, int):
+                self.pc[lanes] = proximo
+                self._agrupar(grupos, lanes[continuam], proximo)
+            else:
+                self.pc[lanes] = proximo
+                lanes, proximo = lanes[continuam], proximo[continuam]
+                for destino in np.unique(proximo):
+                    self._agrupar(grupos, lanes[proximo == destino], int(destino))
+        return total
+
+    @staticmethod
+    def _agrupar(grupos, lanes, pc):
+        if len(lanes) == 0:
+            return
+        existente = grupos.get(pc)
+        grupos[pc] = lanes if existente is None else np.concatenate((existente, lanes))
+
+    def _reg(self, lanes, idx):
+        # campos de registrador têm 8 bits: índices >= 32 leem 0
+        if idx < 32:
+            return self.regs[lanes, idx]
+        return np.zeros(len(lanes), dtype=np.uint32)
+
+    def _executar(self, lanes, pc, word):
+        """Executa a instrução word (em pc) para as lanes; devolve o próximo PC (int ou array)."""
+        d = self._decodificadas.get(word)
+        if d is None:
+            d = decode_word(word)
+            if d.mnemonic not in _ALU and d.mnemonic not in _OUTRAS:
+                # Instruções registradas via despacho.registrar_instrucao não têm versão vetorial
+                raise ValueError(f"Instrução sem versão vetorial em {pc}: '{d.mnemonic}'")
+            self._decodificadas[word] = d
+        m = d.mnemonic
+        regs = self.regs
+
+        if m in _ALU:
+            fn, destino, tipo, operandos = _ALU[m]
+            if operandos == "bc":
+                b = self._reg(lanes, d.rb)
+                c = self._reg(lanes, d.rc)
+                if m in ("asl", "lsl", "asr", "lsr"):
+                    c = c & 0x1F
+                res = fn(b, c).astype(np.uint32)
+            else:
+                b = c = 0
+                res = fn(self._reg(lanes, d.ra)).astype(np.uint32)
+            idx = d.ra if destino == "ra" else d.rc
+            if idx < 32:
+                regs[lanes, idx] = res
+            self.flag_op[lanes] = tipo
+            self.flag_a[lanes] = b
+            self.flag_b[lanes] = c
+            self.flag_result[lanes] = res
+        elif m == "zeros":
+            if d.rc < 32:
+                regs[lanes, d.rc] = 0
+            self.flag_op[lanes] = alu.FLAGS_LOGIC
+            self.flag_result[lanes] = 0
+        elif m == "lcl_msb":
+            if d.rc < 32:
+                regs[lanes, d.rc] = ((d.const16 << 16) & 0xFFFF0000) | (regs[lanes, d.rc] & 0x0000FFFF)
+        elif m == "lcl_lsb":
+            if d.rc < 32:
+                regs[lanes, d.rc] = (d.const16 & 0xFFFF) | (regs[lanes, d.rc] & 0xFFFF0000)
+        elif m == "load":
+            valores = self._ler(lanes, self._reg(lanes, d.ra).astype(np.int64) & 0xFFFF)
+            if d.rc < 32:
+                regs[lanes, d.rc] = valores
+        elif m == "loadi":
+            valores = self._ler(lanes, np.full(len(lanes), d.end24 & 0xFFFF, dtype=np.int64))
+            if d.ra < 32:
+                regs[lanes, d.ra] = valores
+        elif m == "store":
+            addrs = self._reg(lanes, d.rc).astype(np.int64) & 0xFFFF
+            self._escrever(lanes, addrs, self._reg(lanes, d.ra))
+        elif m == "storei":
+            addrs = np.full(len(lanes), d.rc & 0xFFFF, dtype=np.int64)
+            self._escrever(lanes, addrs, self._reg(lanes, d.ra))
+        elif m == "faa":
+            # Cada lane tem a própria memória: leitura e escrita seguidas já são atômicas
+            addrs = self._reg(lanes, d.rb).astype(np.int64) & 0xFFFF
+            antigos = self._ler(lanes, addrs)
+            self._escrever(lanes, addrs, (antigos + self._reg(lanes, d.rc)).astype(np.uint32))
+            if d.ra < 32:
+                regs[lanes, d.ra] = antigos
+        elif m == "halt":
+            self.halted[lanes] = True
+        elif m == "j":
+            return d.end24
+        elif m == "jal":
+            regs[lanes, 31] = pc + 1
+            return d.end24
+        elif m == "jr":
+            return self._reg(lanes, d.ra).astype(np.int64)
+        elif m in ("beq", "bne"):
+            iguais = self._reg(lanes, d.ra) == self._reg(lanes, d.rb)
+            tomado = iguais if m == "beq" else ~iguais
+            alvo = (pc + 1 + _sign_extend_8_to_32(d.const8)) & 0xFFFFFFFF
+            if tomado.all():
+                return alvo
+            if not tomado.any():
+                return pc + 1
+            return np.where(tomado, alvo, pc + 1)
+        return pc + 1